@@ -0,0 +1,61 @@
+"""
+Benchmark da assinatura OAuth: OAuth1 (requests_oauthlib) x FastOAuth1
+
+Uso:
+    python scripts/bench_signing.py [N_REQUISICOES]
+"""
+
+import sys
+import timeit
+
+from requests import Request
+from requests_oauthlib import OAuth1
+
+from smugmug_photo_selector.signing import FastOAuth1
+
+CREDENTIALS = {
+    'client_key': 'a' * 32,
+    'client_secret': 'b' * 64,
+    'resource_owner_key': 'c' * 32,
+    'resource_owner_secret': 'd' * 64,
+}
+IMAGES_URL = 'https://api.smugmug.com/api/v2/album/ABC123!images'
+PAGE_SIZE = 100
+
+
+def _paginated_requests(total):
+    """Requisições preparadas como as da paginação de um álbum"""
+    return [
+        Request(
+            'GET',
+            IMAGES_URL,
+            params={'_verbosity': '2', 'start': start, 'count': PAGE_SIZE},
+        ).prepare()
+        for start in range(1, total * PAGE_SIZE, PAGE_SIZE)
+    ]
+
+
+def bench(auth, prepared):
+    def run():
+        for request in prepared:
+            request.headers.pop('Authorization', None)
+            auth(request)
+
+    return min(timeit.repeat(run, number=1, repeat=5))
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    prepared = _paginated_requests(total)
+
+    baseline = bench(OAuth1(**CREDENTIALS), prepared)
+    fast = bench(FastOAuth1(**CREDENTIALS), prepared)
+
+    print(f'{total} assinaturas')
+    print(f'OAuth1:     {baseline * 1e6 / total:8.1f} µs/req')
+    print(f'FastOAuth1: {fast * 1e6 / total:8.1f} µs/req')
+    print(f'Ganho:      {baseline / fast:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
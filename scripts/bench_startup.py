@@ -0,0 +1,89 @@
+"""
+Benchmark de início a frio: tempo de importação do app e tempo até a
+primeira resposta HTTP, como numa máquina do Fly acordando.
+
+Uso:
+    python scripts/bench_startup.py [N_RODADAS]
+"""
+
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ENV = {
+    **os.environ,
+    'SMUGMUG_API_KEY': os.environ.get('SMUGMUG_API_KEY', 'bench'),
+    'SMUGMUG_API_SECRET': os.environ.get('SMUGMUG_API_SECRET', 'bench'),
+    'SMUGMUG_ACCESS_TOKEN': os.environ.get('SMUGMUG_ACCESS_TOKEN', 'bench'),
+    'SMUGMUG_ACCESS_TOKEN_SECRET': os.environ.get(
+        'SMUGMUG_ACCESS_TOKEN_SECRET', 'bench'
+    ),
+}
+TIMEOUT = 30
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def import_time() -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, '-c', 'import smugmug_photo_selector.app'],
+        check=True,
+        env=ENV,
+    )
+    return time.perf_counter() - start
+
+
+def first_response_time(path: str = '/') -> float:
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            '-m',
+            'uvicorn',
+            '--port',
+            str(port),
+            '--log-level',
+            'warning',
+            'smugmug_photo_selector.app:app',
+        ],
+        env=ENV,
+    )
+    try:
+        while time.perf_counter() - start < TIMEOUT:
+            if server.poll() is not None:
+                raise RuntimeError('Servidor encerrou antes de responder')
+            try:
+                with urllib.request.urlopen(
+                    f'http://127.0.0.1:{port}{path}', timeout=1
+                ):
+                    return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError('Servidor não respondeu')
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    imports = [import_time() for _ in range(rounds)]
+    responses = [first_response_time() for _ in range(rounds)]
+
+    print(f'{rounds} rodadas (mediana)')
+    print(f'Importação do app:  {statistics.median(imports) * 1000:7.0f} ms')
+    print(f'Primeira resposta:  {statistics.median(responses) * 1000:7.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
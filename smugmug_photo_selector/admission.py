@@ -0,0 +1,151 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+RETRY_AFTER_MIN = 1
+RETRY_AFTER_MAX = 60
+# Peso da última duração na média móvel do tempo de atendimento
+DURATION_SMOOTHING = 0.2
+
+
+class AdmissionRejected(Exception):
+    """Endpoint saturado: a requisição deve ser repetida mais tarde"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """
+    Limitar as requisições simultâneas de um endpoint, com uma fila de
+    espera limitada e prazo de espera. Fora disso a requisição é
+    recusada na hora, em vez de se acumular atrás das chamadas ao
+    SmugMug. A fila é atendida alternando entre os clientes, e
+    `max_per_client` (0 desabilita) limita quanto um cliente ocupa.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        max_per_client: int = 0,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.max_per_client = max(0, max_per_client)
+        self.active = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.avg_duration = 1.0
+        self._waiters: 'OrderedDict[str, Deque[asyncio.Future]]' = (
+            OrderedDict()
+        )
+        self._clients: Dict[str, int] = {}
+
+    def retry_after(self) -> int:
+        """Segundos estimados até a fila andar o bastante"""
+        estimate = self.avg_duration * (self.queued + 1) / self.max_concurrency
+        return min(max(math.ceil(estimate), RETRY_AFTER_MIN), RETRY_AFTER_MAX)
+
+    def _reject(self, message: str):
+        self.rejected += 1
+        raise AdmissionRejected(message, self.retry_after())
+
+    def _enter(self, client: str):
+        self._clients[client] = self._clients.get(client, 0) + 1
+
+    def _leave(self, client: str):
+        remaining = self._clients[client] - 1
+        if remaining:
+            self._clients[client] = remaining
+        else:
+            del self._clients[client]
+
+    def _dispatch(self):
+        while self.active < self.max_concurrency and self._waiters:
+            # Um por cliente a cada rodada
+            client, waiters = self._waiters.popitem(last=False)
+            future = waiters.popleft()
+            if waiters:
+                self._waiters[client] = waiters
+            if future.done():
+                continue
+            self.queued -= 1
+            self.active += 1
+            future.set_result(None)
+
+    async def acquire(self, client: str):
+        if (
+            self.max_per_client
+            and self._clients.get(client, 0) >= self.max_per_client
+        ):
+            self._reject('Muitas requisições simultâneas deste cliente')
+
+        if self.active < self.max_concurrency and not self.queued:
+            self.active += 1
+            self._enter(client)
+            return
+
+        if self.queued >= self.max_queue:
+            self._reject('Servidor sobrecarregado, tente novamente')
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(client, deque()).append(future)
+        self.queued += 1
+        self._enter(client)
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(future), timeout=self.queue_timeout
+            )
+        except asyncio.TimeoutError:
+            if future.done():
+                # Vaga concedida junto com o fim do prazo
+                return
+            self._abandon(client, future)
+            self.timed_out += 1
+            self._reject('Tempo de espera na fila esgotado')
+        except asyncio.CancelledError:
+            if future.done():
+                self.release(client)
+            else:
+                self._abandon(client, future)
+            raise
+
+    def _abandon(self, client: str, future: asyncio.Future):
+        future.cancel()
+        self.queued -= 1
+        self._leave(client)
+
+    def release(self, client: str, duration: Optional[float] = None):
+        self.active -= 1
+        self._leave(client)
+        if duration is not None:
+            self.avg_duration += DURATION_SMOOTHING * (
+                duration - self.avg_duration
+            )
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, client: str = 'anonymous'):
+        await self.acquire(client)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(client, time.monotonic() - started)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'active': self.active,
+            'queued': self.queued,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'retry_after': self.retry_after(),
+        }
@@ -1,16 +1,77 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from fastapi import FastAPI, HTTPException, Path, Query
+from fastapi import (
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+)
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import (
+    FileResponse,
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+from pydantic_core import to_json
 
+from .admission import AdmissionRejected
+from .components import Components
 from .config import settings
-from .models import AlbumInfo, AlbumResponse
-from .smugmug_service import SmugMugService
+from .metadata import MetadataQuery
+from .models import (
+    AlbumInfo,
+    AlbumOrdinals,
+    AlbumResponse,
+    ContactSheetManifest,
+    CredentialStats,
+    ExportJob,
+    ExportJobRequest,
+    ImageSize,
+    Photo,
+    PhotoLookupRequest,
+    PhotoLookupResponse,
+    SearchResponse,
+    Selection,
+    SelectionCombineRequest,
+    SelectionExport,
+    SelectionList,
+    SelectionSummary,
+    SelectionUpdate,
+)
+from .profiling import (
+    ProfileStore,
+    ProfilingMiddleware,
+    is_admin,
+    profiled_endpoint,
+)
+from .scheduler import Priority, request_context
+from .selections import SELECTION_NAME, encode_bitmap
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+components = Components(settings)
+profiles = ProfileStore(settings.PROFILING_KEEP)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await components.startup()
+    yield
+    components.shutdown()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title='SmugMug Photo Extractor',
     description='Extrai todas as fotos de um álbum SmugMug',
     version='1.0.0',
@@ -19,11 +80,168 @@ app = FastAPI(
 app.add_middleware(
     CORSMiddleware,
     allow_origins=['*'],
-    allow_methods=['GET'],
+    allow_methods=['GET', 'POST', 'DELETE'],
     allow_headers=['*'],
 )
+app.add_middleware(
+    ProfilingMiddleware,
+    token=settings.PROFILING_TOKEN,
+    store=profiles,
+    interval=settings.PROFILING_INTERVAL,
+)
 
-smugmug_service = SmugMugService()
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=503,
+        content={'detail': str(exc)},
+        headers={'Retry-After': str(exc.retry_after)},
+    )
+
+
+LIMIT_QUERY = Query(
+    None,
+    ge=1,
+    le=settings.MAX_PAGE_SIZE,
+    description='Quantidade de fotos por página (sem ele, o álbum todo)',
+)
+CURSOR_QUERY = Query(
+    None, description='Cursor da próxima página (next_cursor)'
+)
+
+
+def _metadata_query(
+    metadata: bool = Query(
+        False, description='Incluir o EXIF das fotos em metadata'
+    ),
+    sort: Optional[str] = Query(
+        None,
+        description=(
+            'Ordenar pelo EXIF (ex.: DateTimeOriginal, -date_time_original)'
+        ),
+    ),
+    camera: Optional[str] = Query(
+        None, description='Só fotos desta câmera (marca ou modelo)'
+    ),
+    taken_after: Optional[str] = Query(
+        None, description='Só fotos tiradas a partir desta data (ISO)'
+    ),
+    taken_before: Optional[str] = Query(
+        None, description='Só fotos tiradas antes desta data (ISO)'
+    ),
+) -> Optional[MetadataQuery]:
+    """Filtros e ordenação pelo EXIF; qualquer um deles liga o metadata"""
+    if not any([metadata, sort, camera, taken_after, taken_before]):
+        return None
+    return MetadataQuery(
+        sort=sort,
+        camera=camera,
+        taken_after=taken_after,
+        taken_before=taken_before,
+    )
+
+
+@dataclass(frozen=True)
+class AlbumOptions:
+    """Processamento opcional das fotos do álbum"""
+
+    duplicates: bool = False
+    metadata: Optional[MetadataQuery] = None
+
+    @property
+    def plain(self) -> bool:
+        return not self.duplicates and self.metadata is None
+
+
+def _album_options(
+    duplicates: bool = Query(
+        False, description='Agrupar fotos quase idênticas em cluster_id'
+    ),
+    metadata: Optional[MetadataQuery] = Depends(_metadata_query),
+) -> AlbumOptions:
+    if duplicates and not components.duplicate_detector.available():
+        raise HTTPException(
+            status_code=501,
+            detail='Detecção de duplicatas requer numpy e Pillow',
+        )
+    return AlbumOptions(duplicates=duplicates, metadata=metadata)
+
+
+ALBUM_OPTIONS = Depends(_album_options)
+
+
+def _check_paging(
+    limit: Optional[int], cursor: Optional[str], options: AlbumOptions
+):
+    """
+    Ordenar ou filtrar só a página daria total_photos e next_cursor
+    do álbum sem filtro: com paginação, só o EXIF é permitido.
+    """
+    paged = limit is not None or cursor is not None
+    if paged and options.metadata is not None and options.metadata.selects:
+        raise HTTPException(
+            status_code=400,
+            detail='sort e filtros de EXIF não funcionam com limit/cursor',
+        )
+
+
+async def _post_process(
+    album: AlbumResponse, options: AlbumOptions
+) -> AlbumResponse:
+    if options.duplicates:
+        album = await components.duplicate_detector.annotate(album)
+    if options.metadata is not None:
+        album = await components.metadata_enricher.enrich(
+            album, options.metadata
+        )
+    return album
+
+
+def _client_id(request: Request) -> str:
+    """Identificar o cliente para a divisão justa das requisições"""
+    forwarded = request.headers.get('Fly-Client-IP')
+    if forwarded:
+        return forwarded
+    return request.client.host if request.client else 'anonymous'
+
+
+class _PinnedFileResponse(FileResponse):
+    """
+    FileResponse de um arquivo fixado no cache de imagens, liberado ao
+    terminar o envio (inclusive se o cliente desconectar no meio)
+    """
+
+    def __init__(self, path, release, **kwargs):
+        super().__init__(path, **kwargs)
+        self._release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._release(self.path)
+
+
+def _snapshot_response(
+    album_id: str, request: Request
+) -> Optional[FileResponse]:
+    """Snapshot estático do álbum, se houver um atual"""
+    compressed = 'gzip' in request.headers.get('Accept-Encoding', '')
+    path = components.snapshot_store.fresh_path(
+        album_id, settings.SNAPSHOT_MAX_AGE, compressed
+    )
+    if path is None:
+        return None
+    headers = {'Vary': 'Accept-Encoding'}
+    if compressed:
+        headers['Content-Encoding'] = 'gzip'
+    return FileResponse(path, media_type='application/json', headers=headers)
+
+
+def _admit(endpoint: str, request: Request):
+    """Vaga no endpoint para o cliente, ou 503 se saturado"""
+    return components.admission[endpoint].slot(_client_id(request))
 
 
 @app.get('/', tags=['Info'])
@@ -31,52 +249,327 @@ async def root():
     return {
         'service': 'SmugMug Photo Extractor',
         'version': '1.0.0',
-        'endpoints': ['/photos', '/photos/{album_id}', '/info'],
+        'endpoints': [
+            '/photos',
+            '/photos/{album_id}',
+            '/photos/{album_id}/{image_key}',
+            '/info',
+            '/search',
+            '/selections/{album_id}',
+            '/stream/photos',
+            '/stream/photos/{album_id}',
+            '/img/{image_key}/{size}',
+            '/contact-sheets/{album_id}',
+            '/jobs',
+        ],
+    }
+
+
+@app.get(
+    '/health/credentials',
+    response_model=List[CredentialStats],
+    tags=['Info'],
+)
+async def get_credentials_health():
+    """
+    Estado de cada credencial OAuth do pool: carga atual, requisições,
+    falhas, rate limits recebidos e tempo restante de afastamento.
+    """
+    return components.service.credentials.stats()
+
+
+@app.get(
+    '/health/admission',
+    response_model=Dict[str, Dict[str, int]],
+    tags=['Info'],
+)
+async def get_admission_health():
+    """
+    Controle de admissão por endpoint: requisições em atendimento, na
+    fila, recusadas (503), que esgotaram o prazo na fila e o
+    Retry-After sugerido no momento.
+    """
+    return {
+        endpoint: limiter.stats()
+        for endpoint, limiter in components.admission.items()
     }
 
 
+@app.get('/debug/profiles/{profile_id}', tags=['Info'])
+async def get_profile(
+    profile_id: str = Path(..., pattern=r'^[0-9a-f]+$'),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """
+    Baixar um perfil capturado com `profile=sample`, em stacks
+    "collapsed" (flamegraph.pl, inferno, speedscope).
+    """
+    if not is_admin(settings.PROFILING_TOKEN, x_admin_token):
+        raise HTTPException(status_code=403, detail='Token de admin inválido')
+    collapsed = profiles.get(profile_id)
+    if collapsed is None:
+        raise HTTPException(status_code=404, detail='Perfil não encontrado')
+    return PlainTextResponse(
+        collapsed,
+        headers={
+            'Content-Disposition': (
+                f'attachment; filename="profile-{profile_id}.folded"'
+            )
+        },
+    )
+
+
 @app.get('/photos', response_model=AlbumResponse, tags=['Photos'])
+@profiled_endpoint
 async def get_album_photos(
+    request: Request,
     url: str = Query(..., description='URL do álbum SmugMug'),
+    limit: Optional[int] = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
+    options: AlbumOptions = ALBUM_OPTIONS,
 ):
     """
     Extrair TODAS as fotos de um álbum SmugMug em todos os
     tamanhos disponíveis.
 
+    Com `limit`, retorna só uma página e o `next_cursor` para a
+    seguinte, buscando no SmugMug apenas as fotos pedidas.
+
+    Com `duplicates=true`, fotos quase idênticas (rajadas) recebem o
+    mesmo `cluster_id`.
+
+    Com `metadata=true`, cada foto traz seu EXIF (data, câmera, lente,
+    dimensões), que também permite filtrar (`camera`, `taken_after`,
+    `taken_before`) e ordenar (`sort=DateTimeOriginal`), mas só sem
+    `limit`/`cursor`: o álbum inteiro é filtrado e ordenado.
+
     Exemplo: /photos?url=https://user.smugmug.com/album-name
+    Exemplo: /photos?url=https://user.smugmug.com/album-name&limit=50
     """
-    try:
-        logger.info(f'Extracting photos from: {url}')
-        return await smugmug_service.get_all_photos(url)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        logger.error(f'Error: {e}')
-        raise HTTPException(status_code=500, detail='Erro interno')
+    _check_paging(limit, cursor, options)
+    async with _admit('photos', request):
+        try:
+            logger.info(f'Extracting photos from: {url}')
+            with request_context(Priority.STANDARD, _client_id(request)):
+                album = await components.service.get_all_photos(
+                    url, limit, cursor
+                )
+                return await _post_process(album, options)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f'Error: {e}')
+            raise HTTPException(status_code=500, detail='Erro interno')
 
 
 @app.get('/photos/{album_id}', response_model=AlbumResponse, tags=['Photos'])
+@profiled_endpoint
 async def get_album_photos_by_id(
+    request: Request,
     album_id: str = Path(..., description='ID do álbum SmugMug'),
+    limit: Optional[int] = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
+    options: AlbumOptions = ALBUM_OPTIONS,
 ):
     """
     Extrair TODAS as fotos de um álbum SmugMug pelo ID do álbum
     em todos os tamanhos disponíveis.
 
+    Com `limit`, retorna só uma página e o `next_cursor` para a
+    seguinte. Com `duplicates=true`, preenche o `cluster_id`; com
+    `metadata=true` (ou `sort`/filtros), o EXIF de cada foto.
+
     Exemplo: /photos/n-ABC123
+    Exemplo: /photos/n-ABC123?limit=50&cursor=<next_cursor>
+    """
+    _check_paging(limit, cursor, options)
+    if limit is None and cursor is None and options.plain:
+        snapshot = _snapshot_response(album_id, request)
+        if snapshot is not None:
+            return snapshot
+    async with _admit('photos_by_id', request):
+        try:
+            logger.info(f'Extracting photos from album ID: {album_id}')
+            with request_context(Priority.STANDARD, _client_id(request)):
+                album = await components.service.get_all_photos_by_id(
+                    album_id, limit, cursor
+                )
+                return await _post_process(album, options)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f'Error: {e}')
+            raise HTTPException(status_code=500, detail='Erro interno')
+
+
+@app.post(
+    '/photos/{album_id}', response_model=PhotoLookupResponse, tags=['Photos']
+)
+async def lookup_album_photos(
+    request: Request,
+    lookup: PhotoLookupRequest,
+    album_id: str = Path(..., description='ID do álbum SmugMug'),
+):
+    """
+    Obter várias fotos do álbum pelos ImageKeys, sem buscar o álbum
+    inteiro quando ele já foi visto. ImageKeys que não existem vêm em
+    `missing`.
+
+    Exemplo: POST /photos/n-ABC123 {"image_keys": ["abc123", "def456"]}
+    """
+    async with _admit('photo', request):
+        try:
+            with request_context(Priority.INTERACTIVE, _client_id(request)):
+                return await components.service.get_photos(
+                    album_id, lookup.image_keys
+                )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f'Error: {e}')
+            raise HTTPException(status_code=500, detail='Erro interno')
+
+
+@app.get(
+    '/photos/{album_id}/{image_key}', response_model=Photo, tags=['Photos']
+)
+async def get_album_photo(
+    request: Request,
+    album_id: str = Path(..., description='ID do álbum SmugMug'),
+    image_key: str = Path(..., description='ImageKey da foto'),
+):
+    """
+    Obter uma foto do álbum (URLs atualizadas) sem buscar o álbum
+    inteiro: vem do índice do álbum já buscado ou do SmugMug.
+
+    Exemplo: /photos/n-ABC123/abc123
     """
+    async with _admit('photo', request):
+        try:
+            with request_context(Priority.INTERACTIVE, _client_id(request)):
+                return await components.service.get_photo(album_id, image_key)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f'Error: {e}')
+            raise HTTPException(status_code=500, detail='Erro interno')
+
+
+def _sse_event(name: str, data: Dict[str, Any]) -> str:
+    return f'event: {name}\ndata: {to_json(data).decode()}\n\n'
+
+
+async def _with_keepalive(
+    events: AsyncIterator[Tuple[str, Dict[str, Any]]], interval: float
+) -> AsyncIterator[str]:
+    """
+    Eventos no formato SSE, com um comentário a cada `interval`
+    segundos sem eventos para proxies não derrubarem a conexão.
+    """
+    pending = asyncio.ensure_future(anext(events))
+    try:
+        while True:
+            done, _ = await asyncio.wait({pending}, timeout=interval)
+            if not done:
+                yield ': keepalive\n\n'
+                continue
+            try:
+                name, data = pending.result()
+            except StopAsyncIteration:
+                return
+            yield _sse_event(name, data)
+            pending = asyncio.ensure_future(anext(events))
+    finally:
+        # Cliente desconectou: parar as buscas em andamento
+        if not pending.done():
+            pending.cancel()
+            await asyncio.wait({pending})
+        await events.aclose()
+
+
+async def _event_stream(
+    endpoint: str,
+    request: Request,
+    events: AsyncIterator[Tuple[str, Dict[str, Any]]],
+) -> AsyncIterator[str]:
+    """
+    Stream SSE sob o controle de admissão do endpoint. Depois do 200
+    os erros viram um evento `error`; se o endpoint estiver saturado,
+    `retry` diz ao EventSource quando reconectar.
+    """
+    client = _client_id(request)
     try:
-        logger.info(f'Extracting photos from album ID: {album_id}')
-        return await smugmug_service.get_all_photos_by_id(album_id)
+        async with components.admission[endpoint].slot(client):
+            with request_context(Priority.STANDARD, client):
+                async for chunk in _with_keepalive(
+                    events, settings.SSE_KEEPALIVE
+                ):
+                    yield chunk
+    except AdmissionRejected as e:
+        yield f'retry: {e.retry_after * 1000}\n' + _sse_event(
+            'error', {'detail': str(e), 'retry_after': e.retry_after}
+        )
     except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        yield _sse_event('error', {'detail': str(e)})
     except Exception as e:
         logger.error(f'Error: {e}')
-        raise HTTPException(status_code=500, detail='Erro interno')
+        yield _sse_event('error', {'detail': 'Erro interno'})
+
+
+def _sse_response(stream: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        stream,
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@app.get('/stream/photos', tags=['Photos'])
+async def stream_album_photos(
+    request: Request,
+    url: str = Query(..., description='URL do álbum SmugMug'),
+):
+    """
+    Versão Server-Sent Events de /photos, para álbuns grandes: as fotos
+    chegam em lotes, uma página por vez, assim que ficam prontas.
+
+    Eventos: `resolved` (album_id), `album` (título, total e número de
+    páginas), `photos` (página, páginas concluídas, posição inicial e
+    fotos do lote, que podem chegar fora de ordem), `done` e `error`.
+
+    Exemplo: /stream/photos?url=https://user.smugmug.com/album-name
+    """
+    logger.info(f'Streaming photos from: {url}')
+    return _sse_response(
+        _event_stream('photos', request, components.service.stream_photos(url))
+    )
+
+
+@app.get('/stream/photos/{album_id}', tags=['Photos'])
+async def stream_album_photos_by_id(
+    request: Request,
+    album_id: str = Path(..., description='ID do álbum SmugMug'),
+):
+    """
+    Versão Server-Sent Events de /photos/{album_id}, com os mesmos
+    eventos de /stream/photos (menos `resolved`).
+
+    Exemplo: /stream/photos/n-ABC123
+    """
+    logger.info(f'Streaming photos from album ID: {album_id}')
+    return _sse_response(
+        _event_stream(
+            'photos_by_id',
+            request,
+            components.service.stream_photos_by_id(album_id),
+        )
+    )
 
 
 @app.get('/info', response_model=AlbumInfo, tags=['Info'])
+@profiled_endpoint
 async def get_album_info(
+    request: Request,
     url: str = Query(..., description='URL do álbum SmugMug'),
 ):
     """
@@ -85,14 +578,416 @@ async def get_album_info(
 
     Exemplo: /info?url=https://user.smugmug.com/album-name
     """
+    async with _admit('info', request):
+        try:
+            logger.info(f'Getting album info from: {url}')
+            with request_context(Priority.INTERACTIVE, _client_id(request)):
+                return await components.service.get_album_info(url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f'Error: {e}')
+            raise HTTPException(status_code=500, detail='Erro interno')
+
+
+@app.get('/search', response_model=SearchResponse, tags=['Photos'])
+async def search_photos(
+    q: str = Query(..., min_length=1, description='Termos da busca'),
+    album_id: Optional[str] = Query(None, description='Só neste álbum'),
+    limit: int = Query(50, ge=1, le=settings.SEARCH_MAX_RESULTS),
+):
+    """
+    Buscar fotos por título, legenda e palavras-chave entre os álbuns
+    já buscados, sem consultar o SmugMug. Cada termo vale como prefixo
+    e todos precisam aparecer; resultados por relevância.
+
+    Exemplo: /search?q=noiva bolo
+    """
+    if not settings.SEARCH_INDEX_ENABLED:
+        raise HTTPException(status_code=501, detail='Busca desativada')
     try:
-        logger.info(f'Getting album info from: {url}')
-        return await smugmug_service.get_album_info(url)
+        results = await components.search_index.search(q, limit, album_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f'Error: {e}')
         raise HTTPException(status_code=500, detail='Erro interno')
+    return SearchResponse(query=q, results=results)
+
+
+SELECTION_NAME_PATH = Path(
+    ...,
+    pattern=SELECTION_NAME.pattern,
+    description='Nome da seleção (ex.: o revisor)',
+)
+
+
+async def _selection(
+    album_id: str, name: str, bitmap, keys: bool = False
+) -> Selection:
+    image_keys = None
+    if keys:
+        image_keys = await components.selections.image_keys(album_id, bitmap)
+    return Selection(
+        album_id=album_id.removeprefix('n-'),
+        name=name,
+        count=len(bitmap),
+        bitmap=encode_bitmap(bitmap),
+        image_keys=image_keys,
+    )
+
+
+@app.get(
+    '/selections/{album_id}', response_model=SelectionList, tags=['Selections']
+)
+async def list_selections(
+    album_id: str = Path(..., description='ID do álbum SmugMug'),
+):
+    """Seleções do álbum e quantas fotos cada uma tem"""
+    try:
+        counts = await components.selections.list(album_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f'Error: {e}')
+        raise HTTPException(status_code=500, detail='Erro interno')
+    return SelectionList(
+        album_id=album_id.removeprefix('n-'),
+        selections=[
+            SelectionSummary(name=name, count=count)
+            for name, count in counts.items()
+        ],
+    )
+
+
+@app.get(
+    '/selections/{album_id}/ordinals',
+    response_model=AlbumOrdinals,
+    tags=['Selections'],
+)
+async def get_selection_ordinals(
+    request: Request,
+    album_id: str = Path(..., description='ID do álbum SmugMug'),
+):
+    """
+    ImageKeys do álbum na ordem dos ordinais usados nos bitmaps das
+    seleções. A ordem é estável: fotos novas entram no fim.
+    """
+    try:
+        with request_context(Priority.STANDARD, _client_id(request)):
+            image_keys = await components.selections.ordinals(album_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f'Error: {e}')
+        raise HTTPException(status_code=500, detail='Erro interno')
+    return AlbumOrdinals(
+        album_id=album_id.removeprefix('n-'), image_keys=image_keys
+    )
+
+
+@app.post(
+    '/selections/{album_id}/combine',
+    response_model=Selection,
+    tags=['Selections'],
+)
+async def combine_selections(
+    body: SelectionCombineRequest,
+    album_id: str = Path(..., description='ID do álbum SmugMug'),
+    keys: bool = Query(False, description='Incluir os ImageKeys'),
+):
+    """
+    União, interseção ou diferença (a primeira menos as demais) de
+    seleções do álbum, salva em `save_as` se informado.
+    """
+    try:
+        bitmap = await components.selections.combine(
+            album_id, body.op, body.names, body.save_as
+        )
+        return await _selection(
+            album_id, body.save_as or body.op, bitmap, keys
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f'Error: {e}')
+        raise HTTPException(status_code=500, detail='Erro interno')
+
+
+@app.get(
+    '/selections/{album_id}/{name}',
+    response_model=Selection,
+    tags=['Selections'],
+)
+async def get_selection(
+    album_id: str = Path(..., description='ID do álbum SmugMug'),
+    name: str = SELECTION_NAME_PATH,
+    keys: bool = Query(False, description='Incluir os ImageKeys'),
+):
+    """
+    Seleção como bitmap dos ordinais (compacto) e, com keys=true,
+    também como lista de ImageKeys.
+    """
+    try:
+        bitmap = await components.selections.get(album_id, name)
+        if bitmap is not None:
+            return await _selection(album_id, name, bitmap, keys)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f'Error: {e}')
+        raise HTTPException(status_code=500, detail='Erro interno')
+    raise HTTPException(status_code=404, detail='Seleção não encontrada')
+
+
+@app.post(
+    '/selections/{album_id}/{name}',
+    response_model=Selection,
+    tags=['Selections'],
+)
+async def update_selection(
+    request: Request,
+    body: SelectionUpdate,
+    album_id: str = Path(..., description='ID do álbum SmugMug'),
+    name: str = SELECTION_NAME_PATH,
+    keys: bool = Query(False, description='Incluir os ImageKeys'),
+):
+    """
+    Incluir (`add`) e retirar (`remove`) fotos da seleção, criando-a
+    se preciso. `bitmap` substitui a seleção inteira antes disso.
+
+    Exemplo: {"add": ["abc123", "def456"], "remove": ["ghi789"]}
+    """
+    try:
+        with request_context(Priority.INTERACTIVE, _client_id(request)):
+            bitmap = await components.selections.update(
+                album_id,
+                name,
+                add=body.add,
+                remove=body.remove,
+                bitmap=body.bitmap,
+            )
+        return await _selection(album_id, name, bitmap, keys)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f'Error: {e}')
+        raise HTTPException(status_code=500, detail='Erro interno')
+
+
+@app.delete('/selections/{album_id}/{name}', tags=['Selections'])
+async def delete_selection(
+    album_id: str = Path(..., description='ID do álbum SmugMug'),
+    name: str = SELECTION_NAME_PATH,
+):
+    """Apagar a seleção"""
+    try:
+        deleted = await components.selections.delete(album_id, name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f'Error: {e}')
+        raise HTTPException(status_code=500, detail='Erro interno')
+    if not deleted:
+        raise HTTPException(status_code=404, detail='Seleção não encontrada')
+    return Response(status_code=204)
+
+
+@app.get(
+    '/selections/{album_id}/{name}/export',
+    response_model=SelectionExport,
+    tags=['Selections'],
+)
+async def export_selection(
+    request: Request,
+    album_id: str = Path(..., description='ID do álbum SmugMug'),
+    name: str = SELECTION_NAME_PATH,
+    size: ImageSize = Query(ImageSize.LARGE, description='Tamanho das URLs'),
+):
+    """
+    URLs das fotos selecionadas no tamanho pedido, na ordem do álbum.
+
+    Exemplo: /selections/n-ABC123/ana/export?size=XLarge
+    """
+    try:
+        with request_context(Priority.STANDARD, _client_id(request)):
+            export = await components.selections.export(album_id, name, size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f'Error: {e}')
+        raise HTTPException(status_code=500, detail='Erro interno')
+    if export is None:
+        raise HTTPException(status_code=404, detail='Seleção não encontrada')
+    return export
+
+
+@app.get('/img/{image_key}/{size}', tags=['Photos'])
+async def get_image(
+    request: Request,
+    image_key: str = Path(..., description='ImageKey da foto'),
+    size: ImageSize = Path(..., description='Tamanho da imagem'),
+):
+    """
+    Servir uma imagem do álbum pelo cache local, buscando no CDN do
+    SmugMug só na primeira vez. Suporta requisições com Range.
+
+    Exemplo: /img/abc123/Thumb
+    """
+    try:
+        with request_context(Priority.STANDARD, _client_id(request)):
+            path = await components.image_proxy.acquire(image_key, size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f'Error: {e}')
+        raise HTTPException(status_code=500, detail='Erro interno')
+
+    try:
+        media_type = components.image_proxy.media_type(path)
+    except BaseException:
+        components.image_proxy.release(path)
+        raise
+    return _PinnedFileResponse(
+        path,
+        components.image_proxy.release,
+        media_type=media_type,
+        headers={'Cache-Control': 'public, max-age=86400'},
+    )
+
+
+@app.get(
+    '/contact-sheets/{album_id}',
+    response_model=ContactSheetManifest,
+    tags=['Photos'],
+)
+async def get_contact_sheets(
+    request: Request,
+    album_id: str = Path(..., description='ID do álbum SmugMug'),
+    size: ImageSize = Query(
+        ImageSize.THUMB, description='Tamanho das miniaturas (Thumb/Small)'
+    ),
+):
+    """
+    Gerar contact sheets do álbum: grades de miniaturas em poucos JPEGs
+    e, para cada foto, sua posição na grade.
+
+    Exemplo: /contact-sheets/n-ABC123?size=Thumb
+    """
+    if not components.contact_sheets.available():
+        raise HTTPException(
+            status_code=501, detail='Contact sheets requerem Pillow'
+        )
+    try:
+        logger.info(f'Building contact sheets for album ID: {album_id}')
+        with request_context(Priority.BULK, _client_id(request)):
+            return await components.contact_sheets.get_manifest(album_id, size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f'Error: {e}')
+        raise HTTPException(status_code=500, detail='Erro interno')
+
+
+@app.get('/contact-sheets/{album_id}/{version}/{page}.jpg', tags=['Photos'])
+async def get_contact_sheet_image(
+    album_id: str = Path(..., pattern=r'^[A-Za-z0-9]+$'),
+    version: str = Path(..., pattern=r'^[0-9a-f]+$'),
+    page: int = Path(..., ge=0),
+):
+    """Servir uma contact sheet já gerada"""
+    path = components.contact_sheets.sheet_path(album_id, version, page)
+    if not path.is_file():
+        raise HTTPException(
+            status_code=404, detail='Contact sheet não encontrada'
+        )
+    return FileResponse(
+        path,
+        media_type='image/jpeg',
+        headers={'Cache-Control': 'public, max-age=31536000, immutable'},
+    )
+
+
+JOB_ID_PATH = Path(..., pattern=r'^[0-9a-f]+$', description='ID do job')
+
+
+def _job_or_404(job) -> ExportJob:
+    if job is None:
+        raise HTTPException(status_code=404, detail='Job não encontrado')
+    return job.summary()
+
+
+@app.post('/jobs', response_model=ExportJob, status_code=202, tags=['Jobs'])
+async def create_job(body: ExportJobRequest):
+    """
+    Exportar álbuns inteiros em segundo plano. Retorna o job na fila;
+    acompanhe em /jobs/{job_id} e baixe em result_url quando terminar.
+
+    Exemplo: {"album_ids": ["n-ABC123", "n-DEF456"]}
+    """
+    job = await components.jobs.submit(body.album_ids)
+    return job.summary()
+
+
+@app.get('/jobs', response_model=List[ExportJob], tags=['Jobs'])
+async def list_jobs():
+    """Jobs de exportação, do mais recente ao mais antigo"""
+    return [job.summary() for job in components.jobs.list()]
+
+
+@app.get('/jobs/{job_id}', response_model=ExportJob, tags=['Jobs'])
+async def get_job(job_id: str = JOB_ID_PATH):
+    """Estado e progresso (páginas e fotos) do job"""
+    return _job_or_404(components.jobs.get(job_id))
+
+
+@app.post('/jobs/{job_id}/cancel', response_model=ExportJob, tags=['Jobs'])
+async def cancel_job(job_id: str = JOB_ID_PATH):
+    """Cancelar o job; as páginas já gravadas são mantidas"""
+    return _job_or_404(await components.jobs.cancel(job_id))
+
+
+@app.post('/jobs/{job_id}/retry', response_model=ExportJob, tags=['Jobs'])
+async def retry_job(job_id: str = JOB_ID_PATH):
+    """
+    Refazer só as páginas e álbuns que falharam (ou o que faltou, se o
+    job foi cancelado), aproveitando as páginas já gravadas.
+    """
+    try:
+        job = await components.jobs.retry(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _job_or_404(job)
+
+
+@app.delete('/jobs/{job_id}', tags=['Jobs'])
+async def delete_job(job_id: str = JOB_ID_PATH):
+    """Cancelar, se preciso, e apagar o job e seus arquivos"""
+    if not await components.jobs.delete(job_id):
+        raise HTTPException(status_code=404, detail='Job não encontrado')
+    return Response(status_code=204)
+
+
+@app.get('/jobs/{job_id}/result', tags=['Jobs'])
+async def get_job_result(job_id: str = JOB_ID_PATH):
+    """
+    Resultado do job concluído: lista JSON de AlbumResponse, lida das
+    páginas em disco à medida que é enviada.
+    """
+    _job_or_404(components.jobs.get(job_id))
+    try:
+        chunks = components.jobs.result(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return StreamingResponse(
+        chunks,
+        media_type='application/json',
+        headers={
+            'Content-Disposition': (
+                f'attachment; filename="export-{job_id}.json"'
+            )
+        },
+    )
 
 
 if __name__ == '__main__':
@@ -0,0 +1,208 @@
+import struct
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Contêineres de 2^16 posições, como no Roaring
+CHUNK_BITS = 1 << 16
+CHUNK_BYTES = CHUNK_BITS // 8
+# Acima disso, o contêiner de array fica maior que o bitmap
+ARRAY_MAX = CHUNK_BYTES // 2
+
+ARRAY, BITMAP, RUNS = 0, 1, 2
+INVALID = 'Bitmap inválido'
+OUT_OF_RANGE = 'Bitmap com ordinais fora do intervalo'
+_HEADER = struct.Struct('<H')
+_CONTAINER = struct.Struct('<HBH')
+_WORD = 8
+
+
+def _positions(data: bytes, base: int = 0) -> Iterator[int]:
+    """Posições dos bits ligados em `data` (little-endian)"""
+    for offset in range(0, len(data), _WORD):
+        word = int.from_bytes(data[offset : offset + _WORD], 'little')
+        position = base + offset * 8
+        while word:
+            low = word & -word
+            yield position + low.bit_length() - 1
+            word ^= low
+
+
+def _runs(positions: List[int]) -> List[Tuple[int, int]]:
+    """Sequências (início, tamanho) de posições consecutivas"""
+    runs: List[Tuple[int, int]] = []
+    for position in positions:
+        if runs and runs[-1][0] + runs[-1][1] == position:
+            runs[-1] = (runs[-1][0], runs[-1][1] + 1)
+        else:
+            runs.append((position, 1))
+    return runs
+
+
+def _set_range(chunk: bytearray, start: int, stop: int):
+    """Ligar os bits de start a stop - 1, byte a byte"""
+    first, last = start >> 3, (stop - 1) >> 3
+    low = (0xFF << (start & 7)) & 0xFF
+    high = 0xFF >> (7 - ((stop - 1) & 7))
+    if first == last:
+        chunk[first] |= low & high
+        return
+    chunk[first] |= low
+    chunk[first + 1 : last] = b'\xff' * (last - first - 1)
+    chunk[last] |= high
+
+
+def _read_container(
+    data: bytes, offset: int, kind: int, count: int
+) -> Tuple[int, int]:
+    """Bits do bloco (2^16 posições) e o offset do próximo"""
+    if kind == BITMAP:
+        chunk = data[offset : offset + CHUNK_BYTES]
+        if len(chunk) != CHUNK_BYTES:
+            raise ValueError(INVALID)
+        return int.from_bytes(chunk, 'little'), offset + CHUNK_BYTES
+    if kind not in {ARRAY, RUNS}:
+        raise ValueError(INVALID)
+
+    size = count if kind == ARRAY else 2 * count
+    values = struct.unpack_from(f'<{size}H', data, offset)
+    chunk = bytearray(CHUNK_BYTES)
+    if kind == ARRAY:
+        for position in values:
+            chunk[position >> 3] |= 1 << (position & 7)
+    else:
+        for start, extra in zip(values[::2], values[1::2]):
+            if start + extra >= CHUNK_BITS:
+                raise ValueError(INVALID)
+            _set_range(chunk, start, start + extra + 1)
+    return int.from_bytes(chunk, 'little'), offset + 2 * size
+
+
+def _read_containers(
+    data: bytes, max_key: Optional[int]
+) -> Iterator[Tuple[int, int]]:
+    """(chave, bits) de cada bloco; chaves acima de max_key nem são lidas"""
+    (total,) = _HEADER.unpack_from(data)
+    offset = _HEADER.size
+    for _ in range(total):
+        key, kind, count = _CONTAINER.unpack_from(data, offset)
+        if max_key is not None and key > max_key:
+            raise ValueError(OUT_OF_RANGE)
+        chunk, offset = _read_container(
+            data, offset + _CONTAINER.size, kind, count
+        )
+        yield key, chunk
+    if offset != len(data):
+        raise ValueError(INVALID)
+
+
+class Bitmap:
+    """
+    Conjunto imutável de ordinais (inteiros >= 0). Em memória é um
+    bitset num int do Python, em que união e interseção rodam em C; em
+    disco e na rede usa o formato em contêineres do Roaring (array,
+    bitmap ou sequências por bloco de 2^16, o que for menor).
+    """
+
+    __slots__ = ('_bits',)
+
+    def __init__(self, bits: int = 0):
+        self._bits = bits
+
+    @classmethod
+    def from_ordinals(cls, ordinals: Iterable[int]) -> 'Bitmap':
+        ordinals = list(ordinals)
+        if not ordinals:
+            return cls()
+        if min(ordinals) < 0:
+            raise ValueError('Ordinal negativo')
+        data = bytearray(max(ordinals) // 8 + 1)
+        for ordinal in ordinals:
+            data[ordinal >> 3] |= 1 << (ordinal & 7)
+        return cls(int.from_bytes(data, 'little'))
+
+    @classmethod
+    def range(cls, stop: int) -> 'Bitmap':
+        """Ordinais de 0 a stop - 1"""
+        return cls((1 << max(stop, 0)) - 1)
+
+    def __iter__(self) -> Iterator[int]:
+        return _positions(self._raw())
+
+    def __len__(self) -> int:
+        return self._bits.bit_count()
+
+    def __contains__(self, ordinal: int) -> bool:
+        return ordinal >= 0 and bool(self._bits >> ordinal & 1)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Bitmap) and self._bits == other._bits
+
+    def __hash__(self) -> int:
+        return hash(self._bits)
+
+    def __repr__(self) -> str:
+        return f'Bitmap({len(self)} ordinais)'
+
+    def __or__(self, other: 'Bitmap') -> 'Bitmap':
+        return Bitmap(self._bits | other._bits)
+
+    def __and__(self, other: 'Bitmap') -> 'Bitmap':
+        return Bitmap(self._bits & other._bits)
+
+    def __sub__(self, other: 'Bitmap') -> 'Bitmap':
+        return Bitmap(self._bits & ~other._bits)
+
+    def _raw(self) -> bytes:
+        return self._bits.to_bytes(
+            (self._bits.bit_length() + 7) // 8, 'little'
+        )
+
+    def to_bytes(self) -> bytes:
+        """Serializar em contêineres de 2^16 posições"""
+        raw = self._raw()
+        containers = []
+        for key, offset in enumerate(range(0, len(raw), CHUNK_BYTES)):
+            chunk = raw[offset : offset + CHUNK_BYTES]
+            positions = list(_positions(chunk))
+            if not positions:
+                continue
+            runs = _runs(positions)
+            sizes = {BITMAP: CHUNK_BYTES, RUNS: 4 * len(runs)}
+            if len(positions) <= ARRAY_MAX:
+                sizes[ARRAY] = 2 * len(positions)
+            kind = min(sizes, key=lambda kind: (sizes[kind], kind))
+            if kind == ARRAY:
+                count = len(positions)
+                payload = struct.pack(f'<{count}H', *positions)
+            elif kind == RUNS:
+                count = len(runs)
+                payload = struct.pack(
+                    f'<{2 * count}H',
+                    *[
+                        value
+                        for start, length in runs
+                        for value in (start, length - 1)
+                    ],
+                )
+            else:
+                count = 0
+                payload = chunk.ljust(CHUNK_BYTES, b'\0')
+            containers.append(_CONTAINER.pack(key, kind, count) + payload)
+        return _HEADER.pack(len(containers)) + b''.join(containers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, limit: Optional[int] = None) -> 'Bitmap':
+        """
+        Ler o formato de to_bytes. Com `limit`, ordinais a partir dele
+        são rejeitados, e blocos inteiros acima dele antes de montados
+        (um bitmap recebido não consegue alocar além do álbum).
+        """
+        max_key = None if limit is None else (limit - 1) >> 16
+        bits = 0
+        try:
+            for key, chunk in _read_containers(data, max_key):
+                bits |= chunk << (key * CHUNK_BITS)
+        except (struct.error, IndexError):
+            raise ValueError(INVALID) from None
+        if limit is not None and bits >> max(limit, 0):
+            raise ValueError(OUT_OF_RANGE)
+        return cls(bits)
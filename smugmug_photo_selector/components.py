@@ -0,0 +1,204 @@
+import asyncio
+from functools import cached_property
+
+from .admission import AdmissionLimiter
+from .config import Settings
+
+
+class Components:
+    """
+    Serviços da aplicação, criados sob demanda. Nada aqui é construído
+    na importação, e os módulos com dependências pesadas (numpy, Pillow,
+    SQLite, varredura do cache de imagens) só são importados quando um
+    endpoint que precisa deles é chamado.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+
+    @cached_property
+    def service(self):
+        from .smugmug_service import SmugMugService  # noqa: PLC0415
+
+        return SmugMugService()
+
+    @cached_property
+    def admission(self):
+        """Limitadores de admissão por endpoint"""
+        settings = self.settings
+
+        def limiter(concurrency: int) -> AdmissionLimiter:
+            return AdmissionLimiter(
+                concurrency,
+                max_queue=settings.ADMISSION_QUEUE_SIZE,
+                queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+                max_per_client=settings.ADMISSION_PER_CLIENT,
+            )
+
+        return {
+            'photos': limiter(settings.ADMISSION_PHOTOS_CONCURRENCY),
+            'photos_by_id': limiter(settings.ADMISSION_PHOTOS_CONCURRENCY),
+            'info': limiter(settings.ADMISSION_INFO_CONCURRENCY),
+            'photo': limiter(settings.ADMISSION_INFO_CONCURRENCY),
+        }
+
+    @cached_property
+    def warm_cache(self):
+        from .warm_cache import WarmCache  # noqa: PLC0415
+
+        return WarmCache(
+            self.settings.WARM_CACHE_PATH, self.settings.WARM_CACHE_ALBUMS
+        )
+
+    @cached_property
+    def snapshot_store(self):
+        from .snapshots import SnapshotStore  # noqa: PLC0415
+
+        return SnapshotStore(self.settings.SNAPSHOT_DIR)
+
+    @cached_property
+    def snapshot_exporter(self):
+        from .snapshots import SnapshotExporter  # noqa: PLC0415
+
+        return SnapshotExporter(
+            self.service,
+            self.snapshot_store,
+            concurrency=self.settings.SNAPSHOT_CONCURRENCY,
+        )
+
+    @cached_property
+    def image_proxy(self):
+        from .image_cache import DiskLRUCache  # noqa: PLC0415
+        from .image_proxy import ImageProxy  # noqa: PLC0415
+
+        return ImageProxy(
+            self.service,
+            DiskLRUCache(
+                self.settings.IMAGE_CACHE_DIR,
+                self.settings.IMAGE_CACHE_MAX_BYTES,
+            ),
+            pool_size=self.settings.IMAGE_PROXY_POOL_SIZE,
+            timeout=self.settings.REQUEST_TIMEOUT,
+        )
+
+    @cached_property
+    def contact_sheets(self):
+        from .contact_sheets import (  # noqa: PLC0415
+            ContactSheetBuilder,
+            SheetLayout,
+        )
+
+        return ContactSheetBuilder(
+            self.service,
+            self.image_proxy,
+            self.settings.CONTACT_SHEET_DIR,
+            SheetLayout(
+                columns=self.settings.CONTACT_SHEET_COLUMNS,
+                rows=self.settings.CONTACT_SHEET_ROWS,
+                cell=self.settings.CONTACT_SHEET_CELL,
+            ),
+            workers=self.settings.OFFLOAD_PROCESS_WORKERS,
+        )
+
+    @cached_property
+    def duplicate_detector(self):
+        from .duplicates import DuplicateDetector  # noqa: PLC0415
+        from .storage import KeyValueStore  # noqa: PLC0415
+
+        return DuplicateDetector(
+            self.image_proxy,
+            KeyValueStore(self.settings.SQLITE_PATH, 'image_hashes'),
+            max_distance=self.settings.DUPLICATE_MAX_DISTANCE,
+            workers=self.settings.OFFLOAD_PROCESS_WORKERS,
+        )
+
+    @cached_property
+    def metadata_enricher(self):
+        from .metadata import MetadataEnricher  # noqa: PLC0415
+        from .storage import KeyValueStore  # noqa: PLC0415
+
+        return MetadataEnricher(
+            self.service,
+            KeyValueStore(self.settings.SQLITE_PATH, 'image_metadata'),
+            concurrency=self.settings.METADATA_CONCURRENCY,
+        )
+
+    @cached_property
+    def selections(self):
+        from .selections import SelectionSets  # noqa: PLC0415
+        from .storage import KeyValueStore  # noqa: PLC0415
+
+        return SelectionSets(
+            self.service,
+            KeyValueStore(self.settings.SQLITE_PATH, 'selections'),
+            KeyValueStore(self.settings.SQLITE_PATH, 'selection_ordinals'),
+            max_albums=self.settings.SELECTION_ORDINAL_ALBUMS,
+        )
+
+    @cached_property
+    def jobs(self):
+        from .jobs import JobLimits, JobQueue  # noqa: PLC0415
+
+        return JobQueue(
+            self.service,
+            self.settings.JOBS_DIR,
+            JobLimits(
+                workers=self.settings.JOB_WORKERS,
+                page_size=self.settings.IMAGES_PAGE_SIZE,
+                page_concurrency=self.settings.JOB_PAGE_CONCURRENCY,
+                attempts=self.settings.JOB_PAGE_ATTEMPTS,
+                retry_delay=self.settings.JOB_RETRY_DELAY,
+            ),
+        )
+
+    @cached_property
+    def search_index(self):
+        from .search import SearchIndex  # noqa: PLC0415
+
+        return SearchIndex(self.settings.SEARCH_INDEX_PATH)
+
+    def _index_album(self, album):
+        # O índice (e o SQLite) só é aberto no primeiro álbum buscado
+        self.search_index.submit(album)
+
+    async def startup(self):
+        """
+        Criar o serviço (validando as credenciais), ligar o índice de
+        busca, restaurar o cache, retomar os jobs de exportação e
+        agendar os snapshots em segundo plano, sem atrasar a primeira
+        resposta.
+        """
+        if self.settings.SEARCH_INDEX_ENABLED:
+            self.service.album_listeners.append(self._index_album)
+        self._warm_load = asyncio.ensure_future(
+            self.warm_cache.load(self.service)
+        )
+        await self.jobs.start()
+        self._snapshot_task = None
+        if (
+            self.settings.SNAPSHOT_ALBUMS
+            and self.settings.SNAPSHOT_INTERVAL > 0
+        ):
+            self._snapshot_task = asyncio.ensure_future(
+                self.snapshot_exporter.run_forever(
+                    self.settings.SNAPSHOT_ALBUMS,
+                    self.settings.SNAPSHOT_INTERVAL,
+                )
+            )
+
+    def shutdown(self):
+        from . import offload  # noqa: PLC0415
+
+        if 'jobs' in self.__dict__:
+            self.jobs.stop()
+        snapshot_task = getattr(self, '_snapshot_task', None)
+        if snapshot_task is not None:
+            snapshot_task.cancel()
+        warm_load = getattr(self, '_warm_load', None)
+        if warm_load is not None and not warm_load.done():
+            warm_load.cancel()
+        elif 'service' in self.__dict__:
+            self.warm_cache.save(self.service)
+        if 'search_index' in self.__dict__:
+            self.search_index.close()
+        offload.shutdown_process_pool()
@@ -1,8 +1,17 @@
-from typing import Optional
+from typing import List, Optional
 
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 
 
+class OAuthCredential(BaseModel):
+    api_key: str
+    api_secret: str
+    access_token: str
+    access_token_secret: str
+    name: Optional[str] = None
+
+
 class Settings(BaseSettings):
     # Servidor
     HOST: str = '0.0.0.0'
@@ -20,10 +29,108 @@ class Settings(BaseSettings):
     SMUGMUG_ACCESS_TOKEN: Optional[str] = None
     SMUGMUG_ACCESS_TOKEN_SECRET: Optional[str] = None
 
+    # Pool de credenciais (JSON com lista de OAuthCredential). Quando
+    # preenchido, substitui as credenciais avulsas acima.
+    SMUGMUG_CREDENTIALS: List[OAuthCredential] = []
+    CREDENTIAL_SELECTION: str = 'least_loaded'  # ou 'round_robin'
+    CREDENTIAL_BACKOFF_BASE: float = 30.0
+    CREDENTIAL_BACKOFF_MAX: float = 600.0
+    # Assinatura OAuth com estado pré-calculado (False usa o OAuth1 padrão)
+    SMUGMUG_FAST_SIGNING: bool = True
+
     # Timeouts
     REQUEST_TIMEOUT: int = 30
     MAX_RETRIES: int = 3
 
+    # Paginação de /photos e das páginas de !images
+    MAX_PAGE_SIZE: int = 1000
+    IMAGES_PAGE_SIZE: int = 1000
+
+    # Álbuns completos em memória (revalidados por DateModified) e quantos
+    # dos mais acessados são salvos em disco para o próximo início
+    ALBUM_CACHE_SIZE: int = 10
+    WARM_CACHE_PATH: str = '.cache/warm-cache.json'
+    WARM_CACHE_ALBUMS: int = 5
+
+    # Índice ImageKey -> foto dos álbuns buscados, para /photos/{id}/{key};
+    # acima deste número de ausentes, o álbum é buscado inteiro
+    PHOTO_INDEX_ALBUMS: int = 200
+    PHOTO_LOOKUP_MAX_FALLBACK: int = 20
+
+    # Agendador de requisições ao SmugMug
+    MAX_CONCURRENT_REQUESTS: int = 8
+    RESERVED_INTERACTIVE_SLOTS: int = 1
+
+    # Controle de admissão de /photos, /photos/{album_id} e /info: vagas
+    # por endpoint, fila de espera com prazo e, além disso, 503
+    ADMISSION_PHOTOS_CONCURRENCY: int = 4
+    ADMISSION_INFO_CONCURRENCY: int = 16
+    ADMISSION_QUEUE_SIZE: int = 32
+    ADMISSION_QUEUE_TIMEOUT: float = 10.0
+    ADMISSION_PER_CLIENT: int = 0  # 0 desabilita o limite por cliente
+
+    # Perfil sob demanda (?profile=1 ou ?profile=sample) para quem
+    # enviar este token em X-Admin-Token; sem token, desligado
+    PROFILING_TOKEN: Optional[str] = None
+    PROFILING_INTERVAL: float = 0.005
+    PROFILING_KEEP: int = 20
+
+    # Decodificação/conversão de páginas grandes fora do event loop
+    OFFLOAD_PROCESS_WORKERS: int = 1  # 0 desabilita o pool de processos
+    OFFLOAD_INLINE_BYTES: int = 64 * 1024
+    OFFLOAD_MIN_IMAGES: int = 1000
+
+    # Intervalo dos comentários de keepalive nos streams SSE (/stream)
+    SSE_KEEPALIVE: float = 15.0
+
+    # Proxy de imagens (/img) com cache LRU em disco. Arquivos em uso
+    # (respostas em envio, miniaturas de contact sheets/duplicatas) ficam
+    # fixados e podem passar do limite por um tempo; o limite deve caber
+    # com folga as miniaturas do maior álbum mais as imagens servidas
+    IMAGE_CACHE_DIR: str = '.cache/images'
+    IMAGE_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    IMAGE_PROXY_POOL_SIZE: int = 16
+
+    # Contact sheets (requer Pillow)
+    CONTACT_SHEET_DIR: str = '.cache/contact-sheets'
+    CONTACT_SHEET_COLUMNS: int = 16
+    CONTACT_SHEET_ROWS: int = 16
+    CONTACT_SHEET_CELL: int = 150
+
+    # Snapshots estáticos de /photos/{album_id}: álbuns exportados,
+    # intervalo de atualização (0 desliga) e idade máxima para servir
+    SNAPSHOT_DIR: str = '.cache/snapshots'
+    SNAPSHOT_ALBUMS: List[str] = []
+    SNAPSHOT_INTERVAL: float = 300.0
+    SNAPSHOT_MAX_AGE: float = 900.0
+    SNAPSHOT_CONCURRENCY: int = 4
+
+    # Jobs de exportação (/jobs): estado e páginas em disco, jobs
+    # simultâneos, páginas simultâneas por job e tentativas por página
+    JOBS_DIR: str = '.cache/jobs'
+    JOB_WORKERS: int = 2
+    JOB_PAGE_CONCURRENCY: int = 4
+    JOB_PAGE_ATTEMPTS: int = 3
+    JOB_RETRY_DELAY: float = 2.0
+
+    # Caches persistentes em SQLite (hashes, metadados...)
+    SQLITE_PATH: str = '.cache/smugmug.sqlite3'
+
+    # Busca (/search) por título, legenda e palavras-chave das fotos dos
+    # álbuns já buscados, indexados à medida que são buscados
+    SEARCH_INDEX_ENABLED: bool = True
+    SEARCH_INDEX_PATH: str = '.cache/search.sqlite3'
+    SEARCH_MAX_RESULTS: int = 200
+
+    # Seleções por álbum (/selections): álbuns com ordinais em memória
+    SELECTION_ORDINAL_ALBUMS: int = 20
+
+    # EXIF das fotos (metadata=true): buscas de !metadata simultâneas
+    METADATA_CONCURRENCY: int = 8
+
+    # Detecção de quase duplicatas (requer numpy e Pillow)
+    DUPLICATE_MAX_DISTANCE: int = 6
+
     class Config:
         env_file = '.env'
 
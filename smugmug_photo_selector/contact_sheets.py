@@ -0,0 +1,250 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import offload
+from .models import (
+    AlbumResponse,
+    ContactSheet,
+    ContactSheetManifest,
+    ImageSize,
+    Photo,
+    SpriteEntry,
+)
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - dependência opcional
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+SHEET_SIZES = {ImageSize.THUMB, ImageSize.SMALL}
+MANIFEST_FILE = 'manifest.json'
+BACKGROUND = (32, 32, 32)
+DOWNLOAD_CONCURRENCY = 16
+
+Offset = Optional[Tuple[int, int, int, int]]
+
+
+@dataclass(frozen=True)
+class SheetLayout:
+    columns: int = 16
+    rows: int = 16
+    cell: int = 150
+
+
+def render_sheet(
+    paths: List[Optional[str]],
+    columns: int,
+    cell: int,
+    out_path: str,
+    quality: int = 80,
+) -> List[Offset]:
+    """
+    Montar a grade de miniaturas em um JPEG (executável no pool de
+    processos). Retorna (x, y, largura, altura) de cada foto.
+    """
+    rows = max(-(-len(paths) // columns), 1)
+    sheet = Image.new('RGB', (columns * cell, rows * cell), BACKGROUND)
+    offsets: List[Offset] = []
+
+    for index, path in enumerate(paths):
+        if path is None:
+            offsets.append(None)
+            continue
+        try:
+            with Image.open(path) as source:
+                source.draft('RGB', (cell, cell))
+                image = source.convert('RGB')
+                image.thumbnail((cell, cell))
+        except OSError:
+            offsets.append(None)
+            continue
+
+        row, column = divmod(index, columns)
+        x = column * cell + (cell - image.width) // 2
+        y = row * cell + (cell - image.height) // 2
+        sheet.paste(image, (x, y))
+        offsets.append((x, y, image.width, image.height))
+
+    temp_path = f'{out_path}.tmp'
+    sheet.save(temp_path, 'JPEG', quality=quality, optimize=True)
+    os.replace(temp_path, out_path)
+    return offsets
+
+
+class ContactSheetBuilder:
+    """
+    Gerar contact sheets paginadas de um álbum, guardadas em disco por
+    versão do álbum (fotos, URLs das miniaturas e layout).
+    """
+
+    def __init__(
+        self,
+        service,
+        image_proxy,
+        directory: str,
+        layout: SheetLayout = SheetLayout(),
+        workers: int = 1,
+    ):
+        self.service = service
+        self.image_proxy = image_proxy
+        self.directory = Path(directory)
+        self.columns = layout.columns
+        self.rows = layout.rows
+        self.cell = layout.cell
+        self.workers = workers
+        self._building: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    @staticmethod
+    def available() -> bool:
+        return Image is not None
+
+    def _version(self, album: AlbumResponse, size: ImageSize) -> str:
+        # As URLs do SmugMug mudam quando a foto é reeditada
+        raw = ':'.join([
+            album.album_id,
+            ','.join(f'{p.id}={p.thumbnail_url}' for p in album.photos),
+            size.value,
+            f'{self.columns}x{self.rows}@{self.cell}',
+        ])
+        return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+    def sheet_path(self, album_key: str, version: str, page: int) -> Path:
+        return self.directory / album_key / version / f'{page}.jpg'
+
+    async def get_manifest(
+        self, album_id: str, size: ImageSize = ImageSize.THUMB
+    ) -> ContactSheetManifest:
+        """Manifesto das contact sheets do álbum, gerando se preciso"""
+        if size not in SHEET_SIZES:
+            raise ValueError('Contact sheets só com tamanhos Thumb ou Small')
+
+        album = await self.service.get_all_photos_by_id(album_id)
+        version = self._version(album, size)
+        manifest_path = self.directory / album.album_id / version
+        manifest_path /= MANIFEST_FILE
+
+        if manifest_path.exists():
+            return ContactSheetManifest.model_validate_json(
+                manifest_path.read_bytes()
+            )
+
+        key = (album.album_id, version)
+        future = self._building.get(key)
+        if future is None:
+            future = asyncio.ensure_future(
+                self._build(album, size, version, manifest_path)
+            )
+            self._building[key] = future
+            future.add_done_callback(lambda _: self._building.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def _download(
+        self, photos: List[Photo], size: ImageSize, acquired: List[Path]
+    ) -> List[Optional[str]]:
+        # As URLs já vieram com o álbum: nada de /image por foto
+        self.image_proxy.remember(photos)
+        semaphore = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+
+        async def fetch(image_key: str) -> Optional[str]:
+            async with semaphore:
+                try:
+                    path = await self.image_proxy.acquire(image_key, size)
+                except Exception as e:
+                    logger.warning(f'Contact sheet sem {image_key}: {e}')
+                    return None
+                acquired.append(path)
+                return str(path)
+
+        return await asyncio.gather(*[fetch(photo.id) for photo in photos])
+
+    async def _build(
+        self,
+        album: AlbumResponse,
+        size: ImageSize,
+        version: str,
+        manifest_path: Path,
+    ) -> ContactSheetManifest:
+        version_dir = manifest_path.parent
+        version_dir.mkdir(parents=True, exist_ok=True)
+
+        per_sheet = self.columns * self.rows
+        pages = range(0, max(len(album.photos), 1), per_sheet)
+        pool = offload.get_process_pool(self.workers)
+        loop = asyncio.get_running_loop()
+        # Miniaturas fixadas no cache até o pool terminar de lê-las
+        acquired: List[Path] = []
+        try:
+            paths = await self._download(album.photos, size, acquired)
+            results = await asyncio.gather(*[
+                loop.run_in_executor(
+                    pool,
+                    render_sheet,
+                    paths[start : start + per_sheet],
+                    self.columns,
+                    self.cell,
+                    str(self.sheet_path(album.album_id, version, page)),
+                )
+                for page, start in enumerate(pages)
+            ])
+        finally:
+            for path in acquired:
+                self.image_proxy.release(path)
+
+        sheets = []
+        for page, (start, offsets) in enumerate(zip(pages, results)):
+            photos = album.photos[start : start + per_sheet]
+            sheets.append(
+                ContactSheet(
+                    page=page,
+                    url=(
+                        f'/contact-sheets/{album.album_id}/{version}/'
+                        f'{page}.jpg'
+                    ),
+                    photos=[
+                        SpriteEntry(
+                            id=photo.id,
+                            x=o[0],
+                            y=o[1],
+                            width=o[2],
+                            height=o[3],
+                        )
+                        for photo, o in zip(photos, offsets)
+                        if o is not None
+                    ],
+                )
+            )
+
+        manifest = ContactSheetManifest(
+            album_id=album.album_id,
+            album_title=album.album_title,
+            version=version,
+            size=size,
+            columns=self.columns,
+            rows=self.rows,
+            cell_size=self.cell,
+            total_photos=album.total_photos,
+            sheets=sheets,
+        )
+        await loop.run_in_executor(
+            None, self._write_manifest, manifest, manifest_path
+        )
+        return manifest
+
+    @staticmethod
+    def _write_manifest(manifest: ContactSheetManifest, path: Path):
+        temp_path = path.with_suffix('.tmp')
+        temp_path.write_text(manifest.model_dump_json())
+        os.replace(temp_path, path)
+
+        # Versões antigas do álbum não são mais servidas
+        for sibling in path.parent.parent.iterdir():
+            if sibling != path.parent and sibling.is_dir():
+                shutil.rmtree(sibling, ignore_errors=True)
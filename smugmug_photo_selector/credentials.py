@@ -0,0 +1,189 @@
+import itertools
+import time
+from http import HTTPStatus
+from typing import List, Optional
+
+from .models import CredentialStats
+from .signing import FastOAuth1
+
+ROUND_ROBIN = 'round_robin'
+LEAST_LOADED = 'least_loaded'
+
+
+class Credential:
+    """Par API key/token com seu estado de uso e saúde"""
+
+    def __init__(self, name: str, auth):
+        self.name = name
+        self.auth = auth
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.throttled = 0
+        self.consecutive_throttles = 0
+        self.cooldown_until = 0.0
+        self.last_used = 0.0
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+
+class CredentialPool:
+    """
+    Distribuir as requisições entre várias credenciais OAuth, afastando
+    temporariamente as que recebem 429 do SmugMug.
+    """
+
+    def __init__(
+        self,
+        credentials: List[Credential],
+        strategy: str = LEAST_LOADED,
+        backoff_base: float = 30.0,
+        backoff_max: float = 600.0,
+    ):
+        if not credentials:
+            raise ValueError('Credenciais OAuth não configuradas')
+        if strategy not in {ROUND_ROBIN, LEAST_LOADED}:
+            raise ValueError(f'Estratégia de credenciais inválida: {strategy}')
+
+        self.credentials = credentials
+        self.strategy = strategy
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._order = itertools.cycle(range(len(credentials)))
+
+    def __len__(self) -> int:
+        return len(self.credentials)
+
+    @classmethod
+    def from_settings(cls, settings) -> 'CredentialPool':
+        """Montar o pool a partir da lista ou das credenciais avulsas"""
+        auth_class = FastOAuth1
+        if not settings.SMUGMUG_FAST_SIGNING:
+            # Importado só quando usado: oauthlib pesa no início a frio
+            from requests_oauthlib import OAuth1  # noqa: PLC0415
+
+            auth_class = OAuth1
+        configured = list(settings.SMUGMUG_CREDENTIALS or [])
+        if not configured:
+            if not all([
+                settings.SMUGMUG_API_KEY,
+                settings.SMUGMUG_API_SECRET,
+                settings.SMUGMUG_ACCESS_TOKEN,
+                settings.SMUGMUG_ACCESS_TOKEN_SECRET,
+            ]):
+                raise ValueError('Credenciais OAuth não configuradas')
+            auth = auth_class(
+                client_key=settings.SMUGMUG_API_KEY,
+                client_secret=settings.SMUGMUG_API_SECRET,
+                resource_owner_key=settings.SMUGMUG_ACCESS_TOKEN,
+                resource_owner_secret=settings.SMUGMUG_ACCESS_TOKEN_SECRET,
+            )
+            credentials = [Credential(_mask(settings.SMUGMUG_API_KEY), auth)]
+        else:
+            credentials = [
+                Credential(
+                    item.name or f'{_mask(item.api_key)}#{index}',
+                    auth_class(
+                        client_key=item.api_key,
+                        client_secret=item.api_secret,
+                        resource_owner_key=item.access_token,
+                        resource_owner_secret=item.access_token_secret,
+                    ),
+                )
+                for index, item in enumerate(configured)
+            ]
+
+        return cls(
+            credentials,
+            strategy=settings.CREDENTIAL_SELECTION,
+            backoff_base=settings.CREDENTIAL_BACKOFF_BASE,
+            backoff_max=settings.CREDENTIAL_BACKOFF_MAX,
+        )
+
+    def acquire(self) -> Credential:
+        """Escolher a credencial para a próxima requisição"""
+        now = time.monotonic()
+        available = [c for c in self.credentials if c.is_available(now)]
+        if not available:
+            raise ValueError('Rate limit excedido')
+
+        if self.strategy == ROUND_ROBIN:
+            for _ in range(len(self.credentials)):
+                credential = self.credentials[next(self._order)]
+                if credential.is_available(now):
+                    break
+        else:
+            # Menor carga; empate resolvido pela usada há mais tempo
+            credential = min(
+                available, key=lambda c: (c.in_flight, c.last_used)
+            )
+
+        credential.in_flight += 1
+        credential.requests += 1
+        credential.last_used = now
+        return credential
+
+    def release(
+        self,
+        credential: Credential,
+        status_code: Optional[int],
+        retry_after: Optional[str] = None,
+    ) -> bool:
+        """
+        Registrar o resultado da requisição. Retorna True se a
+        credencial foi afastada por rate limit.
+        """
+        credential.in_flight -= 1
+
+        if status_code == HTTPStatus.TOO_MANY_REQUESTS:
+            credential.throttled += 1
+            credential.consecutive_throttles += 1
+            backoff = min(
+                self.backoff_base
+                * 2 ** (credential.consecutive_throttles - 1),
+                self.backoff_max,
+            )
+            delay = _parse_retry_after(retry_after)
+            credential.cooldown_until = time.monotonic() + max(
+                backoff, delay or 0.0
+            )
+            return True
+
+        if (
+            status_code is None
+            or status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+        ):
+            credential.failures += 1
+        credential.consecutive_throttles = 0
+        return False
+
+    def has_available(self) -> bool:
+        now = time.monotonic()
+        return any(c.is_available(now) for c in self.credentials)
+
+    def stats(self) -> List[CredentialStats]:
+        now = time.monotonic()
+        return [
+            CredentialStats(
+                name=c.name,
+                available=c.is_available(now),
+                in_flight=c.in_flight,
+                requests=c.requests,
+                failures=c.failures,
+                throttled=c.throttled,
+                cooldown_seconds=round(max(c.cooldown_until - now, 0.0), 1),
+            )
+            for c in self.credentials
+        ]
+
+
+def _mask(api_key: str) -> str:
+    return f'{api_key[:4]}…'
+
+
+def _parse_retry_after(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,286 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from . import offload
+from .models import AlbumResponse, ImageSize
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:  # pragma: no cover - dependências opcionais
+    np = None
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+HASH_BATCH = 256
+DOWNLOAD_CONCURRENCY = 16
+# Baldes maiores que isso são divididos de novo; os menores são
+# comparados par a par, PAIR_SLICE pares por vez
+BUCKET_SPLIT = 1024
+PAIR_SLICE = 1 << 18
+
+if np is not None:
+    _M1 = np.uint64(0x5555555555555555)
+    _M2 = np.uint64(0x3333333333333333)
+    _M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+    _H01 = np.uint64(0x0101010101010101)
+
+
+def compute_dhashes(paths: List[str]) -> List[Optional[str]]:
+    """
+    dHash de 64 bits de cada imagem (executável no pool de processos).
+    A decodificação é por imagem; a comparação de pixels e o
+    empacotamento dos bits são feitos no lote inteiro com NumPy.
+    """
+    pixels = np.zeros((len(paths), 8, 9), dtype=np.int16)
+    valid = np.zeros(len(paths), dtype=bool)
+
+    for index, path in enumerate(paths):
+        try:
+            with Image.open(path) as image:
+                image.draft('L', (36, 32))
+                small = image.convert('L').resize(
+                    (9, 8), Image.Resampling.BILINEAR
+                )
+        except OSError:
+            continue
+        pixels[index] = np.asarray(small, dtype=np.int16)
+        valid[index] = True
+
+    bits = pixels[:, :, 1:] > pixels[:, :, :-1]
+    packed = np.packbits(bits.reshape(len(paths), HASH_BITS), axis=1)
+    hashes = packed.view('>u8').ravel()
+
+    return [
+        f'{int(value):016x}' if ok else None
+        for value, ok in zip(hashes, valid)
+    ]
+
+
+def _popcount(values):
+    """Contagem de bits de um array uint64"""
+    if hasattr(np, 'bitwise_count'):  # NumPy 2
+        return np.bitwise_count(values)
+    # SWAR: somas de bits em paralelo dentro de cada palavra
+    counts = values - ((values >> np.uint64(1)) & _M1)
+    counts = (counts & _M2) + ((counts >> np.uint64(2)) & _M2)
+    counts = (counts + (counts >> np.uint64(4))) & _M4
+    return (counts * _H01) >> np.uint64(56)
+
+
+def _compress(parent):
+    """Apontar cada nó direto para a raiz (floresta em array NumPy)"""
+    while True:
+        grandparent = parent[parent]
+        if np.array_equal(grandparent, parent):
+            return
+        parent[:] = grandparent
+
+
+def _union(parent, left, right):
+    """
+    Unir os pares (left[i], right[i]) na floresta, com operações sobre
+    o lote inteiro: a raiz maior passa a apontar para a menor, até que
+    os dois lados de todo par tenham a mesma raiz.
+    """
+    while len(left):
+        left, right = parent[left], parent[right]
+        differ = left != right
+        left, right = left[differ], right[differ]
+        np.minimum.at(parent, np.maximum(left, right), np.minimum(left, right))
+        _compress(parent)
+
+
+def _compare(unique, bucket, max_distance: int):
+    """
+    Pares próximos do balde, comparando uma fatia de linhas por vez
+    com as colunas à frente dela (memória limitada a PAIR_SLICE pares)
+    """
+    values = unique[bucket]
+    step = max(1, PAIR_SLICE // len(bucket))
+    for start in range(0, len(bucket) - 1, step):
+        rows = np.arange(start, min(start + step, len(bucket)))
+        columns = np.arange(start, len(bucket))
+        distances = _popcount(values[rows, None] ^ values[None, start:])
+        close = (distances <= max_distance) & (columns > rows[:, None])
+        left, right = np.nonzero(close)
+        yield bucket[rows[left]], bucket[columns[right]]
+
+
+def _near_pairs(unique, max_distance: int, bucket=None):
+    """
+    Lotes de pares (dois arrays de índices) de hashes a até
+    `max_distance` bits de distância, por multi-index hashing: com os
+    bits que variam no balde divididos em max_distance + 1 blocos, dois
+    hashes próximos coincidem em pelo menos um bloco inteiro, então só
+    pares do mesmo sub-balde são comparados. Sub-baldes grandes (hashes
+    de uma mesma sessão que compartilham muitos bits) são divididos de
+    novo pelos bits que ainda variam neles.
+    """
+    if bucket is None:
+        bucket = np.arange(len(unique))
+    values = unique[bucket]
+    varying = int(np.bitwise_or.reduce(values ^ values[0]))
+    positions = [bit for bit in range(HASH_BITS) if varying >> bit & 1]
+    if len(positions) <= max_distance:
+        # Diferem em no máximo max_distance bits: todos são próximos
+        yield np.full(len(bucket) - 1, bucket[0]), bucket[1:]
+        return
+
+    groups = []
+    for block in np.array_split(positions, max_distance + 1):
+        mask = np.uint64(sum(1 << int(bit) for bit in block))
+        keys = values & mask
+        order = np.argsort(keys, kind='stable')
+        boundaries = np.flatnonzero(np.diff(keys[order])) + 1
+        groups.extend(np.split(order, boundaries))
+    # Com poucos bits variando os blocos quase não separam: comparar o
+    # balde inteiro sai mais barato que comparar cada sub-balde
+    if sum(len(group) ** 2 for group in groups) >= len(bucket) ** 2:
+        yield from _compare(unique, bucket, max_distance)
+        return
+
+    for group in groups:
+        if len(group) > BUCKET_SPLIT:
+            # O bloco varia no balde, então o sub-balde é menor
+            yield from _near_pairs(unique, max_distance, bucket[group])
+        elif len(group) > 1:
+            yield from _compare(unique, bucket[group], max_distance)
+
+
+def group_near_duplicates(
+    hashes: List[Optional[str]], max_distance: int
+) -> List[Optional[int]]:
+    """
+    Agrupar hashes próximos. Retorna o cluster de cada hash (None para
+    fotos sem duplicata), numerados na ordem em que aparecem.
+    """
+    present = [i for i, h in enumerate(hashes) if h is not None]
+    if not present:
+        return [None] * len(hashes)
+
+    values = np.array([int(hashes[i], 16) for i in present], dtype=np.uint64)
+    # Hashes idênticos viram um só; a busca roda sobre os distintos
+    unique, inverse = np.unique(values, return_inverse=True)
+    parent = np.arange(len(unique))
+    for left, right in _near_pairs(unique, max_distance):
+        _union(parent, left, right)
+
+    roots = parent[inverse.ravel()].tolist()
+    sizes: Dict[int, int] = {}
+    for root in roots:
+        sizes[root] = sizes.get(root, 0) + 1
+
+    cluster_ids: Dict[int, int] = {}
+    clusters: List[Optional[int]] = [None] * len(hashes)
+    for position, root in zip(present, roots):
+        if sizes[root] > 1:
+            clusters[position] = cluster_ids.setdefault(
+                root, len(cluster_ids) + 1
+            )
+    return clusters
+
+
+class DuplicateDetector:
+    """
+    Marcar fotos quase idênticas (rajadas) de um álbum com o mesmo
+    cluster_id, guardando os hashes por ImageKey para as próximas vezes.
+    """
+
+    def __init__(self, image_proxy, store, max_distance: int, workers: int):
+        self.image_proxy = image_proxy
+        self.store = store
+        self.max_distance = max_distance
+        self.workers = workers
+
+    @staticmethod
+    def available() -> bool:
+        return np is not None and Image is not None
+
+    async def _hash_missing(self, photos) -> Dict[str, str]:
+        # As miniaturas já vieram com o álbum: nada de /image por foto
+        self.image_proxy.remember(photos)
+        semaphore = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+        # Miniaturas fixadas no cache até o pool terminar de lê-las
+        acquired = []
+
+        async def download(image_key: str) -> Optional[str]:
+            async with semaphore:
+                try:
+                    path = await self.image_proxy.acquire(
+                        image_key, ImageSize.THUMB
+                    )
+                except Exception as e:
+                    logger.warning(f'Sem miniatura para {image_key}: {e}')
+                    return None
+                acquired.append(path)
+                return str(path)
+
+        pool = offload.get_process_pool(self.workers)
+        loop = asyncio.get_running_loop()
+        try:
+            paths = await asyncio.gather(*[download(p.id) for p in photos])
+            ready = [(p, path) for p, path in zip(photos, paths) if path]
+            batches = [
+                ready[i : i + HASH_BATCH]
+                for i in range(0, len(ready), HASH_BATCH)
+            ]
+            results = await asyncio.gather(*[
+                loop.run_in_executor(
+                    pool, compute_dhashes, [path for _, path in batch]
+                )
+                for batch in batches
+            ])
+        finally:
+            for path in acquired:
+                self.image_proxy.release(path)
+
+        computed = {
+            photo.id: (photo.thumbnail_url, value)
+            for batch, hashes in zip(batches, results)
+            for (photo, _), value in zip(batch, hashes)
+            if value is not None
+        }
+        await loop.run_in_executor(
+            None,
+            self.store.put_many,
+            [(key, list(entry)) for key, entry in computed.items()],
+        )
+        return {key: value for key, (_, value) in computed.items()}
+
+    async def annotate(self, album: AlbumResponse) -> AlbumResponse:
+        """Preencher cluster_id nas fotos do álbum"""
+        loop = asyncio.get_running_loop()
+        cached = await loop.run_in_executor(
+            None, self.store.get_many, [p.id for p in album.photos]
+        )
+
+        # O hash vale enquanto a miniatura for a mesma (foto não reeditada)
+        hashes = {
+            photo.id: cached[photo.id][1]
+            for photo in album.photos
+            if photo.id in cached
+            and cached[photo.id][0] == photo.thumbnail_url
+        }
+        missing = [p for p in album.photos if p.id not in hashes]
+        if missing:
+            hashes.update(await self._hash_missing(missing))
+
+        clusters = await loop.run_in_executor(
+            None,
+            group_near_duplicates,
+            [hashes.get(p.id) for p in album.photos],
+            self.max_distance,
+        )
+        # Cópias: o álbum pode estar no cache do serviço
+        return album.model_copy(
+            update={
+                'photos': [
+                    photo.model_copy(update={'cluster_id': cluster_id})
+                    for photo, cluster_id in zip(album.photos, clusters)
+                ]
+            }
+        )
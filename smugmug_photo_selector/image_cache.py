@@ -0,0 +1,125 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+
+class DiskLRUCache:
+    """
+    Cache em disco limitado por tamanho total, removendo os arquivos
+    usados há mais tempo. A ordem de uso sobrevive a reinícios pelo
+    mtime dos arquivos.
+
+    Arquivos em uso (servidos por FileResponse, lidos pelo pool de
+    processos) ficam fixados com get(pin=True) até release() e não são
+    removidos; enquanto isso o cache pode passar de max_bytes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()
+        self._pins: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        # Temporários de escritas interrompidas
+        for path in self.directory.glob('.*'):
+            path.unlink(missing_ok=True)
+
+        files = []
+        for path in self.directory.glob('*/*'):
+            stat = path.stat()
+            files.append((stat.st_mtime, path.name, stat.st_size))
+
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self.size += size
+        self._evict()
+
+    @staticmethod
+    def _name(key: str) -> str:
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def _path(self, name: str) -> Path:
+        return self.directory / name[:2] / name
+
+    def get(self, key: str, pin: bool = False) -> Optional[Path]:
+        """
+        Caminho do arquivo em cache, marcando-o como usado. Com pin=True
+        o arquivo não é removido até release(): sem isso, um commit()
+        concorrente pode apagá-lo antes de ser lido.
+        """
+        name = self._name(key)
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+            if pin:
+                self._pins[name] = self._pins.get(name, 0) + 1
+
+        path = self._path(name)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.size -= self._entries.pop(name, 0)
+                if pin:
+                    self._unpin(name)
+            return None
+        return path
+
+    def release(self, path: Union[str, Path]):
+        """Liberar um arquivo fixado por get(pin=True)"""
+        with self._lock:
+            self._unpin(Path(path).name)
+            self._evict()
+
+    def _unpin(self, name: str):
+        count = self._pins.pop(name, 0) - 1
+        if count > 0:
+            self._pins[name] = count
+
+    def temp_file(self):
+        """Arquivo temporário no mesmo disco, para gravar e depois commit"""
+        return tempfile.NamedTemporaryFile(
+            dir=self.directory, prefix='.', delete=False
+        )
+
+    def commit(self, key: str, temp_path: str) -> Path:
+        """Mover o temporário para o cache de forma atômica"""
+        name = self._name(key)
+        path = self._path(name)
+        path.parent.mkdir(exist_ok=True)
+        os.replace(temp_path, path)
+        size = path.stat().st_size
+
+        with self._lock:
+            self.size += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+            self._evict(keep=name)
+        return path
+
+    def _evict(self, keep: Optional[str] = None):
+        victims = []
+        excess = self.size - self.max_bytes
+        for name, size in self._entries.items():
+            if excess <= 0:
+                break
+            if name != keep and name not in self._pins:
+                victims.append(name)
+                excess -= size
+
+        for name in victims:
+            self.size -= self._entries.pop(name)
+            self._path(name).unlink(missing_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
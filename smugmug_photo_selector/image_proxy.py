@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from http import HTTPStatus
+from pathlib import Path
+from typing import Dict, Iterable, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .image_cache import DiskLRUCache
+from .models import ImageSize, Photo
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+# Buscas seguidas de remoção antes do pin: só com o cache quase cheio
+ACQUIRE_ATTEMPTS = 3
+_SIGNATURES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG', 'image/png'),
+    (b'GIF8', 'image/gif'),
+]
+
+
+class ImageProxy:
+    """
+    Servir renditions do CDN do SmugMug a partir de um cache local,
+    juntando buscas simultâneas da mesma imagem/tamanho.
+    """
+
+    def __init__(
+        self,
+        service,
+        cache: DiskLRUCache,
+        pool_size: int = 16,
+        timeout: int = 30,
+        max_resolved: int = 50_000,
+    ):
+        self.service = service
+        self.cache = cache
+        self.timeout = timeout
+        self.max_resolved = max_resolved
+        self._resolved: 'OrderedDict[str, Dict[ImageSize, str]]' = (
+            OrderedDict()
+        )
+        self._inflight: Dict[Tuple[str, ImageSize], asyncio.Future] = {}
+
+        # Sem OAuth: o CDN serve as imagens direto
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @staticmethod
+    def media_type(path: Path) -> str:
+        """Tipo do arquivo pelos primeiros bytes (o cache não guarda nome)"""
+        with open(path, 'rb') as f:
+            header = f.read(12)
+        for signature, media_type in _SIGNATURES:
+            if header.startswith(signature):
+                return media_type
+        if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+            return 'image/webp'
+        return 'application/octet-stream'
+
+    def _remember(self, image_key: str, urls: Dict[ImageSize, str]):
+        self._resolved[image_key] = urls
+        self._resolved.move_to_end(image_key)
+        while len(self._resolved) > self.max_resolved:
+            self._resolved.popitem(last=False)
+
+    def remember(self, photos: Iterable[Photo]):
+        """
+        Guardar as URLs de fotos já conhecidas (de um álbum buscado),
+        para baixá-las sem pedir /image ao SmugMug uma a uma
+        """
+        for photo in photos:
+            self._remember(photo.id, {url.size: url.url for url in photo.urls})
+
+    async def resolve_url(self, image_key: str, size: ImageSize) -> str:
+        """
+        URL da rendition no CDN: das fotos já conhecidas, do índice de
+        álbuns do serviço ou, em último caso, do /image do SmugMug
+        """
+        urls = self._resolved.get(image_key)
+        if urls is None:
+            photo = self.service.indexed_photo(image_key)
+            if photo is not None:
+                photo_urls = photo.urls
+            else:
+                photo_urls = await self.service.get_image_urls(image_key)
+            urls = {photo_url.size: photo_url.url for photo_url in photo_urls}
+        self._remember(image_key, urls)
+
+        if size not in urls:
+            raise ValueError(f'Tamanho {size.value} indisponível')
+        return urls[size]
+
+    async def acquire(self, image_key: str, size: ImageSize) -> Path:
+        """
+        Caminho local da rendition, buscando no CDN se preciso. O arquivo
+        fica fixado no cache até release(path)
+        """
+        cache_key = f'{image_key}/{size.value}'
+        for _ in range(ACQUIRE_ATTEMPTS):
+            path = self.cache.get(cache_key, pin=True)
+            if path is not None:
+                return path
+
+            inflight_key = (image_key, size)
+            future = self._inflight.get(inflight_key)
+            if future is None:
+                future = asyncio.ensure_future(self._fetch(image_key, size))
+                self._inflight[inflight_key] = future
+                future.add_done_callback(
+                    lambda _, key=inflight_key: self._inflight.pop(key, None)
+                )
+            # shield: um cliente que desiste não cancela os demais
+            await asyncio.shield(future)
+
+        raise RuntimeError(
+            f'{cache_key} removido do cache logo após o download; '
+            'IMAGE_CACHE_MAX_BYTES pequeno demais'
+        )
+
+    def release(self, path: Union[str, Path]):
+        """Liberar um arquivo obtido com acquire()"""
+        self.cache.release(path)
+
+    async def _fetch(self, image_key: str, size: ImageSize) -> Path:
+        url = await self.resolve_url(image_key, size)
+        cache_key = f'{image_key}/{size.value}'
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._download, url, cache_key)
+
+    def _download(self, url: str, cache_key: str) -> Path:
+        with self.session.get(url, stream=True, timeout=self.timeout) as r:
+            if r.status_code == HTTPStatus.NOT_FOUND:
+                raise ValueError('Imagem não encontrada')
+            if r.status_code >= HTTPStatus.BAD_REQUEST:
+                raise ValueError(f'Erro HTTP {r.status_code}')
+
+            temp = self.cache.temp_file()
+            try:
+                with temp:
+                    for chunk in r.iter_content(CHUNK_SIZE):
+                        temp.write(chunk)
+                return self.cache.commit(cache_key, temp.name)
+            except BaseException:
+                os.unlink(temp.name)
+                raise
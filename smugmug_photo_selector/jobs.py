@@ -0,0 +1,435 @@
+import asyncio
+import json
+import logging
+import os
+import secrets
+import shutil
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from pydantic_core import to_json
+
+from .models import ExportJob
+from .scheduler import Priority, request_context
+
+logger = logging.getLogger(__name__)
+
+JOB_FILE = 'job.json'
+ACTIVE = ('queued', 'running')
+CHANGED = 'Álbum modificado durante a exportação'
+
+
+@dataclass(frozen=True)
+class JobLimits:
+    workers: int = 2  # jobs executados ao mesmo tempo
+    page_size: int = 1000
+    page_concurrency: int = 4  # páginas simultâneas por job
+    attempts: int = 3  # tentativas por página antes de falhar
+    retry_delay: float = 2.0
+
+
+@dataclass
+class JobPage:
+    """Janela de fotos de um álbum, gravada em um arquivo próprio"""
+
+    album_id: str
+    start: int
+    count: int
+    status: str = 'pending'  # pending, done ou failed
+    attempts: int = 0
+    photos: int = 0
+    error: Optional[str] = None
+
+    @property
+    def file_name(self) -> str:
+        return f'{self.album_id}-{self.start:07d}.json'
+
+
+@dataclass
+class Job:
+    id: str
+    album_ids: List[str]
+    status: str = 'queued'
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    # ID pedido -> {'album_id', 'title', 'total', 'date_modified'} ou
+    # {'error'}; um álbum com 'error' é replanejado na próxima rodada
+    albums: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    pages: List[JobPage] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Job':
+        pages = [JobPage(**page) for page in data.pop('pages', [])]
+        return cls(**data, pages=pages)
+
+    def album(self, album_key: str) -> Dict[str, Any]:
+        """Álbum planejado pela chave (a das páginas)"""
+        return next(
+            album
+            for album in self.albums.values()
+            if album.get('album_id') == album_key
+        )
+
+    def summary(self) -> ExportJob:
+        errors = [
+            f'{album_id}: {album["error"]}'
+            for album_id, album in self.albums.items()
+            if 'error' in album
+        ]
+        errors += [
+            f'{page.album_id}@{page.start}: {page.error}'
+            for page in self.pages
+            if page.status == 'failed'
+        ]
+        return ExportJob(
+            id=self.id,
+            status=self.status,
+            album_ids=self.album_ids,
+            created_at=self.created_at,
+            updated_at=self.updated_at,
+            pages_total=len(self.pages),
+            pages_done=sum(page.status == 'done' for page in self.pages),
+            pages_failed=sum(page.status == 'failed' for page in self.pages),
+            total_photos=sum(page.photos for page in self.pages),
+            errors=errors,
+            result_url=(
+                f'/jobs/{self.id}/result' if self.status == 'done' else None
+            ),
+        )
+
+
+class JobQueue:
+    """
+    Jobs de exportação de álbuns inteiros, executados em segundo plano
+    por um número fixo de workers. Cada job guarda o estado em
+    `job.json` e cada página de fotos em um arquivo, então páginas que
+    falharam podem ser refeitas sozinhas e jobs interrompidos por um
+    reinício continuam de onde pararam.
+    """
+
+    def __init__(
+        self, service, directory: str, limits: JobLimits = JobLimits()
+    ):
+        self.service = service
+        self.directory = Path(directory)
+        self.workers = max(1, limits.workers)
+        self.page_size = max(1, limits.page_size)
+        self.page_concurrency = max(1, limits.page_concurrency)
+        self.attempts = max(1, limits.attempts)
+        self.retry_delay = limits.retry_delay
+        self._jobs: Dict[str, Job] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._running: Dict[str, asyncio.Task] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._workers: List[asyncio.Task] = []
+
+    # Persistência
+
+    def _job_dir(self, job_id: str) -> Path:
+        return self.directory / job_id
+
+    def _write_state(self, job_id: str, payload: bytes):
+        path = self._job_dir(job_id) / JOB_FILE
+        temp_path = path.with_name(f'.{JOB_FILE}.tmp')
+        temp_path.write_bytes(payload)
+        os.replace(temp_path, path)
+
+    async def _save(self, job: Job):
+        job.updated_at = time.time()
+        payload = json.dumps(asdict(job)).encode()
+        lock = self._locks.setdefault(job.id, asyncio.Lock())
+        async with lock:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                None, self._write_state, job.id, payload
+            )
+
+    def _load_all(self) -> List[Job]:
+        jobs = []
+        for path in self.directory.glob(f'*/{JOB_FILE}'):
+            try:
+                jobs.append(Job.from_dict(json.loads(path.read_text())))
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning(f'Job em {path.parent} ignorado: {e}')
+        return sorted(jobs, key=lambda job: job.created_at)
+
+    # Ciclo de vida
+
+    async def start(self):
+        """Carregar os jobs do disco, retomar os ativos e subir os workers"""
+        loop = asyncio.get_running_loop()
+        for job in await loop.run_in_executor(None, self._load_all):
+            self._jobs[job.id] = job
+            if job.status in ACTIVE:
+                logger.info(f'Retomando o job {job.id}')
+                job.status = 'queued'
+                self._queue.put_nowait(job.id)
+        self._workers = [
+            asyncio.ensure_future(self._worker()) for _ in range(self.workers)
+        ]
+
+    def stop(self):
+        """
+        Parar os workers. Jobs em andamento ficam como estão no disco e
+        são retomados no próximo start().
+        """
+        for task in [*self._workers, *self._running.values()]:
+            task.cancel()
+        self._workers = []
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None or job.status != 'queued':
+                continue
+            task = asyncio.ensure_future(self._run(job))
+            self._running[job_id] = task
+            try:
+                await asyncio.wait({task})
+            finally:
+                self._running.pop(job_id, None)
+
+    # Execução
+
+    async def _plan(self, job: Job):
+        """
+        Dividir em páginas os álbuns ainda não planejados (ou com erro),
+        guardando a versão (DateModified) em que as páginas valem
+        """
+        for album_id in job.album_ids:
+            if album_id in job.albums and 'error' not in job.albums[album_id]:
+                continue
+            try:
+                info = await self.service.get_album_info_by_id(album_id)
+            except Exception as e:
+                logger.error(f'Job {job.id}: álbum {album_id} falhou: {e}')
+                # Mantém o album_id de um plano anterior (suas páginas)
+                job.albums[album_id] = {
+                    **job.albums.get(album_id, {}),
+                    'error': str(e),
+                }
+                continue
+            # Páginas de uma versão anterior do álbum não valem mais
+            job.pages = [
+                page for page in job.pages if page.album_id != info.album_id
+            ]
+            job.albums[album_id] = {
+                'album_id': info.album_id,
+                'title': info.album_title,
+                'total': info.total_photos,
+                'date_modified': info.date_modified,
+            }
+            job.pages.extend(
+                JobPage(info.album_id, start, self.page_size)
+                for start in range(1, info.total_photos + 1, self.page_size)
+            )
+        await self._save(job)
+
+    async def _check_versions(self, job: Job) -> bool:
+        """
+        Conferir se os álbuns exportados por completo ainda estão na
+        versão planejada; os que mudaram ficam com erro. Retorna True
+        se algum álbum mudou (aqui ou numa página) e será replanejado.
+        """
+        unfinished = {
+            page.album_id for page in job.pages if page.status != 'done'
+        }
+        checked = False
+        for album in job.albums.values():
+            if 'error' in album or album['album_id'] in unfinished:
+                continue
+            checked = True
+            try:
+                info = await self.service.get_album_info_by_id(
+                    album['album_id']
+                )
+            except Exception as e:
+                album['error'] = str(e)
+                continue
+            if (info.date_modified, info.total_photos) != (
+                album.get('date_modified'),
+                album['total'],
+            ):
+                album['error'] = CHANGED
+        if checked:
+            await self._save(job)
+        changed = [
+            album['album_id']
+            for album in job.albums.values()
+            if album.get('error') == CHANGED
+        ]
+        if changed:
+            logger.warning(f'Job {job.id}: replanejando {", ".join(changed)}')
+        return bool(changed)
+
+    def _write_page(self, job_id: str, page: JobPage, payload: bytes):
+        path = self._job_dir(job_id) / page.file_name
+        temp_path = path.with_name(f'.{path.name}.tmp')
+        temp_path.write_bytes(payload)
+        os.replace(temp_path, path)
+
+    async def _run_page(self, job: Job, page: JobPage):
+        album = job.album(page.album_id)
+        loop = asyncio.get_running_loop()
+        while 'error' not in album:
+            try:
+                photos, total = await self.service.get_photos_page(
+                    page.album_id, page.start, page.count
+                )
+                current = total is None or total == album['total']
+                if current:
+                    await loop.run_in_executor(
+                        None, self._write_page, job.id, page, to_json(photos)
+                    )
+            except Exception as e:
+                page.attempts += 1
+                page.error = str(e)
+                if page.attempts >= self.attempts:
+                    page.status = 'failed'
+                    await self._save(job)
+                    return
+                await asyncio.sleep(self.retry_delay * page.attempts)
+                continue
+            if current:
+                page.status = 'done'
+                page.photos = len(photos)
+                page.error = None
+            else:
+                # As janelas são por posição: só valem na versão
+                # planejada, então o álbum inteiro é replanejado
+                album['error'] = CHANGED
+            await self._save(job)
+            return
+
+    async def _run(self, job: Job):
+        job.status = 'running'
+        await self._save(job)
+        semaphore = asyncio.Semaphore(self.page_concurrency)
+
+        async def run_page(page: JobPage):
+            async with semaphore:
+                await self._run_page(job, page)
+
+        # Álbum modificado no meio: replanejado, até `attempts` rodadas
+        with request_context(Priority.BULK, f'job:{job.id}'):
+            for _ in range(self.attempts):
+                await self._plan(job)
+                await asyncio.gather(*[
+                    run_page(page)
+                    for page in job.pages
+                    if page.status == 'pending'
+                ])
+                if not await self._check_versions(job):
+                    break
+
+        failed = any(page.status == 'failed' for page in job.pages) or any(
+            'error' in album for album in job.albums.values()
+        )
+        job.status = 'failed' if failed else 'done'
+        await self._save(job)
+        logger.info(f'Job {job.id} terminou: {job.status}')
+
+    # API
+
+    async def submit(self, album_ids: List[str]) -> Job:
+        job = Job(
+            id=secrets.token_hex(8), album_ids=list(dict.fromkeys(album_ids))
+        )
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, lambda: self._job_dir(job.id).mkdir(parents=True)
+        )
+        self._jobs[job.id] = job
+        await self._save(job)
+        self._queue.put_nowait(job.id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        return sorted(
+            self._jobs.values(), key=lambda job: job.created_at, reverse=True
+        )
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None or job.status not in ACTIVE:
+            return job
+        job.status = 'cancelled'
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+            await asyncio.wait({task})
+        await self._save(job)
+        return job
+
+    async def retry(self, job_id: str) -> Optional[Job]:
+        """Recolocar na fila as páginas e álbuns que falharam"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if job.status in ACTIVE:
+            raise ValueError('Job ainda em andamento')
+        if job.status == 'done':
+            raise ValueError('Job já concluído')
+        for page in job.pages:
+            if page.status == 'failed':
+                page.status, page.attempts, page.error = 'pending', 0, None
+        job.status = 'queued'
+        await self._save(job)
+        self._queue.put_nowait(job.id)
+        return job
+
+    async def delete(self, job_id: str) -> bool:
+        job = await self.cancel(job_id)
+        if job is None:
+            return False
+        del self._jobs[job_id]
+        self._locks.pop(job_id, None)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, shutil.rmtree, self._job_dir(job_id), True
+        )
+        return True
+
+    def result(self, job_id: str) -> Iterator[bytes]:
+        """
+        Resultado do job concluído como lista JSON de AlbumResponse,
+        montada a partir das páginas em disco sem carregar tudo.
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.status != 'done':
+            raise ValueError('Job não concluído')
+        return self._iter_result(job)
+
+    def _iter_result(self, job: Job) -> Iterator[bytes]:
+        yield b'['
+        for index, album_id in enumerate(job.album_ids):
+            album = job.albums[album_id]
+            pages = [
+                page
+                for page in job.pages
+                if page.album_id == album['album_id']
+            ]
+            header = {
+                'album_title': album['title'],
+                'album_id': album['album_id'],
+                'total_photos': sum(page.photos for page in pages),
+            }
+            # Cabeçalho do álbum sem o '}' final, seguido das fotos
+            yield (b',' if index else b'') + to_json(header)[:-1]
+            yield b',"photos":['
+            first = True
+            for page in sorted(pages, key=lambda page: page.start):
+                if not page.photos:
+                    continue
+                path = self._job_dir(job.id) / page.file_name
+                photos = path.read_bytes()[1:-1]  # sem os colchetes
+                yield photos if first else b',' + photos
+                first = False
+            yield b'],"next_cursor":null}'
+        yield b']'
@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .models import AlbumResponse, Photo, PhotoMetadata
+from .scheduler import Priority, request_context
+
+logger = logging.getLogger(__name__)
+
+# Campo do PhotoMetadata -> chaves possíveis no !metadata do SmugMug
+_FIELDS = {
+    'date_time_original': ('DateTimeOriginal', 'DateTimeCreated'),
+    'make': ('Make',),
+    'model': ('Model',),
+    'lens': ('Lens', 'LensModel'),
+    'iso': ('ISO', 'ISOSpeedRatings'),
+    'exposure': ('Exposure', 'ExposureTime'),
+    'aperture': ('Aperture', 'FNumber'),
+    'focal_length': ('FocalLength',),
+    'width': ('ImageWidth', 'PixelXDimension', 'ExifImageWidth'),
+    'height': ('ImageHeight', 'PixelYDimension', 'ExifImageHeight'),
+}
+# Ordenação aceita o nome do campo ou o do EXIF (DateTimeOriginal)
+SORT_FIELDS = {
+    **{field: field for field in _FIELDS},
+    **{names[0]: field for field, names in _FIELDS.items()},
+}
+
+_NUMBER = re.compile(r'\d+(?:\.\d+)?')
+_EXIF_DATE = re.compile(r'^(\d{4})[:-](\d{2})[:-](\d{2})(?:[ T](.*))?$')
+
+
+def _number(value: Any, cast) -> Optional[Any]:
+    """Número de valores como 'f/2.8' ou '50.0 mm'"""
+    if isinstance(value, (int, float)):
+        return cast(value)
+    match = _NUMBER.search(str(value))
+    return cast(float(match.group())) if match else None
+
+
+def _datetime(value: Any) -> Optional[str]:
+    """Data do EXIF ('2024:01:20 14:45:00') no formato ISO"""
+    match = _EXIF_DATE.match(str(value).strip())
+    if not match:
+        return None
+    year, month, day, rest = match.groups()
+    date = f'{year}-{month}-{day}'
+    return f'{date}T{rest}' if rest else date
+
+
+_PARSERS = {
+    'date_time_original': _datetime,
+    'iso': lambda value: _number(value, int),
+    'aperture': lambda value: _number(value, float),
+    'focal_length': lambda value: _number(value, float),
+    'width': lambda value: _number(value, int),
+    'height': lambda value: _number(value, int),
+}
+
+
+def parse_metadata(raw: Dict[str, Any]) -> PhotoMetadata:
+    """Converter o ImageMetadata do SmugMug para PhotoMetadata"""
+    values = {}
+    for field, names in _FIELDS.items():
+        value = next(
+            (raw[name] for name in names if raw.get(name) is not None),
+            None,
+        )
+        if value is None or (isinstance(value, str) and not value.strip()):
+            continue
+        parser = _PARSERS.get(field, str)
+        values[field] = parser(value)
+    return PhotoMetadata(**values)
+
+
+@dataclass(frozen=True)
+class MetadataQuery:
+    """Filtros e ordenação sobre os metadados das fotos"""
+
+    sort: Optional[str] = None  # '-' na frente para decrescente
+    camera: Optional[str] = None
+    taken_after: Optional[str] = None
+    taken_before: Optional[str] = None
+
+    @property
+    def selects(self) -> bool:
+        """Se ordena ou filtra (e não só preenche o EXIF)"""
+        return any([
+            self.sort,
+            self.camera,
+            self.taken_after,
+            self.taken_before,
+        ])
+
+    def sort_field(self) -> Optional[str]:
+        if not self.sort:
+            return None
+        name = self.sort.lstrip('-')
+        if name not in SORT_FIELDS:
+            raise ValueError(f'Ordenação inválida: {name}')
+        return SORT_FIELDS[name]
+
+    def matches(self, metadata: Optional[PhotoMetadata]) -> bool:
+        metadata = metadata or PhotoMetadata()
+        if self.camera:
+            camera = f'{metadata.make or ""} {metadata.model or ""}'
+            if self.camera.lower() not in camera.lower():
+                return False
+        taken = metadata.date_time_original
+        if self.taken_after and (taken is None or taken < self.taken_after):
+            return False
+        return not (
+            self.taken_before and (taken is None or taken >= self.taken_before)
+        )
+
+    def apply(self, photos: List[Photo]) -> List[Photo]:
+        field = self.sort_field()
+        photos = [photo for photo in photos if self.matches(photo.metadata)]
+        if field is None:
+            return photos
+
+        def value(photo: Photo):
+            return getattr(photo.metadata, field, None)
+
+        # Fotos sem o campo ficam no fim nos dois sentidos
+        present = [photo for photo in photos if value(photo) is not None]
+        absent = [photo for photo in photos if value(photo) is None]
+        present.sort(key=value, reverse=self.sort.startswith('-'))
+        return present + absent
+
+
+class MetadataEnricher:
+    """
+    Preencher o EXIF das fotos a partir do !metadata de cada imagem,
+    buscado em paralelo com prioridade BULK e guardado para sempre por
+    ImageKey (os metadados de uma imagem não mudam).
+    """
+
+    def __init__(self, service, store, concurrency: int = 8):
+        self.service = service
+        self.store = store
+        self.concurrency = max(1, concurrency)
+
+    async def _fetch_missing(self, image_keys: List[str]) -> Dict[str, Any]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(image_key: str) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    raw = await self.service.get_image_metadata(image_key)
+                except Exception as e:
+                    logger.warning(f'Sem metadados para {image_key}: {e}')
+                    return None
+                return parse_metadata(raw).model_dump(exclude_none=True)
+
+        with request_context(Priority.BULK):
+            results = await asyncio.gather(*[
+                fetch(image_key) for image_key in image_keys
+            ])
+
+        fetched = {
+            key: value
+            for key, value in zip(image_keys, results)
+            if value is not None
+        }
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, self.store.put_many, list(fetched.items())
+        )
+        return fetched
+
+    async def enrich(
+        self, album: AlbumResponse, query: MetadataQuery = MetadataQuery()
+    ) -> AlbumResponse:
+        """Cópia do álbum com metadados, filtrada e ordenada"""
+        query.sort_field()  # valida antes de buscar qualquer coisa
+        loop = asyncio.get_running_loop()
+        keys = [photo.id for photo in album.photos]
+        known = await loop.run_in_executor(None, self.store.get_many, keys)
+        missing = [key for key in dict.fromkeys(keys) if key not in known]
+        if missing:
+            known.update(await self._fetch_missing(missing))
+
+        # Cópias: o álbum pode estar no cache do serviço
+        photos = [
+            photo.model_copy(
+                update={
+                    'metadata': PhotoMetadata(**known[photo.id])
+                    if photo.id in known
+                    else None
+                }
+            )
+            for photo in album.photos
+        ]
+        photos = query.apply(photos)
+        update: Dict[str, Any] = {'photos': photos}
+        if album.total_photos == len(album.photos):
+            # Álbum inteiro: o total passa a ser o das fotos filtradas
+            update['total_photos'] = len(photos)
+        return album.model_copy(update=update)
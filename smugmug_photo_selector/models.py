@@ -1,7 +1,7 @@
 from enum import Enum
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ImageSize(str, Enum):
@@ -20,11 +20,30 @@ class PhotoURL(BaseModel):
     url: str
 
 
+class PhotoMetadata(BaseModel):
+    date_time_original: Optional[str] = None
+    make: Optional[str] = None
+    model: Optional[str] = None
+    lens: Optional[str] = None
+    iso: Optional[int] = None
+    exposure: Optional[str] = None
+    aperture: Optional[float] = None
+    focal_length: Optional[float] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
 class Photo(BaseModel):
     id: str
     title: Optional[str] = None
+    caption: Optional[str] = None
+    keywords: List[str] = []
     urls: List[PhotoURL]
     thumbnail_url: Optional[str] = None
+    # Fotos quase idênticas compartilham o cluster (só com duplicates=true)
+    cluster_id: Optional[int] = None
+    # EXIF da foto (só com metadata=true)
+    metadata: Optional[PhotoMetadata] = None
 
 
 class AlbumResponse(BaseModel):
@@ -32,6 +51,19 @@ class AlbumResponse(BaseModel):
     album_id: str
     total_photos: int
     photos: List[Photo]
+    # Presente só em respostas paginadas com mais fotos a buscar
+    next_cursor: Optional[str] = None
+
+
+class PhotoLookupRequest(BaseModel):
+    image_keys: List[str] = Field(..., min_length=1)
+
+
+class PhotoLookupResponse(BaseModel):
+    album_id: str
+    photos: List[Photo]
+    # ImageKeys que não estão no álbum ou não existem
+    missing: List[str] = []
 
 
 class AlbumInfo(BaseModel):
@@ -43,3 +75,125 @@ class AlbumInfo(BaseModel):
     description: Optional[str] = None
     date_created: Optional[str] = None
     date_modified: Optional[str] = None
+
+
+class CredentialStats(BaseModel):
+    name: str
+    available: bool
+    in_flight: int
+    requests: int
+    failures: int
+    throttled: int
+    cooldown_seconds: float
+
+
+class SpriteEntry(BaseModel):
+    id: str
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+class ContactSheet(BaseModel):
+    page: int
+    url: str
+    photos: List[SpriteEntry]
+
+
+class ContactSheetManifest(BaseModel):
+    album_id: str
+    album_title: str
+    version: str
+    size: ImageSize
+    columns: int
+    rows: int
+    cell_size: int
+    total_photos: int
+    sheets: List[ContactSheet]
+
+
+class SearchHit(BaseModel):
+    album_id: str
+    album_title: str
+    photo: Photo
+
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchHit]
+
+
+class Selection(BaseModel):
+    album_id: str
+    name: str
+    count: int
+    # Ordinais selecionados (ver /selections/{album_id}/ordinals) no
+    # formato em contêineres do Roaring, em base64
+    bitmap: str
+    # Só com keys=true
+    image_keys: Optional[List[str]] = None
+
+
+class SelectionUpdate(BaseModel):
+    # Substitui a seleção inteira antes de add/remove (base64, como em
+    # Selection.bitmap)
+    bitmap: Optional[str] = None
+    add: List[str] = []
+    remove: List[str] = []
+
+
+class SelectionCombineRequest(BaseModel):
+    op: Literal['union', 'intersection', 'difference']
+    names: List[str] = Field(..., min_length=1)
+    # Sem ele, o resultado só é retornado
+    save_as: Optional[str] = None
+
+
+class SelectionSummary(BaseModel):
+    name: str
+    count: int
+
+
+class SelectionList(BaseModel):
+    album_id: str
+    selections: List[SelectionSummary]
+
+
+class AlbumOrdinals(BaseModel):
+    album_id: str
+    # Posição na lista = ordinal usado nos bitmaps
+    image_keys: List[str]
+
+
+class SelectedPhotoURL(BaseModel):
+    id: str
+    url: str
+
+
+class SelectionExport(BaseModel):
+    album_id: str
+    name: str
+    size: ImageSize
+    photos: List[SelectedPhotoURL]
+    # Selecionadas que saíram do álbum ou não têm o tamanho pedido
+    missing: List[str] = []
+
+
+class ExportJobRequest(BaseModel):
+    album_ids: List[str] = Field(..., min_length=1)
+
+
+class ExportJob(BaseModel):
+    id: str
+    status: Literal['queued', 'running', 'done', 'failed', 'cancelled']
+    album_ids: List[str]
+    created_at: float
+    updated_at: float
+    pages_total: int
+    pages_done: int
+    pages_failed: int
+    total_photos: int
+    errors: List[str] = []
+    # Presente quando o job terminou
+    result_url: Optional[str] = None
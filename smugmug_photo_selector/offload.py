@@ -0,0 +1,37 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def loads(content: bytes) -> Any:
+    """Decodificar JSON, usando orjson quando instalado"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def get_process_pool(max_workers: int) -> Optional[ProcessPoolExecutor]:
+    """Pool de processos compartilhado; None se desabilitado (0 workers)"""
+    global _process_pool  # noqa: PLW0603
+    if max_workers <= 0:
+        return None
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=min(max_workers, os.cpu_count() or 1)
+        )
+    return _process_pool
+
+
+def shutdown_process_pool():
+    global _process_pool  # noqa: PLW0603
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
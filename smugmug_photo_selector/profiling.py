@@ -0,0 +1,250 @@
+import functools
+import hmac
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+TIMING = 'timing'
+SAMPLE = 'sample'
+_MODES = {
+    '1': TIMING,
+    'true': TIMING,
+    TIMING: TIMING,
+    SAMPLE: SAMPLE,
+    'flamegraph': SAMPLE,
+}
+
+# Frames de threads ociosas do pool, que só poluiriam o flamegraph
+_IDLE_FRAMES = {('thread.py', '_worker'), ('threading.py', 'wait')}
+
+_current_timings: ContextVar[Optional['Timings']] = ContextVar(
+    'smugmug_profile_timings', default=None
+)
+_NOOP = nullcontext()
+
+
+class Timings:
+    """Tempo acumulado por etapa de uma requisição (Server-Timing)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.handler_done: Optional[float] = None
+        self.spans: Dict[str, List[float]] = {}
+
+    def add(self, name: str, seconds: float):
+        entry = self.spans.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    def header(self) -> str:
+        # Etapas em paralelo (páginas de !images) somam mais que o total
+        parts = [
+            f'{name};dur={total * 1000:.1f};desc="{count}x"'
+            for name, (total, count) in self.spans.items()
+        ]
+        parts.append(
+            f'total;dur={(time.perf_counter() - self.started) * 1000:.1f}'
+        )
+        return ', '.join(parts)
+
+
+def span(name: str):
+    """
+    Medir uma etapa da requisição atual. Sem perfil ativo é só uma
+    leitura de ContextVar.
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        return _NOOP
+    return _timed(timings, name)
+
+
+@contextmanager
+def _timed(timings: Timings, name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def profiled_endpoint(func):
+    """
+    Marcar o fim do endpoint, para separar a serialização da resposta
+    feita depois pelo FastAPI.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        timings = _current_timings.get()
+        if timings is None:
+            return await func(*args, **kwargs)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            timings.handler_done = time.perf_counter()
+
+    return wrapper
+
+
+class StackSampler(threading.Thread):
+    """
+    Amostrar as pilhas de todas as threads do processo em intervalos
+    fixos, no formato "collapsed" dos flamegraphs. Requisições
+    simultâneas no mesmo processo também aparecem nas amostras.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                code = frame.f_code
+                leaf = (os.path.basename(code.co_filename), code.co_name)
+                if leaf in _IDLE_FRAMES:
+                    continue
+                thread = names.get(thread_id, str(thread_id))
+                self.stacks[f'{thread};{_collapse(frame)}'] += 1
+
+    def finish(self) -> str:
+        self._stop_event.set()
+        self.join()
+        return ''.join(
+            f'{stack} {count}\n' for stack, count in self.stacks.items()
+        )
+
+
+def _collapse(frame) -> str:
+    """Pilha da raiz até o frame, separada por ';'"""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(
+            f'{code.co_name} '
+            f'({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+        )
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+
+class ProfileStore:
+    """Últimos perfis capturados, em memória"""
+
+    def __init__(self, max_profiles: int):
+        self.max_profiles = max(1, max_profiles)
+        self._profiles: 'OrderedDict[str, str]' = OrderedDict()
+
+    def put(self, profile_id: str, collapsed: str):
+        self._profiles[profile_id] = collapsed
+        while len(self._profiles) > self.max_profiles:
+            self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[str]:
+        return self._profiles.get(profile_id)
+
+
+def is_admin(token: Optional[str], supplied: Optional[str]) -> bool:
+    if not token or not supplied:
+        return False
+    return hmac.compare_digest(token.encode(), supplied.encode())
+
+
+class ProfilingMiddleware:
+    """
+    Perfil sob demanda: com `?profile=1` (ou header X-Profile) e o
+    token de admin em X-Admin-Token, a resposta traz Server-Timing por
+    etapa; com `profile=sample`, também um perfil por amostragem em
+    /debug/profiles/{id}. Sem token configurado, nada é verificado.
+    """
+
+    def __init__(
+        self,
+        app,
+        token: Optional[str],
+        store: ProfileStore,
+        interval: float = 0.005,
+    ):
+        self.app = app
+        self.token = token
+        self.store = store
+        self.interval = interval
+
+    @staticmethod
+    def _requested_mode(scope) -> Optional[str]:
+        headers = dict(scope.get('headers') or [])
+        value = headers.get(b'x-profile', b'').decode('latin-1')
+        if not value and b'profile=' in scope.get('query_string', b''):
+            query = parse_qs(scope['query_string'].decode('latin-1'))
+            value = query.get('profile', [''])[0]
+        return _MODES.get(value.lower()) if value else None
+
+    async def __call__(self, scope, receive, send):
+        if not self.token or scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        mode = self._requested_mode(scope)
+        if mode is None:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get('headers') or [])
+        supplied = headers.get(b'x-admin-token', b'').decode('latin-1')
+        if not is_admin(self.token, supplied):
+            return await _forbidden(send)
+
+        timings = Timings()
+        token = _current_timings.set(timings)
+        sampler = None
+        if mode == SAMPLE:
+            sampler = StackSampler(self.interval)
+            sampler.start()
+
+        async def send_with_timings(message):
+            if message['type'] == 'http.response.start':
+                now = time.perf_counter()
+                if timings.handler_done is not None:
+                    timings.add('serialize', now - timings.handler_done)
+                extra = [(b'server-timing', timings.header().encode())]
+                if sampler is not None:
+                    profile_id = secrets.token_hex(8)
+                    self.store.put(profile_id, sampler.finish())
+                    extra.append((
+                        b'x-profile-url',
+                        f'/debug/profiles/{profile_id}'.encode(),
+                    ))
+                message['headers'] = list(message.get('headers', [])) + extra
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            _current_timings.reset(token)
+            if sampler is not None and sampler.is_alive():
+                sampler.finish()
+
+
+async def _forbidden(send):
+    body = json.dumps({'detail': 'Perfil requer token de admin'}).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': 403,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,160 @@
+import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+
+
+class Priority(IntEnum):
+    """Classes de prioridade das requisições ao SmugMug (menor = antes)"""
+
+    INTERACTIVE = 0
+    STANDARD = 1
+    BULK = 2
+
+
+@dataclass(frozen=True)
+class RequestContext:
+    priority: Priority = Priority.STANDARD
+    flow: str = 'default'
+    weight: float = 1.0
+
+
+_current_context: ContextVar[RequestContext] = ContextVar(
+    'smugmug_request_context', default=RequestContext()
+)
+
+
+def current_request_context() -> RequestContext:
+    return _current_context.get()
+
+
+@contextmanager
+def request_context(
+    priority: Optional[Priority] = None,
+    flow: Optional[str] = None,
+    weight: Optional[float] = None,
+):
+    """Definir prioridade e fluxo das requisições feitas neste contexto"""
+    parent = _current_context.get()
+    token = _current_context.set(
+        RequestContext(
+            priority=parent.priority if priority is None else priority,
+            flow=parent.flow if flow is None else flow,
+            weight=parent.weight if weight is None else weight,
+        )
+    )
+    try:
+        yield
+    finally:
+        _current_context.reset(token)
+
+
+class _ClassQueue:
+    """Fila de uma classe de prioridade com weighted fair queuing"""
+
+    def __init__(self):
+        self.heap: List[Tuple[float, int, asyncio.Future]] = []
+        self.virtual_time = 0.0
+        self.last_finish: Dict[str, float] = {}
+
+    def push(self, flow: str, weight: float, seq: int, future):
+        start = max(self.virtual_time, self.last_finish.get(flow, 0.0))
+        finish = start + 1.0 / max(weight, 0.001)
+        self.last_finish[flow] = finish
+        heapq.heappush(self.heap, (finish, seq, future))
+
+    def pop(self) -> Optional[asyncio.Future]:
+        while self.heap:
+            finish, _, future = heapq.heappop(self.heap)
+            if future.done():
+                continue
+            self.virtual_time = finish
+            return future
+        # Fila vazia: esquecer tags antigas para não acumular fluxos
+        self.last_finish.clear()
+        return None
+
+
+class RequestScheduler:
+    """
+    Limitar requisições simultâneas ao SmugMug, atendendo primeiro as
+    classes mais prioritárias e dividindo cada classe de forma justa
+    entre os fluxos (clientes).
+    """
+
+    def __init__(self, max_concurrency: int, reserved_interactive: int = 1):
+        self.max_concurrency = max(1, max_concurrency)
+        self.reserved_interactive = min(
+            max(0, reserved_interactive), self.max_concurrency - 1
+        )
+        self.active = 0
+        self._queues = {priority: _ClassQueue() for priority in Priority}
+        self._seq = itertools.count()
+
+    def _limit_for(self, priority: Priority) -> int:
+        if priority == Priority.INTERACTIVE:
+            return self.max_concurrency
+        return self.max_concurrency - self.reserved_interactive
+
+    def _has_waiters(self, up_to: Priority) -> bool:
+        return any(
+            self._queues[priority].heap
+            for priority in Priority
+            if priority <= up_to
+        )
+
+    def _dispatch(self):
+        for priority in Priority:
+            queue = self._queues[priority]
+            while self.active < self._limit_for(priority):
+                future = queue.pop()
+                if future is None:
+                    break
+                self.active += 1
+                future.set_result(None)
+
+    async def acquire(self, context: RequestContext):
+        if self.active < self._limit_for(
+            context.priority
+        ) and not self._has_waiters(context.priority):
+            self.active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues[context.priority].push(
+            context.flow, context.weight, next(self._seq), future
+        )
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Vaga concedida junto com o cancelamento: devolver
+                self.release()
+            raise
+
+    def release(self):
+        self.active -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, context: Optional[RequestContext] = None):
+        await self.acquire(context or current_request_context())
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'active': self.active,
+            **{
+                f'queued_{priority.name.lower()}': sum(
+                    1 for *_, f in self._queues[priority].heap if not f.done()
+                )
+                for priority in Priority
+            },
+        }
@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from .models import AlbumResponse, Photo, SearchHit
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r'\w+')
+
+# Tabela normal com as fotos e índice FTS5 de conteúdo externo sobre
+# ela, mantido por triggers: trocar um álbum é um DELETE pelo album_id
+# (indexado) seguido dos INSERTs, sem varrer o índice invertido
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_albums (
+    album_id TEXT PRIMARY KEY,
+    album_title TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS search_photos (
+    id INTEGER PRIMARY KEY,
+    album_id TEXT NOT NULL,
+    title TEXT,
+    caption TEXT,
+    keywords TEXT,
+    photo TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS search_photos_album
+    ON search_photos (album_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+    title,
+    caption,
+    keywords,
+    content='search_photos',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS search_photos_ai AFTER INSERT ON search_photos
+BEGIN
+    INSERT INTO search_fts (rowid, title, caption, keywords)
+    VALUES (new.id, new.title, new.caption, new.keywords);
+END;
+CREATE TRIGGER IF NOT EXISTS search_photos_ad AFTER DELETE ON search_photos
+BEGIN
+    INSERT INTO search_fts (search_fts, rowid, title, caption, keywords)
+    VALUES ('delete', old.id, old.title, old.caption, old.keywords);
+END;
+"""
+
+
+def _match_expression(query: str) -> str:
+    """Consulta FTS5: todos os termos, cada um como prefixo"""
+    tokens = _TOKEN.findall(query)
+    if not tokens:
+        raise ValueError('Busca vazia')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _signature(album: AlbumResponse, documents: List[str]) -> str:
+    """
+    Resumo do que é guardado (a foto inteira, URLs incluídas), para
+    pular álbuns que não mudaram sem deixar URLs antigas no índice
+    """
+    digest = hashlib.sha1(album.album_title.encode())
+    for document in documents:
+        digest.update(document.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class SearchIndex:
+    """
+    Índice invertido (SQLite FTS5) de título, legenda e palavras-chave
+    das fotos dos álbuns já buscados. As escritas passam por uma única
+    thread, na ordem em que os álbuns chegam; as buscas usam conexões
+    próprias de leitura (WAL) e não esperam pelas escritas.
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        self._writer = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='search-index'
+        )
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(_SCHEMA)
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def index_album(self, album: AlbumResponse) -> bool:
+        """
+        Substituir as fotos do álbum no índice. Retorna False se o
+        álbum não mudou desde a última indexação.
+        """
+        documents = [photo.model_dump_json() for photo in album.photos]
+        signature = _signature(album, documents)
+        row = self._conn.execute(
+            'SELECT signature FROM search_albums WHERE album_id = ?',
+            (album.album_id,),
+        ).fetchone()
+        if row is not None and row[0] == signature:
+            return False
+
+        with self._conn:
+            self._conn.execute(
+                'DELETE FROM search_photos WHERE album_id = ?',
+                (album.album_id,),
+            )
+            self._conn.executemany(
+                'INSERT INTO search_photos '
+                '(album_id, title, caption, keywords, photo) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [
+                    (
+                        album.album_id,
+                        photo.title,
+                        photo.caption,
+                        ' '.join(photo.keywords),
+                        document,
+                    )
+                    for photo, document in zip(album.photos, documents)
+                ],
+            )
+            self._conn.execute(
+                'INSERT OR REPLACE INTO search_albums '
+                '(album_id, album_title, signature, indexed_at) '
+                'VALUES (?, ?, ?, ?)',
+                (album.album_id, album.album_title, signature, time.time()),
+            )
+        logger.info(
+            f'Álbum {album.album_id} indexado ({len(album.photos)} fotos)'
+        )
+        return True
+
+    def submit(self, album: AlbumResponse) -> Future:
+        """Indexar o álbum em segundo plano, sem bloquear quem chamou"""
+        future = self._writer.submit(self.index_album, album)
+
+        def log_failure(future: Future):
+            error = None if future.cancelled() else future.exception()
+            if error is not None:
+                logger.error(f'Falha ao indexar {album.album_id}: {error}')
+
+        future.add_done_callback(log_failure)
+        return future
+
+    def query(
+        self, query: str, limit: int = 50, album_id: Optional[str] = None
+    ) -> List[SearchHit]:
+        """Fotos que contêm todos os termos (como prefixo), por relevância"""
+        sql = (
+            'SELECT p.album_id, a.album_title, p.photo '
+            'FROM search_fts '
+            'JOIN search_photos p ON p.id = search_fts.rowid '
+            'JOIN search_albums a ON a.album_id = p.album_id '
+            'WHERE search_fts MATCH ?'
+        )
+        params: list = [_match_expression(query)]
+        if album_id is not None:
+            sql += ' AND p.album_id = ?'
+            params.append(album_id.removeprefix('n-'))
+        sql += ' ORDER BY rank LIMIT ?'
+        params.append(limit)
+
+        rows = self._reader().execute(sql, params).fetchall()
+        return [
+            SearchHit(
+                album_id=album_key,
+                album_title=album_title,
+                photo=Photo.model_validate_json(photo),
+            )
+            for album_key, album_title, photo in rows
+        ]
+
+    async def search(
+        self, query: str, limit: int = 50, album_id: Optional[str] = None
+    ) -> List[SearchHit]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self.query, query, limit, album_id
+        )
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+        self._conn.close()
@@ -0,0 +1,297 @@
+import asyncio
+import base64
+import binascii
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from .bitmap import Bitmap
+from .models import (
+    ImageSize,
+    Photo,
+    SelectedPhotoURL,
+    SelectionExport,
+)
+
+logger = logging.getLogger(__name__)
+
+SELECTION_NAME = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+# Nomes que colidem com as rotas de /selections/{album_id}
+RESERVED_NAMES = {'ordinals', 'combine'}
+OPERATIONS = {
+    'union': Bitmap.__or__,
+    'intersection': Bitmap.__and__,
+    'difference': Bitmap.__sub__,
+}
+
+
+def encode_bitmap(bitmap: Bitmap) -> str:
+    return base64.b64encode(bitmap.to_bytes()).decode('ascii')
+
+
+def decode_bitmap(value: str, limit: Optional[int] = None) -> Bitmap:
+    try:
+        data = base64.b64decode(value, validate=True)
+    except binascii.Error:
+        raise ValueError('Bitmap inválido') from None
+    return Bitmap.from_bytes(data, limit)
+
+
+def _album_key(album_id: str) -> str:
+    if not album_id or not album_id.strip():
+        raise ValueError('ID do álbum não pode estar vazio')
+    return album_id.removeprefix('n-')
+
+
+def _url(photo: Photo, size: ImageSize) -> Optional[str]:
+    return next((url.url for url in photo.urls if url.size == size), None)
+
+
+def _check_name(name: str):
+    if not SELECTION_NAME.match(name) or name in RESERVED_NAMES:
+        raise ValueError(f'Nome de seleção inválido: {name}')
+
+
+@dataclass
+class Ordinals:
+    """
+    ImageKeys do álbum na ordem em que foram vistos. O ordinal de uma
+    foto nunca muda: fotos novas vão para o fim e as removidas mantêm
+    o lugar, então os bitmaps salvos continuam válidos.
+    """
+
+    keys: List[str]
+    positions: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.positions = {key: i for i, key in enumerate(self.keys)}
+
+    def extend(self, image_keys: Iterable[str]) -> bool:
+        added = False
+        for key in image_keys:
+            if key not in self.positions:
+                self.positions[key] = len(self.keys)
+                self.keys.append(key)
+                added = True
+        return added
+
+
+class SelectionSets:
+    """
+    Seleções de fotos por álbum (uma por revisor, por exemplo), cada
+    uma um Bitmap sobre os ordinais do álbum, guardado compactado no
+    SQLite com a contagem ao lado para listar sem decodificar.
+    """
+
+    def __init__(self, service, selections, ordinals, max_albums: int = 20):
+        self.service = service
+        self.selections = selections
+        self.ordinal_store = ordinals
+        self.max_albums = max(1, max_albums)
+        self._ordinals: 'OrderedDict[str, Ordinals]' = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @staticmethod
+    async def _run(func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, func, *args)
+
+    def _lock(self, album_key: str) -> asyncio.Lock:
+        return self._locks.setdefault(album_key, asyncio.Lock())
+
+    async def _load_ordinals(self, album_key: str) -> Ordinals:
+        ordinals = self._ordinals.get(album_key)
+        if ordinals is None:
+            keys = await self._run(self.ordinal_store.get, album_key, [])
+            ordinals = Ordinals(keys)
+            self._ordinals[album_key] = ordinals
+            while len(self._ordinals) > self.max_albums:
+                self._ordinals.popitem(last=False)
+        self._ordinals.move_to_end(album_key)
+        return ordinals
+
+    async def _extend_ordinals(
+        self, album_key: str, image_keys: Iterable[str]
+    ) -> Ordinals:
+        ordinals = await self._load_ordinals(album_key)
+        if ordinals.extend(image_keys):
+            await self._run(
+                self.ordinal_store.put, album_key, list(ordinals.keys)
+            )
+        return ordinals
+
+    async def _refresh_ordinals(self, album_key: str) -> Ordinals:
+        """Incluir as fotos atuais do álbum (álbum em cache ou buscado)"""
+        album = await self.service.get_all_photos_by_id(album_key)
+        return await self._extend_ordinals(
+            album_key, [photo.id for photo in album.photos]
+        )
+
+    async def ordinals(self, album_id: str) -> List[str]:
+        album_key = _album_key(album_id)
+        async with self._lock(album_key):
+            ordinals = await self._refresh_ordinals(album_key)
+            return list(ordinals.keys)
+
+    async def _resolve(self, album_key: str, image_keys: List[str]) -> Bitmap:
+        """Bitmap das fotos; ImageKeys desconhecidos atualizam o álbum"""
+        ordinals = await self._load_ordinals(album_key)
+        unknown = [key for key in image_keys if key not in ordinals.positions]
+        if unknown:
+            ordinals = await self._refresh_ordinals(album_key)
+            unknown = [key for key in unknown if key not in ordinals.positions]
+            if unknown:
+                raise ValueError(
+                    f'Fotos fora do álbum: {", ".join(unknown[:10])}'
+                )
+        return Bitmap.from_ordinals(
+            ordinals.positions[key] for key in image_keys
+        )
+
+    async def _get(self, album_key: str, name: str) -> Optional[Bitmap]:
+        entry = await self._run(self.selections.get, f'{album_key}/{name}')
+        if entry is None:
+            return None
+        return await self._run(decode_bitmap, entry['bitmap'])
+
+    async def _put(self, album_key: str, name: str, bitmap: Bitmap):
+        await self._run(
+            self.selections.put,
+            f'{album_key}/{name}',
+            {
+                'bitmap': encode_bitmap(bitmap),
+                'count': len(bitmap),
+                'updated_at': time.time(),
+            },
+        )
+
+    async def get(self, album_id: str, name: str) -> Optional[Bitmap]:
+        _check_name(name)
+        return await self._get(_album_key(album_id), name)
+
+    async def list(self, album_id: str) -> Dict[str, int]:
+        """Contagem de cada seleção do álbum"""
+        album_key = _album_key(album_id)
+        entries = await self._run(
+            self.selections.items_with_prefix, f'{album_key}/'
+        )
+        return {
+            key.split('/', 1)[1]: entry['count']
+            for key, entry in sorted(entries.items())
+        }
+
+    async def update(
+        self,
+        album_id: str,
+        name: str,
+        add: Sequence[str] = (),
+        remove: Sequence[str] = (),
+        bitmap: Optional[str] = None,
+    ) -> Bitmap:
+        """
+        Substituir a seleção por `bitmap` (codificado, se houver) e então
+        incluir e retirar fotos. A seleção é criada se não existir.
+        """
+        _check_name(name)
+        album_key = _album_key(album_id)
+        async with self._lock(album_key):
+            if bitmap is None:
+                selection = await self._get(album_key, name) or Bitmap()
+            else:
+                # Vindo do cliente: limitado aos ordinais do álbum e
+                # decodificado fora do event loop
+                ordinals = await self._load_ordinals(album_key)
+                selection = await self._run(
+                    decode_bitmap, bitmap, len(ordinals.keys)
+                )
+
+            if add:
+                selection |= await self._resolve(album_key, list(add))
+            if remove:
+                ordinals = await self._load_ordinals(album_key)
+                selection -= Bitmap.from_ordinals(
+                    ordinals.positions[key]
+                    for key in remove
+                    if key in ordinals.positions
+                )
+            await self._put(album_key, name, selection)
+        return selection
+
+    async def delete(self, album_id: str, name: str) -> bool:
+        _check_name(name)
+        key = f'{_album_key(album_id)}/{name}'
+        return await self._run(self.selections.delete, key)
+
+    async def combine(
+        self,
+        album_id: str,
+        op: str,
+        names: List[str],
+        save_as: Optional[str] = None,
+    ) -> Bitmap:
+        """União, interseção ou diferença (da primeira menos as demais)"""
+        if op not in OPERATIONS:
+            raise ValueError(f'Operação inválida: {op}')
+        for name in [*names, *([save_as] if save_as else [])]:
+            _check_name(name)
+        album_key = _album_key(album_id)
+        bitmaps = await asyncio.gather(*[
+            self._get(album_key, name) for name in names
+        ])
+        missing = [
+            name for name, bitmap in zip(names, bitmaps) if bitmap is None
+        ]
+        if missing:
+            raise ValueError(f'Seleções não encontradas: {", ".join(missing)}')
+
+        result = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            result = OPERATIONS[op](result, bitmap)
+        if save_as:
+            async with self._lock(album_key):
+                await self._put(album_key, save_as, result)
+        return result
+
+    async def image_keys(self, album_id: str, bitmap: Bitmap) -> List[str]:
+        ordinals = await self._load_ordinals(_album_key(album_id))
+        return [ordinals.keys[ordinal] for ordinal in bitmap]
+
+    async def export(
+        self, album_id: str, name: str, size: ImageSize
+    ) -> Optional[SelectionExport]:
+        """URLs das fotos selecionadas no tamanho pedido"""
+        _check_name(name)
+        album_key = _album_key(album_id)
+        selection = await self._get(album_key, name)
+        if selection is None:
+            return None
+
+        album = await self.service.get_all_photos_by_id(album_key)
+        async with self._lock(album_key):
+            ordinals = await self._extend_ordinals(
+                album_key, [photo.id for photo in album.photos]
+            )
+        chosen = {ordinals.keys[ordinal] for ordinal in selection}
+
+        # Na ordem do álbum; as que saíram dele vão para missing
+        selected, missing = [], []
+        for photo in album.photos:
+            if photo.id not in chosen:
+                continue
+            chosen.discard(photo.id)
+            url = _url(photo, size)
+            if url is None:
+                missing.append(photo.id)
+            else:
+                selected.append(SelectedPhotoURL(id=photo.id, url=url))
+        missing.extend(sorted(chosen))
+        return SelectionExport(
+            album_id=album_key,
+            name=name,
+            size=size,
+            photos=selected,
+            missing=missing,
+        )
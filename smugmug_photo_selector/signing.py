@@ -0,0 +1,114 @@
+import base64
+import hashlib
+import hmac
+import secrets
+import time
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, quote, urlsplit
+
+from requests.auth import AuthBase
+
+_FORM_CONTENT_TYPE = 'application/x-www-form-urlencoded'
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+@lru_cache(maxsize=4096)
+def _encode(value: str) -> str:
+    """Percent-encoding do RFC 5849 (só não reservados ficam intactos)"""
+    return quote(value, safe='~')
+
+
+@lru_cache(maxsize=256)
+def _base_string_prefix(
+    method: str, scheme: str, netloc: str, path: str
+) -> str:
+    """
+    Início da base string (método e URI sem a query), igual para todas
+    as páginas de um mesmo endpoint
+    """
+    parts = urlsplit(f'//{netloc}')
+    scheme = scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+    uri = f'{scheme}://{host}{path or "/"}'
+    return f'{method.upper()}&{_encode(uri)}&'
+
+
+class FastOAuth1(AuthBase):
+    """
+    Assinatura OAuth 1.0a HMAC-SHA1 para o requests, equivalente ao
+    OAuth1 do requests_oauthlib, mas com a chave HMAC, os parâmetros
+    fixos e a URI base pré-calculados entre chamadas.
+    """
+
+    signature_method = 'HMAC-SHA1'
+
+    def __init__(
+        self,
+        client_key: str,
+        client_secret: str,
+        resource_owner_key: str,
+        resource_owner_secret: str,
+    ):
+        key = f'{_encode(client_secret)}&{_encode(resource_owner_secret)}'
+        self._hmac = hmac.new(key.encode(), digestmod=hashlib.sha1)
+        self._static_params = [
+            ('oauth_consumer_key', _encode(client_key)),
+            ('oauth_signature_method', self.signature_method),
+            ('oauth_token', _encode(resource_owner_key)),
+            ('oauth_version', '1.0'),
+        ]
+        self._header_prefix = 'OAuth ' + ', '.join(
+            f'{name}="{value}"' for name, value in self._static_params
+        )
+
+    def sign(
+        self,
+        method: str,
+        url: str,
+        body_params: Iterable[Tuple[str, str]] = (),
+        nonce: Optional[str] = None,
+        timestamp: Optional[str] = None,
+    ) -> str:
+        """Gerar o header Authorization para a requisição"""
+        nonce = nonce or secrets.token_hex(16)
+        timestamp = timestamp or str(int(time.time()))
+
+        parts = urlsplit(url)
+        params: List[Tuple[str, str]] = [
+            (_encode(k), _encode(v))
+            for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        ]
+        params.extend((_encode(k), _encode(v)) for k, v in body_params)
+        params.extend(self._static_params)
+        params.append(('oauth_nonce', nonce))
+        params.append(('oauth_timestamp', timestamp))
+        params.sort()
+
+        normalized = '&'.join(f'{k}={v}' for k, v in params)
+        prefix = _base_string_prefix(
+            method, parts.scheme, parts.netloc, parts.path
+        )
+        base_string = prefix + _encode(normalized)
+
+        digest = self._hmac.copy()
+        digest.update(base_string.encode())
+        signature = base64.b64encode(digest.digest()).decode()
+
+        return (
+            f'{self._header_prefix}, oauth_nonce="{nonce}", '
+            f'oauth_timestamp="{timestamp}", '
+            f'oauth_signature="{_encode(signature)}"'
+        )
+
+    def __call__(self, r):
+        body_params: List[Tuple[str, str]] = []
+        content_type = r.headers.get('Content-Type', '')
+        if r.body and content_type.startswith(_FORM_CONTENT_TYPE):
+            body = r.body.decode() if isinstance(r.body, bytes) else r.body
+            body_params = parse_qsl(body, keep_blank_values=True)
+
+        r.headers['Authorization'] = self.sign(r.method, r.url, body_params)
+        return r
@@ -1,59 +1,169 @@
 import asyncio
+import base64
+import binascii
 import logging
 import re
+from collections import OrderedDict
+from dataclasses import dataclass
 from http import HTTPStatus
-from typing import Any, Dict, List, Optional
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
 
 import requests
-from requests_oauthlib import OAuth1
+from pydantic import TypeAdapter
 
+from . import offload, profiling
 from .config import settings
-from .models import AlbumInfo, AlbumResponse, ImageSize, Photo, PhotoURL
+from .credentials import CredentialPool
+from .models import (
+    AlbumInfo,
+    AlbumResponse,
+    ImageSize,
+    Photo,
+    PhotoLookupResponse,
+    PhotoURL,
+)
+from .scheduler import RequestScheduler
 
 logger = logging.getLogger(__name__)
 
+MAX_RESOLVED_URLS = 10_000
+_PHOTO_LIST = TypeAdapter(List[Photo])
+NOT_FOUND = 'Álbum não encontrado'
+PHOTO_NOT_FOUND = 'Foto não encontrada'
+
+
+@dataclass
+class CachedAlbum:
+    """Álbum completo em cache, válido enquanto o álbum não mudar"""
+
+    date_modified: str
+    image_count: int
+    response: AlbumResponse
+    hits: int = 0
+
+    def matches(self, album_info: Dict[str, Any]) -> bool:
+        return (
+            album_info.get('DateModified') == self.date_modified
+            and album_info.get('ImageCount', 0) == self.image_count
+        )
+
+
+@dataclass
+class AlbumData:
+    """Resultado bruto da busca de um álbum no SmugMug"""
+
+    info: Dict[str, Any]
+    images: List[Dict[str, Any]]
+    total: int
+
+
+@dataclass
+class AlbumPage:
+    """Uma página de !images, com os metadados do álbum"""
+
+    info: Dict[str, Any]
+    total: int
+    start: int
+    images: List[Dict[str, Any]]
+    page: int = 1
+    pages: int = 1
+
 
 class SmugMugService:
     def __init__(self):
-        if not all([
-            settings.SMUGMUG_API_KEY,
-            settings.SMUGMUG_API_SECRET,
-            settings.SMUGMUG_ACCESS_TOKEN,
-            settings.SMUGMUG_ACCESS_TOKEN_SECRET,
-        ]):
-            raise ValueError('Credenciais OAuth não configuradas')
-
-        self.oauth = OAuth1(
-            client_key=settings.SMUGMUG_API_KEY,
-            client_secret=settings.SMUGMUG_API_SECRET,
-            resource_owner_key=settings.SMUGMUG_ACCESS_TOKEN,
-            resource_owner_secret=settings.SMUGMUG_ACCESS_TOKEN_SECRET,
-        )
+        self.credentials = CredentialPool.from_settings(settings)
 
         self.session = requests.Session()
-        self.session.auth = self.oauth
         self.session.headers.update({
             'User-Agent': settings.SMUGMUG_USER_AGENT,
             'Accept': 'application/json',
         })
 
+        # URL -> album key (weburilookup) e álbuns completos recentes
+        self.album_keys: 'OrderedDict[str, str]' = OrderedDict()
+        self.album_cache: 'OrderedDict[str, CachedAlbum]' = OrderedDict()
+        # album key -> ImageKey -> Photo, das fotos já buscadas
+        self.photo_index: 'OrderedDict[str, Dict[str, Photo]]' = OrderedDict()
+        # Chamados com cada álbum buscado inteiro (ex.: índice de busca)
+        self.album_listeners: List[Callable[[AlbumResponse], None]] = []
+
+        self.scheduler = RequestScheduler(
+            max_concurrency=settings.MAX_CONCURRENT_REQUESTS,
+            reserved_interactive=settings.RESERVED_INTERACTIVE_SLOTS,
+        )
+
     async def _make_request(
         self, url: str, params: Optional[Dict] = None
     ) -> Dict[str, Any]:
         """Fazer requisição HTTP assíncrona"""
         loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None, lambda: self.session.get(url, params=params)
-        )
+        async with self.scheduler.slot():
+            # Em caso de 429, tentar de novo com outra credencial do pool
+            for _ in range(len(self.credentials)):
+                credential = self.credentials.acquire()
+                try:
+                    response = await loop.run_in_executor(
+                        None,
+                        lambda: self.session.get(
+                            url, params=params, auth=credential.auth
+                        ),
+                    )
+                except BaseException:
+                    # Inclui CancelledError (cliente desconectou, job
+                    # cancelado): a credencial não pode ficar ocupada
+                    self.credentials.release(credential, None)
+                    raise
+
+                throttled = self.credentials.release(
+                    credential,
+                    response.status_code,
+                    response.headers.get('Retry-After'),
+                )
+                if not throttled or not self.credentials.has_available():
+                    break
 
         if response.status_code == HTTPStatus.NOT_FOUND:
-            raise ValueError('Álbum não encontrado')
+            raise ValueError(NOT_FOUND)
         elif response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
             raise ValueError('Rate limit excedido')
         elif response.status_code >= HTTPStatus.BAD_REQUEST:
             raise ValueError(f'Erro HTTP {response.status_code}')
 
-        return response.json()
+        with profiling.span('decode'):
+            return await self._decode(response.content)
+
+    @staticmethod
+    async def _decode(content: bytes) -> Dict[str, Any]:
+        """Decodificar JSON sem travar o event loop em páginas grandes"""
+        if len(content) < settings.OFFLOAD_INLINE_BYTES:
+            return offload.loads(content)
+        # Numa thread, não no pool de processos: o dict volta por pickle,
+        # e desserializá-lo no processo pai custa o mesmo que o JSON
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, offload.loads, content)
+
+    @staticmethod
+    def _normalize_album_id(album_id: str) -> str:
+        """Album key a partir do ID informado (com ou sem 'n-')"""
+        # Validar se o album_id tem formato válido
+        if not album_id or not album_id.strip():
+            raise ValueError('ID do álbum não pode estar vazio')
+
+        # Remover prefixo 'n-' se presente para normalizar
+        return (
+            album_id.replace('n-', '')
+            if album_id.startswith('n-')
+            else album_id
+        )
 
     @staticmethod
     def _extract_album_key(url: str) -> Optional[str]:
@@ -81,6 +191,11 @@ class SmugMugService:
         if album_key:
             return album_key
 
+        # Resolvido antes (inclusive em execuções anteriores)
+        if url in self.album_keys:
+            self.album_keys.move_to_end(url)
+            return self.album_keys[url]
+
         # Usar API weburilookup
         params = {'WebUri': url, '_accept': 'application/json'}
         data = await self._make_request(
@@ -90,7 +205,11 @@ class SmugMugService:
         if 'Response' in data:
             response = data['Response']
             if response.get('Locator') == 'Album' and 'Album' in response:
-                return response['Album']['AlbumKey']
+                album_key = response['Album']['AlbumKey']
+                self.album_keys[url] = album_key
+                if len(self.album_keys) > MAX_RESOLVED_URLS:
+                    self.album_keys.popitem(last=False)
+                return album_key
 
         raise ValueError('Não foi possível encontrar álbum na URL')
 
@@ -138,9 +257,10 @@ class SmugMugService:
 
         return urls
 
-    def _convert_image_to_photo(self, image_data: Dict[str, Any]) -> Photo:
+    @staticmethod
+    def _convert_image_to_photo(image_data: Dict[str, Any]) -> Photo:
         """Converter dados da API para Photo"""
-        urls = self._extract_photo_urls(image_data)
+        urls = SmugMugService._extract_photo_urls(image_data)
 
         # Thumbnail URL
         thumbnail_url = None
@@ -150,99 +270,534 @@ class SmugMugService:
             )
             thumbnail_url = thumb_url or urls[0].url
 
+        keywords = image_data.get('KeywordArray')
+        if keywords is None:
+            keywords = [
+                keyword.strip()
+                for keyword in (image_data.get('Keywords') or '').split(';')
+            ]
+
         return Photo(
             id=image_data.get('ImageKey', ''),
             title=image_data.get('Title'),
+            caption=image_data.get('Caption') or None,
+            keywords=[keyword for keyword in keywords if keyword],
             urls=urls,
             thumbnail_url=thumbnail_url,
         )
 
-    async def get_all_photos(self, url: str) -> AlbumResponse:
-        """Obter todas as fotos de um álbum - FUNÇÃO PRINCIPAL"""
-        album_key = await self._get_album_key(url)
+    @staticmethod
+    async def _convert_images(images: List[Dict[str, Any]]) -> List[Photo]:
+        """Converter imagens, usando o pool de processos em álbuns grandes"""
+        pool = None
+        if len(images) >= settings.OFFLOAD_MIN_IMAGES:
+            pool = offload.get_process_pool(settings.OFFLOAD_PROCESS_WORKERS)
+        if pool is None:
+            return _convert_images_batch(images)
+
+        # Os workers devolvem JSON, e não objetos Photo: desserializar
+        # modelos com pickle custa mais que converter aqui. O JSON de
+        # cada lote é validado (em Rust) com uma pausa entre lotes, então
+        # o event loop nunca para mais que o tempo de um lote.
+        chunk_size = max(settings.OFFLOAD_MIN_IMAGES // 2, 1)
+        loop = asyncio.get_running_loop()
+        futures = [
+            loop.run_in_executor(
+                pool, _convert_images_json, images[i : i + chunk_size]
+            )
+            for i in range(0, len(images), chunk_size)
+        ]
+        photos: List[Photo] = []
+        for future in futures:
+            photos.extend(_PHOTO_LIST.validate_json(await future))
+            await asyncio.sleep(0)
+        return photos
 
-        # Obter info do álbum
-        album_url = f'{settings.SMUGMUG_API_BASE_URL}/album/{album_key}'
-        album_data = await self._make_request(album_url, {'_verbosity': '1'})
+    @staticmethod
+    def _encode_cursor(album_key: str, start: int) -> str:
+        """Gerar cursor opaco para a próxima página"""
+        raw = f'{album_key}:{start}'.encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
 
-        album_info = album_data['Response']['Album']
-        album_title = album_info.get('Title', 'Álbum sem título')
-        total_photos = album_info.get('ImageCount', 0)
+    @staticmethod
+    def _decode_cursor(cursor: str, album_key: str) -> int:
+        """Obter a posição inicial (1-based) de um cursor"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(padded).decode()
+            cursor_album, start = raw.rsplit(':', 1)
+            start = int(start)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise ValueError('Cursor inválido')
+        if cursor_album != album_key or start < 1:
+            raise ValueError('Cursor inválido')
+        return start
+
+    async def _fetch_album_metadata(self, album_key: str) -> Dict[str, Any]:
+        """Obter os metadados do álbum"""
+        album_url = f'{settings.SMUGMUG_API_BASE_URL}/album/{album_key}'
+        with profiling.span('album'):
+            album_data = await self._make_request(
+                album_url, {'_verbosity': '1'}
+            )
+        return album_data['Response']['Album']
 
-        # Obter todas as imagens
+    async def _fetch_images_page(
+        self, album_key: str, start: int, count: int
+    ) -> Dict[str, Any]:
+        """Obter uma página de !images"""
         images_url = (
             f'{settings.SMUGMUG_API_BASE_URL}/album/{album_key}!images'
         )
-        params = {
-            '_verbosity': '2',
-            'count': total_photos or 5000,  # Pegar todas de uma vez
-        }
-
-        images_data = await self._make_request(images_url, params)
-        images = images_data.get('Response', {}).get('AlbumImage', [])
-
-        # Converter para Photo objects
-        photos = [self._convert_image_to_photo(img) for img in images]
-
-        return AlbumResponse(
-            album_title=album_title,
-            album_id=album_key,
-            total_photos=len(photos),
-            photos=photos,
+        params = {'_verbosity': '2', 'start': start, 'count': count}
+        with profiling.span('images'):
+            images_data = await self._make_request(images_url, params)
+        return images_data.get('Response', {})
+
+    async def _album_pages(
+        self, album_key: str, start: int = 1, limit: Optional[int] = None
+    ) -> AsyncIterator[AlbumPage]:
+        """
+        Páginas do álbum à medida que chegam: metadados e primeira
+        página em paralelo e, sem limite, as demais (a partir do bloco
+        Pages) todas de uma vez, na ordem em que ficarem prontas.
+        """
+        first_count = limit or settings.IMAGES_PAGE_SIZE
+        album_info, first_page = await asyncio.gather(
+            self._fetch_album_metadata(album_key),
+            self._fetch_images_page(album_key, start, first_count),
         )
 
-    async def get_all_photos_by_id(self, album_id: str) -> AlbumResponse:
-        """Obter todas as fotos de um álbum pelo ID"""
-        # Validar se o album_id tem formato válido
-        if not album_id or not album_id.strip():
-            raise ValueError('ID do álbum não pode estar vazio')
-
-        # Remover prefixo 'n-' se presente para normalizar
-        album_key = (
-            album_id.replace('n-', '')
-            if album_id.startswith('n-')
-            else album_id
-        )
+        images = list(first_page.get('AlbumImage', []))
+        pages = first_page.get('Pages') or {}
+        total = pages.get('Total', album_info.get('ImageCount', 0))
 
-        # Obter info do álbum
-        album_url = f'{settings.SMUGMUG_API_BASE_URL}/album/{album_key}'
-        album_data = await self._make_request(album_url, {'_verbosity': '1'})
+        # O SmugMug pode devolver menos que o pedido; seguir esse tamanho
+        page_size = len(images)
+        starts = []
+        if limit is None and pages and page_size:
+            starts = list(range(start + page_size, total + 1, page_size))
 
-        album_info = album_data['Response']['Album']
-        album_title = album_info.get('Title', 'Álbum sem título')
-        total_photos = album_info.get('ImageCount', 0)
+        yield AlbumPage(album_info, total, start, images, 1, len(starts) + 1)
+        if not starts:
+            return
 
-        # Obter todas as imagens
-        images_url = (
-            f'{settings.SMUGMUG_API_BASE_URL}/album/{album_key}!images'
+        async def fetch(page_start: int):
+            page = await self._fetch_images_page(
+                album_key, page_start, page_size
+            )
+            return page_start, page
+
+        tasks = [asyncio.ensure_future(fetch(page)) for page in starts]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                page_start, page = await next_done
+                yield AlbumPage(
+                    album_info,
+                    total,
+                    page_start,
+                    list(page.get('AlbumImage', [])),
+                    (page_start - start) // page_size + 1,
+                    len(starts) + 1,
+                )
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _fetch_album(
+        self, album_key: str, start: int = 1, limit: Optional[int] = None
+    ) -> AlbumData:
+        """Buscar o álbum (ou uma página dele) com as imagens em ordem"""
+        pages = [
+            page async for page in self._album_pages(album_key, start, limit)
+        ]
+        pages.sort(key=lambda page: page.start)
+        return AlbumData(
+            info=pages[0].info,
+            images=[image for page in pages for image in page.images],
+            total=pages[0].total,
         )
-        params = {
-            '_verbosity': '2',
-            'count': total_photos or 5000,  # Pegar todas de uma vez
-        }
 
-        images_data = await self._make_request(images_url, params)
-        images = images_data.get('Response', {}).get('AlbumImage', [])
+    async def _get_album_photos(
+        self,
+        album_key: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> AlbumResponse:
+        """Montar o AlbumResponse do álbum inteiro ou de uma página"""
+        if limit is not None and limit < 1:
+            raise ValueError('Limite deve ser maior que zero')
+        if cursor and limit is None:
+            # Sem limit seria o álbum inteiro a partir do cursor, que não
+            # pode ir para o cache nem substituir o índice do álbum
+            raise ValueError('Cursor exige limit')
+        start = self._decode_cursor(cursor, album_key) if cursor else 1
+
+        if limit is None:
+            cached = await self._get_cached_album(album_key)
+            if cached is not None:
+                return cached
+
+        album = await self._fetch_album(album_key, start, limit)
 
         # Converter para Photo objects
-        photos = [self._convert_image_to_photo(img) for img in images]
+        with profiling.span('convert'):
+            photos = await self._convert_images(album.images)
+        self._index_photos(album_key, photos, replace=limit is None)
+
+        next_cursor = None
+        total_photos = len(photos)
+        if limit is not None:
+            total_photos = album.total
+            next_start = start + len(album.images)
+            if album.images and next_start <= album.total:
+                next_cursor = self._encode_cursor(album_key, next_start)
+
+        response = AlbumResponse(
+            album_title=album.info.get('Title', 'Álbum sem título'),
+            album_id=album_key,
+            total_photos=total_photos,
+            photos=photos,
+            next_cursor=next_cursor,
+        )
+        if limit is None:
+            self._album_loaded(album.info, response)
+        return response
+
+    async def _get_cached_album(
+        self, album_key: str
+    ) -> Optional[AlbumResponse]:
+        """
+        Álbum em cache, se ainda atual: só os metadados são pedidos ao
+        SmugMug para comparar DateModified e ImageCount.
+        """
+        cached = self.album_cache.get(album_key)
+        if cached is None:
+            return None
+
+        album_info = await self._fetch_album_metadata(album_key)
+        if not cached.matches(album_info):
+            del self.album_cache[album_key]
+            return None
+
+        cached.hits += 1
+        self.album_cache.move_to_end(album_key)
+        return cached.response.model_copy()
+
+    def _album_loaded(
+        self, album_info: Dict[str, Any], response: AlbumResponse
+    ):
+        """Álbum buscado inteiro do SmugMug: cache e ouvintes"""
+        self._cache_album(album_info, response)
+        for listener in self.album_listeners:
+            try:
+                listener(response)
+            except Exception as e:
+                logger.error(f'Ouvinte de {response.album_id} falhou: {e}')
+
+    def _cache_album(
+        self, album_info: Dict[str, Any], response: AlbumResponse
+    ):
+        if not album_info.get('DateModified'):
+            return
+        previous = self.album_cache.pop(response.album_id, None)
+        self.album_cache[response.album_id] = CachedAlbum(
+            date_modified=album_info['DateModified'],
+            image_count=album_info.get('ImageCount', 0),
+            response=response,
+            hits=previous.hits + 1 if previous else 1,
+        )
+        while len(self.album_cache) > settings.ALBUM_CACHE_SIZE:
+            self.album_cache.popitem(last=False)
+
+    async def _stream_album(
+        self, album_key: str
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Eventos (nome, dados) do álbum inteiro: 'album' com os
+        metadados, 'photos' com as fotos de cada página assim que ela
+        chega e é convertida, e 'done' no fim. O álbum completo entra
+        no cache e no índice como em _get_album_photos.
+        """
+        cached = await self._get_cached_album(album_key)
+        if cached is not None:
+            yield (
+                'album',
+                {
+                    'album_id': album_key,
+                    'album_title': cached.album_title,
+                    'total_photos': cached.total_photos,
+                    'pages': 1,
+                },
+            )
+            yield (
+                'photos',
+                {
+                    'page': 1,
+                    'pages': 1,
+                    'pages_done': 1,
+                    'start': 1,
+                    'photos': cached.photos,
+                },
+            )
+            yield (
+                'done',
+                {
+                    'album_id': album_key,
+                    'total_photos': cached.total_photos,
+                },
+            )
+            return
+
+        converted: List[Tuple[int, List[Photo]]] = []
+        album_info: Dict[str, Any] = {}
+        async for page in self._album_pages(album_key):
+            if not converted:
+                album_info = page.info
+                yield (
+                    'album',
+                    {
+                        'album_id': album_key,
+                        'album_title': album_info.get(
+                            'Title', 'Álbum sem título'
+                        ),
+                        'total_photos': page.total,
+                        'pages': page.pages,
+                    },
+                )
+            with profiling.span('convert'):
+                photos = await self._convert_images(page.images)
+            converted.append((page.start, photos))
+            yield (
+                'photos',
+                {
+                    'page': page.page,
+                    'pages': page.pages,
+                    'pages_done': len(converted),
+                    'start': page.start,
+                    'photos': photos,
+                },
+            )
 
-        return AlbumResponse(
-            album_title=album_title,
+        converted.sort(key=lambda item: item[0])
+        photos = [photo for _, batch in converted for photo in batch]
+        response = AlbumResponse(
+            album_title=album_info.get('Title', 'Álbum sem título'),
             album_id=album_key,
             total_photos=len(photos),
             photos=photos,
         )
+        self._index_photos(album_key, photos, replace=True)
+        self._album_loaded(album_info, response)
+        yield 'done', {'album_id': album_key, 'total_photos': len(photos)}
+
+    async def stream_photos(
+        self, url: str
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Eventos de progresso do álbum da URL (ver _stream_album)"""
+        with profiling.span('resolve'):
+            album_key = await self._get_album_key(url)
+        yield 'resolved', {'album_id': album_key}
+        async for event in self._stream_album(album_key):
+            yield event
+
+    async def stream_photos_by_id(
+        self, album_id: str
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Eventos de progresso do álbum pelo ID (ver _stream_album)"""
+        album_key = self._normalize_album_id(album_id)
+        async for event in self._stream_album(album_key):
+            yield event
+
+    async def get_all_photos(
+        self,
+        url: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> AlbumResponse:
+        """Obter todas as fotos de um álbum - FUNÇÃO PRINCIPAL"""
+        with profiling.span('resolve'):
+            album_key = await self._get_album_key(url)
+        return await self._get_album_photos(album_key, limit, cursor)
+
+    async def get_all_photos_by_id(
+        self,
+        album_id: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> AlbumResponse:
+        """Obter todas as fotos de um álbum pelo ID"""
+        album_key = self._normalize_album_id(album_id)
+        return await self._get_album_photos(album_key, limit, cursor)
+
+    async def get_photos_page(
+        self, album_id: str, start: int, count: int
+    ) -> Tuple[List[Photo], Optional[int]]:
+        """
+        Fotos de `count` posições a partir de `start` (1-based) e o total
+        atual do álbum (do bloco Pages), numa única chamada a !images:
+        sem metadados, cache nem índice, para quem já planejou as páginas.
+        """
+        album_key = self._normalize_album_id(album_id)
+        page = await self._fetch_images_page(album_key, start, count)
+        photos = await self._convert_images(page.get('AlbumImage', []))
+        return photos, (page.get('Pages') or {}).get('Total')
+
+    async def _fetch_image(self, image_key: str) -> Dict[str, Any]:
+        """Obter os dados de uma imagem pelo ImageKey"""
+        image_url = f'{settings.SMUGMUG_API_BASE_URL}/image/{image_key}'
+        try:
+            image_data = await self._make_request(
+                image_url, {'_verbosity': '1'}
+            )
+        except ValueError as e:
+            if str(e) == NOT_FOUND:
+                raise ValueError(PHOTO_NOT_FOUND) from e
+            raise
+        return image_data.get('Response', {}).get('Image', {})
+
+    async def _fetch_album_image(
+        self, album_key: str, image_key: str
+    ) -> Dict[str, Any]:
+        """
+        Obter a imagem pelo /image, só se ela for do álbum (pela URI
+        ImageAlbum); de outro álbum conta como não encontrada.
+        """
+        image = await self._fetch_image(image_key)
+        album_uri = image.get('Uris', {}).get('ImageAlbum')
+        if isinstance(album_uri, dict):
+            album_uri = album_uri.get('Uri')
+        owner = (album_uri or '').rstrip('/').rsplit('/', 1)[-1]
+        if owner != album_key:
+            raise ValueError(PHOTO_NOT_FOUND)
+        return image
+
+    async def get_image_metadata(self, image_key: str) -> Dict[str, Any]:
+        """Obter o EXIF de uma imagem (!metadata)"""
+        metadata_url = (
+            f'{settings.SMUGMUG_API_BASE_URL}/image/{image_key}!metadata'
+        )
+        data = await self._make_request(metadata_url)
+        return data.get('Response', {}).get('ImageMetadata', {})
+
+    async def get_image_urls(self, image_key: str) -> List[PhotoURL]:
+        """Obter as URLs de uma imagem pelo ImageKey"""
+        image = await self._fetch_image(image_key)
+        return self._extract_photo_urls(image)
+
+    def _index_photos(
+        self, album_key: str, photos: Iterable[Photo], replace: bool
+    ):
+        """
+        Indexar fotos por ImageKey. Álbum completo substitui o índice
+        (fotos removidas somem); páginas só acrescentam.
+        """
+        index = self.photo_index.pop(album_key, None)
+        if replace or index is None:
+            index = {}
+        index.update((photo.id, photo) for photo in photos)
+        self.photo_index[album_key] = index
+        while len(self.photo_index) > settings.PHOTO_INDEX_ALBUMS:
+            self.photo_index.popitem(last=False)
+
+    def _album_index(self, album_key: str) -> Optional[Dict[str, Photo]]:
+        index = self.photo_index.get(album_key)
+        if index is not None:
+            self.photo_index.move_to_end(album_key)
+            return index
+
+        # Álbuns vindos do warm cache ainda não têm índice
+        cached = self.album_cache.get(album_key)
+        if cached is None:
+            return None
+        self._index_photos(album_key, cached.response.photos, replace=True)
+        return self.photo_index[album_key]
+
+    def indexed_photo(self, image_key: str) -> Optional[Photo]:
+        """Foto já vista em algum álbum indexado, sem requisição"""
+        for index in self.photo_index.values():
+            photo = index.get(image_key)
+            if photo is not None:
+                return photo
+        return None
+
+    async def get_photo(self, album_id: str, image_key: str) -> Photo:
+        """
+        Obter uma foto do álbum pelo índice; se ela ainda não foi vista,
+        pelo endpoint /image do SmugMug.
+        """
+        album_key = self._normalize_album_id(album_id)
+        index = self._album_index(album_key) or {}
+        photo = index.get(image_key)
+        if photo is not None:
+            return photo
+        image = await self._fetch_album_image(album_key, image_key)
+        return self._convert_image_to_photo(image)
+
+    async def get_photos(
+        self, album_id: str, image_keys: List[str]
+    ) -> PhotoLookupResponse:
+        """
+        Obter várias fotos do álbum pelo índice. Com poucas ausentes,
+        busca cada uma no /image (conferindo o álbum); com muitas,
+        busca o álbum inteiro (reindexando-o) em vez de uma chamada por
+        foto.
+        """
+        album_key = self._normalize_album_id(album_id)
+        keys = list(dict.fromkeys(image_keys))
+        if len(keys) > settings.MAX_PAGE_SIZE:
+            raise ValueError(
+                f'No máximo {settings.MAX_PAGE_SIZE} fotos por consulta'
+            )
+
+        def lookup() -> Dict[str, Photo]:
+            index = self._album_index(album_key) or {}
+            return {key: index[key] for key in keys if key in index}
+
+        found = lookup()
+        missing = [key for key in keys if key not in found]
+        if len(missing) > settings.PHOTO_LOOKUP_MAX_FALLBACK:
+            # Vindo do album_cache o álbum não é reindexado, e o índice
+            # pode ter só uma página: reindexar pelo álbum inteiro
+            album = await self._get_album_photos(album_key)
+            self._index_photos(album_key, album.photos, replace=True)
+            found = lookup()
+        elif missing:
+            images = await asyncio.gather(
+                *[self._fetch_album_image(album_key, key) for key in missing],
+                return_exceptions=True,
+            )
+            # Só "não encontrada" vira missing; 429, 5xx etc. sobem
+            for key, image in zip(missing, images):
+                if (
+                    isinstance(image, ValueError)
+                    and str(image) == PHOTO_NOT_FOUND
+                ):
+                    continue
+                if isinstance(image, BaseException):
+                    raise image
+                found[key] = self._convert_image_to_photo(image)
+
+        return PhotoLookupResponse(
+            album_id=album_key,
+            photos=[found[key] for key in keys if key in found],
+            missing=[key for key in keys if key not in found],
+        )
 
     async def get_album_info(self, url: str) -> AlbumInfo:
         """Obter informações básicas de um álbum"""
-        album_key = await self._get_album_key(url)
+        with profiling.span('resolve'):
+            album_key = await self._get_album_key(url)
+        return await self._get_album_info(album_key)
 
-        # Obter info detalhada do álbum
-        album_url = f'{settings.SMUGMUG_API_BASE_URL}/album/{album_key}'
-        album_data = await self._make_request(album_url, {'_verbosity': '1'})
+    async def get_album_info_by_id(self, album_id: str) -> AlbumInfo:
+        """Obter informações básicas de um álbum pelo ID"""
+        return await self._get_album_info(self._normalize_album_id(album_id))
 
-        album_info = album_data['Response']['Album']
+    async def _get_album_info(self, album_key: str) -> AlbumInfo:
+        """Montar o AlbumInfo a partir dos metadados do álbum"""
+        # Obter info detalhada do álbum
+        album_info = await self._fetch_album_metadata(album_key)
 
         # Construir URL do álbum
         album_url_web = f'https://www.smugmug.com/album/{album_key}'
@@ -257,3 +812,13 @@ class SmugMugService:
             date_created=album_info.get('DateCreated'),
             date_modified=album_info.get('DateModified'),
         )
+
+
+def _convert_images_batch(images: List[Dict[str, Any]]) -> List[Photo]:
+    """Converter um lote de imagens"""
+    return [SmugMugService._convert_image_to_photo(img) for img in images]
+
+
+def _convert_images_json(images: List[Dict[str, Any]]) -> bytes:
+    """Converter um lote no pool de processos, devolvendo o JSON"""
+    return _PHOTO_LIST.dump_json(_convert_images_batch(images))
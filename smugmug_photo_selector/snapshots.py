@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .scheduler import Priority, request_context
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.json'
+VERSION = 1
+
+
+def _album_key(album_id: str) -> str:
+    return album_id[2:] if album_id.startswith('n-') else album_id
+
+
+class SnapshotStore:
+    """
+    Snapshots do AlbumResponse em disco (JSON e JSON gzip), com um
+    index.json trocado de forma atômica apontando a versão atual de
+    cada álbum. O diretório pode ser servido por qualquer servidor
+    estático; a aplicação relê o índice quando ele muda.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._index: Dict[str, Dict[str, Any]] = {}
+        self._index_mtime: Optional[float] = None
+
+    def index(self) -> Dict[str, Dict[str, Any]]:
+        """Índice atual, relido só quando o arquivo muda"""
+        path = self.directory / INDEX_FILE
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            self._index, self._index_mtime = {}, None
+            return self._index
+        if mtime != self._index_mtime:
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError) as e:
+                logger.warning(f'Índice de snapshots ignorado: {e}')
+                data = {}
+            if data.get('version') == VERSION:
+                self._index = data.get('albums', {})
+            else:
+                self._index = {}
+            self._index_mtime = mtime
+        return self._index
+
+    def fresh_path(
+        self, album_id: str, max_age: float, compressed: bool = False
+    ) -> Optional[Path]:
+        """
+        Arquivo do snapshot do álbum, se conferido com o SmugMug há no
+        máximo `max_age` segundos.
+        """
+        entry = self.index().get(_album_key(album_id))
+        if entry is None or time.time() - entry['checked_at'] > max_age:
+            return None
+        path = self.directory / entry['gzip' if compressed else 'json']
+        return path if path.is_file() else None
+
+    def write_index(self, albums: Dict[str, Dict[str, Any]]):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / INDEX_FILE
+        temp_path = path.with_suffix('.tmp')
+        temp_path.write_text(
+            json.dumps({'version': VERSION, 'albums': albums})
+        )
+        os.replace(temp_path, path)
+        self._index, self._index_mtime = albums, path.stat().st_mtime
+
+    def remove_stale(self, albums: Dict[str, Dict[str, Any]]):
+        """Apagar versões que o índice não referencia mais"""
+        current = {
+            name
+            for entry in albums.values()
+            for name in (entry['json'], entry['gzip'])
+        }
+        for path in self.directory.glob('*.json*'):
+            if path.name != INDEX_FILE and path.name not in current:
+                path.unlink(missing_ok=True)
+
+    def write_files(self, album_key: str, version: str, payload: bytes):
+        """Gravar o JSON e o gzip da versão (antes de trocar o índice)"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        names = {
+            'json': f'{album_key}.{version}.json',
+            'gzip': f'{album_key}.{version}.json.gz',
+        }
+        for kind, content in (
+            ('json', payload),
+            ('gzip', gzip.compress(payload, compresslevel=9, mtime=0)),
+        ):
+            path = self.directory / names[kind]
+            temp_path = path.with_name(f'.{path.name}.tmp')
+            temp_path.write_bytes(content)
+            os.replace(temp_path, path)
+        return names
+
+
+class SnapshotExporter:
+    """
+    Atualizar os snapshots de uma lista de álbuns em paralelo,
+    renderizando de novo só os que mudaram (DateModified/ImageCount).
+    """
+
+    def __init__(self, service, store: SnapshotStore, concurrency: int = 4):
+        self.service = service
+        self.store = store
+        self.concurrency = max(1, concurrency)
+
+    @staticmethod
+    def _version(date_modified: Optional[str], image_count: int) -> str:
+        raw = f'{date_modified}:{image_count}'
+        return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+    async def _refresh_album(
+        self, album_id: str, previous: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        info = await self.service.get_album_info_by_id(album_id)
+        version = self._version(info.date_modified, info.total_photos)
+        if previous is not None and previous['version'] == version:
+            return {**previous, 'checked_at': time.time()}
+
+        album = await self.service.get_all_photos_by_id(album_id)
+        payload = album.model_dump_json().encode()
+        loop = asyncio.get_running_loop()
+        names = await loop.run_in_executor(
+            None, self.store.write_files, album.album_id, version, payload
+        )
+        logger.info(f'Snapshot de {album.album_id} gerado ({version})')
+        return {
+            'version': version,
+            'date_modified': info.date_modified,
+            'image_count': info.total_photos,
+            'generated_at': time.time(),
+            'checked_at': time.time(),
+            **names,
+        }
+
+    async def refresh(self, album_ids: List[str]) -> Dict[str, bool]:
+        """
+        Conferir e, se preciso, renderizar os álbuns. Retorna, por
+        álbum, se um snapshot novo foi gerado. Falhas mantêm o anterior.
+        """
+        albums = dict(self.store.index())
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def refresh_one(album_id: str):
+            async with semaphore:
+                return await self._refresh_album(
+                    album_id, albums.get(_album_key(album_id))
+                )
+
+        with request_context(Priority.BULK, 'snapshots'):
+            results = await asyncio.gather(
+                *[refresh_one(album_id) for album_id in album_ids],
+                return_exceptions=True,
+            )
+
+        rendered = {}
+        for album_id, result in zip(album_ids, results):
+            album_key = _album_key(album_id)
+            previous = albums.get(album_key)
+            if isinstance(result, Exception):
+                logger.error(f'Snapshot de {album_key} falhou: {result}')
+                rendered[album_key] = False
+                continue
+            albums[album_key] = result
+            rendered[album_key] = (
+                previous is None or previous['version'] != result['version']
+            )
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.store.write_index, albums)
+        await loop.run_in_executor(None, self.store.remove_stale, albums)
+        return rendered
+
+    async def run_forever(self, album_ids: List[str], interval: float):
+        """Atualizar os snapshots a cada `interval` segundos"""
+        while True:
+            try:
+                await self.refresh(album_ids)
+            except Exception as e:
+                logger.error(f'Atualização de snapshots falhou: {e}')
+            await asyncio.sleep(interval)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Gerar os snapshots uma vez, fora da aplicação"""
+    from . import offload  # noqa: PLC0415
+    from .config import settings  # noqa: PLC0415
+    from .smugmug_service import SmugMugService  # noqa: PLC0415
+
+    parser = argparse.ArgumentParser(
+        description='Exportar snapshots estáticos de álbuns SmugMug'
+    )
+    parser.add_argument(
+        'albums',
+        nargs='*',
+        default=settings.SNAPSHOT_ALBUMS,
+        help='IDs dos álbuns (padrão: SNAPSHOT_ALBUMS)',
+    )
+    parser.add_argument('--output', default=settings.SNAPSHOT_DIR)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    exporter = SnapshotExporter(
+        SmugMugService(),
+        SnapshotStore(args.output),
+        concurrency=settings.SNAPSHOT_CONCURRENCY,
+    )
+    try:
+        rendered = asyncio.run(exporter.refresh(args.albums))
+    finally:
+        offload.shutdown_process_pool()
+    for album_key, changed in rendered.items():
+        print(f'{album_key}: {"atualizado" if changed else "sem mudanças"}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Limite de parâmetros por consulta em versões antigas do SQLite
+_BATCH = 900
+
+
+class KeyValueStore:
+    """
+    Tabela chave/valor (JSON) em SQLite, para caches que precisam
+    sobreviver a reinícios. Segura para uso a partir de várias threads.
+    """
+
+    def __init__(self, path: str, table: str):
+        if not table.isidentifier():
+            raise ValueError(f'Nome de tabela inválido: {table}')
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {table} '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL)'
+            )
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        found: Dict[str, Any] = {}
+        with self._lock:
+            for i in range(0, len(keys), _BATCH):
+                batch = keys[i : i + _BATCH]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f'SELECT key, value FROM {self.table} '
+                    f'WHERE key IN ({placeholders})',
+                    batch,
+                )
+                found.update((key, json.loads(value)) for key, value in rows)
+        return found
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.get_many([key]).get(key, default)
+
+    def put_many(self, items: Iterable[Tuple[str, Any]]):
+        rows: List[Tuple[str, str]] = [
+            (key, json.dumps(value, separators=(',', ':')))
+            for key, value in items
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f'INSERT OR REPLACE INTO {self.table} (key, value) '
+                'VALUES (?, ?)',
+                rows,
+            )
+
+    def put(self, key: str, value: Any):
+        self.put_many([(key, value)])
+
+    def items_with_prefix(self, prefix: str) -> Dict[str, Any]:
+        # Faixa [prefix, prefix + U+10FFFF) usa o índice da chave primária
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT key, value FROM {self.table} '
+                'WHERE key >= ? AND key < ?',
+                (prefix, prefix + '\U0010ffff'),
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def delete(self, key: str) -> bool:
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f'DELETE FROM {self.table} WHERE key = ?', (key,)
+            )
+        return cursor.rowcount > 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from .models import AlbumResponse
+from .smugmug_service import CachedAlbum, SmugMugService
+
+logger = logging.getLogger(__name__)
+
+VERSION = 1
+
+
+class WarmCache:
+    """
+    Salvar em disco o que o serviço aprendeu (album keys resolvidas e
+    os álbuns mais acessados) para não recomeçar do zero após o
+    desligamento da máquina.
+    """
+
+    def __init__(self, path: str, max_albums: int):
+        self.path = Path(path)
+        self.max_albums = max_albums
+
+    def read(self) -> Tuple[Dict[str, str], List[CachedAlbum]]:
+        """Ler e validar o arquivo (pode rodar fora do event loop)"""
+        try:
+            data = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return {}, []
+        except (OSError, ValueError) as e:
+            logger.warning(f'Warm cache ignorado: {e}')
+            return {}, []
+        if data.get('version') != VERSION:
+            return {}, []
+
+        albums = [
+            CachedAlbum(
+                date_modified=entry['date_modified'],
+                image_count=entry['image_count'],
+                response=AlbumResponse.model_validate(entry['response']),
+                hits=entry.get('hits', 0),
+            )
+            for entry in data.get('albums', [])
+        ]
+        return data.get('album_keys', {}), albums
+
+    @staticmethod
+    def apply(
+        service: SmugMugService,
+        album_keys: Dict[str, str],
+        albums: List[CachedAlbum],
+    ):
+        """Restaurar no serviço sem sobrescrever o que já foi buscado"""
+        for url, album_key in album_keys.items():
+            service.album_keys.setdefault(url, album_key)
+        for cached in albums:
+            service.album_cache.setdefault(cached.response.album_id, cached)
+
+    async def load(self, service: SmugMugService) -> int:
+        """Restaurar o cache no serviço; retorna quantos álbuns vieram"""
+        loop = asyncio.get_running_loop()
+        album_keys, albums = await loop.run_in_executor(None, self.read)
+        self.apply(service, album_keys, albums)
+        if albums:
+            logger.info(f'Warm cache: {len(albums)} álbuns restaurados')
+        return len(albums)
+
+    def save(self, service: SmugMugService):
+        """Gravar de forma atômica os álbuns mais acessados"""
+        hot = sorted(
+            service.album_cache.values(), key=lambda c: c.hits, reverse=True
+        )[: self.max_albums]
+        data = {
+            'version': VERSION,
+            'album_keys': dict(service.album_keys),
+            'albums': [
+                {
+                    'date_modified': cached.date_modified,
+                    'image_count': cached.image_count,
+                    'hits': cached.hits,
+                    'response': cached.response.model_dump(mode='json'),
+                }
+                # Menos acessados primeiro: o LRU do serviço mantém a ordem
+                for cached in reversed(hot)
+            ],
+        }
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix('.tmp')
+        temp_path.write_text(json.dumps(data, separators=(',', ':')))
+        os.replace(temp_path, self.path)
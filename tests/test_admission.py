@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from smugmug_photo_selector.admission import (
+    AdmissionLimiter,
+    AdmissionRejected,
+)
+
+
+async def _hold(limiter, client, release, order=None):
+    async with limiter.slot(client):
+        if order is not None:
+            order.append(client)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_is_full():
+    limiter = AdmissionLimiter(max_concurrency=1, max_queue=1, queue_timeout=5)
+    release = asyncio.Event()
+    running = asyncio.create_task(_hold(limiter, 'a', release))
+    queued = asyncio.create_task(_hold(limiter, 'b', release))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as exc:
+        await limiter.acquire('c')
+
+    assert exc.value.retry_after >= 1
+    assert limiter.stats()['rejected'] == 1
+    release.set()
+    await asyncio.gather(running, queued)
+    assert limiter.active == 0
+    assert limiter.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_deadline():
+    limiter = AdmissionLimiter(
+        max_concurrency=1, max_queue=4, queue_timeout=0.01
+    )
+    release = asyncio.Event()
+    running = asyncio.create_task(_hold(limiter, 'a', release))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected):
+        await limiter.acquire('b')
+
+    assert limiter.stats()['timed_out'] == 1
+    assert limiter.queued == 0
+    release.set()
+    await running
+
+
+@pytest.mark.asyncio
+async def test_per_client_limit():
+    limiter = AdmissionLimiter(
+        max_concurrency=4, max_queue=4, queue_timeout=5, max_per_client=1
+    )
+    release = asyncio.Event()
+    running = asyncio.create_task(_hold(limiter, 'a', release))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected):
+        await limiter.acquire('a')
+    await limiter.acquire('b')
+    limiter.release('b')
+
+    release.set()
+    await running
+
+
+@pytest.mark.asyncio
+async def test_queue_alternates_between_clients():
+    limiter = AdmissionLimiter(max_concurrency=1, max_queue=8, queue_timeout=5)
+    release = asyncio.Event()
+    release.set()
+    blocker = asyncio.Event()
+    order = []
+
+    running = asyncio.create_task(_hold(limiter, 'x', blocker))
+    await asyncio.sleep(0)
+    tasks = [
+        asyncio.create_task(_hold(limiter, client, release, order))
+        for client in ['a', 'a', 'a', 'b', 'b']
+    ]
+    await asyncio.sleep(0)
+    blocker.set()
+    await asyncio.gather(running, *tasks)
+
+    assert order == ['a', 'b', 'a', 'b', 'a']
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_queue():
+    limiter = AdmissionLimiter(max_concurrency=1, max_queue=4, queue_timeout=5)
+    release = asyncio.Event()
+    running = asyncio.create_task(_hold(limiter, 'a', release))
+    await asyncio.sleep(0)
+    waiting = asyncio.create_task(limiter.acquire('b'))
+    await asyncio.sleep(0)
+
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+    assert limiter.queued == 0
+    release.set()
+    await running
+    assert limiter.active == 0
@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from smugmug_photo_selector.bitmap import CHUNK_BITS, Bitmap
+
+HEADER_BYTES = 2 + 5  # cabeçalho + um contêiner
+
+
+@pytest.mark.parametrize(
+    'ordinals',
+    [
+        [],
+        [0],
+        [5, 17, 4095],
+        list(range(1000, 30000)),  # sequência: contêiner de runs
+        random.Random(1).sample(range(20000), 12000),  # denso: bitmap
+        [3, CHUNK_BITS + 7, 5 * CHUNK_BITS],  # blocos vazios no meio
+    ],
+)
+def test_round_trip(ordinals):
+    bitmap = Bitmap.from_ordinals(ordinals)
+
+    assert list(bitmap) == sorted(set(ordinals))
+    assert len(bitmap) == len(set(ordinals))
+    assert Bitmap.from_bytes(bitmap.to_bytes()) == bitmap
+
+
+def test_compact_encoding():
+    # 20 mil fotos seguidas cabem em um único run
+    assert len(Bitmap.range(20000).to_bytes()) == HEADER_BYTES + 4
+    # Poucas fotos esparsas: 2 bytes cada
+    sparse = Bitmap.from_ordinals(range(0, 20000, 100))
+    assert len(sparse.to_bytes()) == HEADER_BYTES + 2 * len(sparse)
+
+
+def test_set_operations():
+    a = Bitmap.from_ordinals([1, 2, 3])
+    b = Bitmap.from_ordinals([2, 3, 4])
+
+    assert list(a | b) == [1, 2, 3, 4]
+    assert list(a & b) == [2, 3]
+    assert list(a - b) == [1]
+    assert set(a) <= set(a | b)
+    assert [n in a for n in range(5)] == [False, True, True, True, False]
+
+
+def test_limit_rejects_ordinals_outside():
+    bitmap = Bitmap.from_ordinals([0, 9])
+
+    assert Bitmap.from_bytes(bitmap.to_bytes(), limit=10) == bitmap
+    with pytest.raises(ValueError, match='fora do intervalo'):
+        Bitmap.from_bytes(bitmap.to_bytes(), limit=9)
+    # Bloco de chave 65535: rejeitado pela chave, antes de ser montado
+    far = b'\x01\x00\xff\xff\x00\x01\x00\x00\x00'
+    with pytest.raises(ValueError, match='fora do intervalo'):
+        Bitmap.from_bytes(far, limit=CHUNK_BITS)
+
+
+@pytest.mark.parametrize(
+    'data',
+    [
+        b'',
+        b'\x01\x00',
+        b'\x01\x00\x00\x00\x09\x00\x00',
+        b'\x00\x00!',
+        # Run que passa do fim do bloco
+        b'\x01\x00\x00\x00\x02\x01\x00\xff\xff\x01\x00',
+    ],
+)
+def test_invalid_bytes(data):
+    with pytest.raises(ValueError, match='Bitmap inválido'):
+        Bitmap.from_bytes(data)
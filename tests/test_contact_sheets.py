@@ -0,0 +1,86 @@
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from smugmug_photo_selector.contact_sheets import (
+    ContactSheetBuilder,
+    SheetLayout,
+)
+from smugmug_photo_selector.models import AlbumResponse, ImageSize, Photo
+
+Image = pytest.importorskip('PIL.Image')
+
+PHOTO_COUNT = 5
+CELL = 20
+LAYOUT = SheetLayout(columns=2, rows=2, cell=CELL)
+
+
+@pytest.fixture
+def builder(tmp_path):
+    album = AlbumResponse(
+        album_title='Sheets',
+        album_id='ABC123',
+        total_photos=PHOTO_COUNT,
+        photos=[
+            Photo(id=f'img{i}', urls=[], thumbnail_url=f'https://cdn/{i}')
+            for i in range(PHOTO_COUNT)
+        ],
+    )
+    service = AsyncMock()
+    service.get_all_photos_by_id.return_value = album
+
+    thumbs = tmp_path / 'thumbs'
+    thumbs.mkdir()
+
+    async def fake_get(image_key, size):
+        path = thumbs / f'{image_key}.jpg'
+        Image.new('RGB', (40, 30), (200, 0, 0)).save(path)
+        return path
+
+    proxy = AsyncMock()
+    proxy.acquire.side_effect = fake_get
+    proxy.remember = Mock()
+    proxy.release = Mock()
+    return ContactSheetBuilder(
+        service, proxy, str(tmp_path / 'sheets'), LAYOUT, workers=0
+    )
+
+
+@pytest.mark.asyncio
+async def test_manifest_pages_and_offsets(builder):
+    manifest = await builder.get_manifest('ABC123', ImageSize.THUMB)
+
+    assert manifest.total_photos == PHOTO_COUNT
+    assert [len(sheet.photos) for sheet in manifest.sheets] == [4, 1]
+
+    entry = manifest.sheets[0].photos[1]
+    assert entry.id == 'img1'
+    assert (entry.width, entry.height) == (CELL, 15)
+    assert entry.x == CELL  # segunda coluna
+
+    builder.image_proxy.remember.assert_called_once_with(
+        builder.service.get_all_photos_by_id.return_value.photos
+    )
+    # Todas as miniaturas fixadas são liberadas depois do render
+    assert builder.image_proxy.release.call_count == PHOTO_COUNT
+
+    path = builder.sheet_path('ABC123', manifest.version, 1)
+    with Image.open(path) as sheet:
+        assert sheet.size == (2 * CELL, CELL)
+
+
+@pytest.mark.asyncio
+async def test_manifest_is_reused_for_same_version(builder):
+    first = await builder.get_manifest('ABC123', ImageSize.THUMB)
+    downloads = builder.image_proxy.acquire.await_count
+
+    second = await builder.get_manifest('ABC123', ImageSize.THUMB)
+
+    assert second == first
+    assert builder.image_proxy.acquire.await_count == downloads
+
+
+@pytest.mark.asyncio
+async def test_large_sizes_rejected(builder):
+    with pytest.raises(ValueError, match='Thumb ou Small'):
+        await builder.get_manifest('ABC123', ImageSize.LARGE)
@@ -0,0 +1,78 @@
+from http import HTTPStatus
+from unittest.mock import Mock
+
+import pytest
+
+from smugmug_photo_selector.credentials import (
+    ROUND_ROBIN,
+    Credential,
+    CredentialPool,
+)
+
+BACKOFF_BASE = 30.0
+RETRY_AFTER = 120.0
+
+
+@pytest.fixture
+def pool():
+    return CredentialPool(
+        [Credential(name, Mock()) for name in ('a', 'b', 'c')],
+        backoff_base=BACKOFF_BASE,
+    )
+
+
+def test_least_loaded_selection(pool):
+    first = pool.acquire()
+    second = pool.acquire()
+    third = pool.acquire()
+
+    assert {first.name, second.name, third.name} == {'a', 'b', 'c'}
+
+    pool.release(second, HTTPStatus.OK)
+    assert pool.acquire() is second
+
+
+def test_round_robin_selection():
+    pool = CredentialPool(
+        [Credential(name, Mock()) for name in ('a', 'b')],
+        strategy=ROUND_ROBIN,
+    )
+
+    names = []
+    for _ in range(4):
+        credential = pool.acquire()
+        names.append(credential.name)
+        pool.release(credential, HTTPStatus.OK)
+
+    assert names == ['a', 'b', 'a', 'b']
+
+
+def test_throttled_credential_is_ejected(pool):
+    credential = pool.acquire()
+    assert pool.release(
+        credential, HTTPStatus.TOO_MANY_REQUESTS, str(RETRY_AFTER)
+    )
+
+    stats = {s.name: s for s in pool.stats()}
+    assert not stats[credential.name].available
+    assert stats[credential.name].throttled == 1
+    assert stats[credential.name].cooldown_seconds > BACKOFF_BASE
+
+    for _ in range(10):
+        other = pool.acquire()
+        assert other is not credential
+        pool.release(other, HTTPStatus.OK)
+
+
+def test_all_throttled_raises():
+    pool = CredentialPool([Credential('a', Mock())])
+    credential = pool.acquire()
+    pool.release(credential, HTTPStatus.TOO_MANY_REQUESTS)
+
+    with pytest.raises(ValueError, match='Rate limit excedido'):
+        pool.acquire()
+
+
+def test_empty_pool_raises():
+    with pytest.raises(ValueError, match='Credenciais OAuth não configuradas'):
+        CredentialPool([])
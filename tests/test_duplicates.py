@@ -0,0 +1,150 @@
+import random
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from smugmug_photo_selector import duplicates
+from smugmug_photo_selector.duplicates import (
+    DuplicateDetector,
+    compute_dhashes,
+    group_near_duplicates,
+)
+from smugmug_photo_selector.models import AlbumResponse, Photo
+from smugmug_photo_selector.storage import KeyValueStore
+
+np = pytest.importorskip('numpy')
+Image = pytest.importorskip('PIL.Image')
+
+MAX_DISTANCE = 6
+
+
+def _gradient(path, reverse=False, offset=0):
+    row = np.linspace(0, 200, 64)
+    if reverse:
+        row = row[::-1]
+    pixels = np.tile(row + offset, (48, 1)).astype(np.uint8)
+    Image.fromarray(pixels).convert('RGB').save(path)
+    return str(path)
+
+
+def _brute_force(hashes, max_distance):
+    values = [int(h, 16) for h in hashes]
+    pairs = set()
+    for i, a in enumerate(values):
+        for j in range(i + 1, len(values)):
+            if bin(a ^ values[j]).count('1') <= max_distance:
+                pairs.add((i, j))
+    return pairs
+
+
+def test_group_near_duplicates():
+    hashes = [
+        f'{0:016x}',
+        f'{0b101:016x}',  # 2 bits do primeiro
+        f'{2**64 - 1:016x}',
+        None,
+        f'{0:016x}',
+    ]
+
+    clusters = group_near_duplicates(hashes, MAX_DISTANCE)
+
+    assert clusters == [1, 1, None, None, 1]
+
+
+def test_grouping_matches_brute_force():
+    rng = random.Random(7)
+    base = [rng.getrandbits(64) for _ in range(50)]
+    values = base + [
+        h ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) for h in base
+    ]
+    hashes = [f'{h:016x}' for h in values]
+
+    clusters = group_near_duplicates(hashes, MAX_DISTANCE)
+
+    for i, j in _brute_force(hashes, MAX_DISTANCE):
+        assert clusters[i] is not None
+        assert clusters[i] == clusters[j]
+
+
+@pytest.mark.parametrize('shared_bits', [24, 48])
+def test_grouping_skewed_hashes(monkeypatch, shared_bits):
+    """Hashes de uma sessão que compartilham os bits altos"""
+    # Baldes e fatias pequenos para passar pela divisão e pelas fatias
+    monkeypatch.setattr(duplicates, 'BUCKET_SPLIT', 32)
+    monkeypatch.setattr(duplicates, 'PAIR_SLICE', 64)
+    rng = random.Random(shared_bits)
+    free_bits = 64 - shared_bits
+    prefix = rng.getrandbits(shared_bits) << free_bits
+    values = [prefix | rng.getrandbits(free_bits) for _ in range(300)]
+    values += [h ^ (1 << rng.randrange(64)) for h in values[:100]]
+    hashes = [f'{h:016x}' for h in values]
+
+    clusters = group_near_duplicates(hashes, MAX_DISTANCE)
+
+    # Mesmos grupos que as componentes conexas da força bruta
+    parent = list(range(len(hashes)))
+
+    def find(i):
+        while parent[i] != i:
+            i = parent[i]
+        return i
+
+    for i, j in _brute_force(hashes, MAX_DISTANCE):
+        parent[find(j)] = find(i)
+    for i in range(len(hashes)):
+        for j in range(i + 1, len(hashes)):
+            same = clusters[i] is not None and clusters[i] == clusters[j]
+            assert same == (find(i) == find(j))
+
+
+def test_compute_dhashes(tmp_path):
+    paths = [
+        _gradient(tmp_path / 'a.jpg'),
+        _gradient(tmp_path / 'b.jpg', offset=20),
+        _gradient(tmp_path / 'c.jpg', reverse=True),
+        str(tmp_path / 'missing.jpg'),
+    ]
+
+    a, b, c, missing = compute_dhashes(paths)
+
+    assert a == b
+    assert a != c
+    assert missing is None
+
+
+@pytest.mark.asyncio
+async def test_detector_caches_hashes(tmp_path):
+    files = {
+        'img1': _gradient(tmp_path / '1.jpg'),
+        'img2': _gradient(tmp_path / '2.jpg', offset=10),
+        'img3': _gradient(tmp_path / '3.jpg', reverse=True),
+    }
+    proxy = AsyncMock()
+    proxy.acquire.side_effect = lambda key, size: files[key]
+    proxy.remember = Mock()
+    proxy.release = Mock()
+    detector = DuplicateDetector(
+        proxy, KeyValueStore(':memory:', 'hashes'), MAX_DISTANCE, workers=0
+    )
+
+    def album():
+        return AlbumResponse(
+            album_title='Burst',
+            album_id='ABC123',
+            total_photos=len(files),
+            photos=[
+                Photo(id=key, urls=[], thumbnail_url=f'https://cdn/{key}')
+                for key in files
+            ],
+        )
+
+    first = await detector.annotate(album())
+    second = await detector.annotate(album())
+
+    assert [p.cluster_id for p in first.photos] == [1, 1, None]
+    assert [p.cluster_id for p in second.photos] == [1, 1, None]
+    assert proxy.acquire.await_count == len(files)
+    assert proxy.release.call_count == len(files)
+    # Só as fotos sem hash são entregues ao proxy, uma vez
+    proxy.remember.assert_called_once()
+    assert [p.id for p in proxy.remember.call_args.args[0]] == list(files)
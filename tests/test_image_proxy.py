@@ -0,0 +1,136 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from smugmug_photo_selector.image_cache import DiskLRUCache
+from smugmug_photo_selector.image_proxy import ImageProxy
+from smugmug_photo_selector.models import ImageSize, Photo, PhotoURL
+
+JPEG_BYTES = b'\xff\xd8\xff' + b'0' * 97
+ENTRY_SIZE = len(JPEG_BYTES)
+
+
+def _put(cache, key, data=JPEG_BYTES):
+    temp = cache.temp_file()
+    with temp:
+        temp.write(data)
+    return cache.commit(key, temp.name)
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=ENTRY_SIZE * 2)
+
+    _put(cache, 'a')
+    _put(cache, 'b')
+    assert cache.get('a') is not None  # 'a' passa a ser a mais recente
+    _put(cache, 'c')
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.get('c') is not None
+    assert cache.size == ENTRY_SIZE * 2
+
+
+def test_disk_cache_reloads_after_restart(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=ENTRY_SIZE * 10)
+    path = _put(cache, 'a')
+    (tmp_path / '.partial').write_bytes(b'x')
+
+    reloaded = DiskLRUCache(str(tmp_path), max_bytes=ENTRY_SIZE * 10)
+
+    assert reloaded.get('a') == path
+    assert reloaded.size == ENTRY_SIZE
+    assert not (tmp_path / '.partial').exists()
+
+
+def test_pinned_entry_survives_eviction(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=ENTRY_SIZE)
+
+    _put(cache, 'a')
+    pinned = cache.get('a', pin=True)
+    _put(cache, 'b')
+
+    # 'a' é a mais antiga, mas está em uso: o cache passa do limite
+    assert pinned.exists()
+    assert cache.size == ENTRY_SIZE * 2
+
+    cache.release(pinned)
+    assert not pinned.exists()
+    assert cache.get('b') is not None
+    assert cache.size == ENTRY_SIZE
+
+
+@pytest.fixture
+def proxy(tmp_path):
+    service = AsyncMock()
+    service.indexed_photo = Mock(return_value=None)
+    service.get_image_urls.return_value = [
+        PhotoURL(size=ImageSize.THUMB, url='https://cdn/img/Th/a-Th.jpg'),
+    ]
+    return ImageProxy(service, DiskLRUCache(str(tmp_path), ENTRY_SIZE * 10))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_are_coalesced(proxy):
+    downloads = []
+
+    def fake_download(url, cache_key):
+        downloads.append(url)
+        time.sleep(0.05)
+        return _put(proxy.cache, cache_key)
+
+    proxy._download = fake_download
+
+    paths = await asyncio.gather(*[
+        proxy.acquire('a', ImageSize.THUMB) for _ in range(5)
+    ])
+
+    assert downloads == ['https://cdn/img/Th/a-Th.jpg']
+    assert len(set(paths)) == 1
+    assert proxy.media_type(paths[0]) == 'image/jpeg'
+
+    # Acerto no cache: nem resolve nem baixa de novo
+    await proxy.acquire('a', ImageSize.THUMB)
+    assert len(downloads) == 1
+    for path in [*paths, paths[0]]:
+        proxy.release(path)
+    assert proxy.cache._pins == {}
+    proxy.service.get_image_urls.assert_awaited_once_with('a')
+
+
+@pytest.mark.asyncio
+async def test_unavailable_size_raises(proxy):
+    with pytest.raises(ValueError, match='indisponível'):
+        await proxy.acquire('a', ImageSize.X3LARGE)
+
+
+def _photo(image_key):
+    return Photo(
+        id=image_key,
+        thumbnail_url=f'https://cdn/img/Th/{image_key}-Th.jpg',
+        urls=[
+            PhotoURL(
+                size=ImageSize.THUMB,
+                url=f'https://cdn/img/Th/{image_key}-Th.jpg',
+            )
+        ],
+    )
+
+
+@pytest.mark.asyncio
+async def test_known_photos_skip_image_lookup(proxy):
+    proxy.remember([_photo('b')])
+    proxy.service.indexed_photo.return_value = _photo('c')
+
+    assert (
+        await proxy.resolve_url('b', ImageSize.THUMB)
+        == 'https://cdn/img/Th/b-Th.jpg'
+    )
+    assert (
+        await proxy.resolve_url('c', ImageSize.THUMB)
+        == 'https://cdn/img/Th/c-Th.jpg'
+    )
+    proxy.service.indexed_photo.assert_called_once_with('c')
+    proxy.service.get_image_urls.assert_not_awaited()
@@ -0,0 +1,200 @@
+import asyncio
+import json
+
+import pytest
+
+from smugmug_photo_selector.jobs import CHANGED, JOB_FILE, JobLimits, JobQueue
+from smugmug_photo_selector.models import AlbumInfo, AlbumResponse, Photo
+
+LIMITS = JobLimits(workers=1, page_size=2, retry_delay=0)
+ALBUM_SIZE = 5
+PAGES_PER_ALBUM = 3  # 2 fotos por página
+
+
+class FakeService:
+    def __init__(self):
+        self.calls = []
+        self.failing = set()
+        self.gate = None
+        self.version = 1
+        # Álbuns modificados a cada página buscada
+        self.changing = set()
+        # Total que !images informa nas próximas páginas, se diferente
+        self.page_totals = []
+
+    async def get_album_info_by_id(self, album_id):
+        album_key = album_id.removeprefix('n-')
+        if album_key == 'MISSING':
+            raise ValueError('Álbum não encontrado')
+        return AlbumInfo(
+            album_id=album_key,
+            album_title=f'Álbum {album_key}',
+            album_url='https://www.smugmug.com/album/x',
+            total_photos=ALBUM_SIZE,
+            date_modified=f'v{self.version}',
+        )
+
+    async def get_photos_page(self, album_id, start, count):
+        self.calls.append((album_id, start))
+        if self.gate is not None and start > 1:
+            await self.gate.wait()
+        if (album_id, start) in self.failing:
+            raise ValueError('Erro HTTP 500')
+        if album_id in self.changing:
+            self.version += 1
+        end = min(start + count, ALBUM_SIZE + 1)
+        photos = [
+            Photo(id=f'{album_id}-{i}', urls=[]) for i in range(start, end)
+        ]
+        total = self.page_totals.pop() if self.page_totals else ALBUM_SIZE
+        return photos, total
+
+
+async def _wait(queue, job_id, *statuses):
+    for _ in range(500):
+        job = queue.get(job_id)
+        if job.status in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f'Job ficou em {job.status}')
+
+
+def _result(queue, job_id):
+    return [
+        AlbumResponse.model_validate(album)
+        for album in json.loads(b''.join(queue.result(job_id)))
+    ]
+
+
+@pytest.mark.asyncio
+async def test_job_exports_albums_in_pages(tmp_path):
+    service = FakeService()
+    queue = JobQueue(service, str(tmp_path), LIMITS)
+    await queue.start()
+
+    job = await queue.submit(['n-AAA', 'BBB'])
+    job = await _wait(queue, job.id, 'done')
+    queue.stop()
+
+    summary = job.summary()
+    assert summary.pages_total == summary.pages_done == PAGES_PER_ALBUM * 2
+    # Uma chamada por página, sem buscar o álbum de novo
+    assert len(service.calls) == PAGES_PER_ALBUM * 2
+    assert summary.result_url == f'/jobs/{job.id}/result'
+    albums = _result(queue, job.id)
+    assert [album.album_id for album in albums] == ['AAA', 'BBB']
+    assert [photo.id for photo in albums[0].photos] == [
+        f'AAA-{i}' for i in range(1, ALBUM_SIZE + 1)
+    ]
+    assert albums[1].total_photos == ALBUM_SIZE
+
+
+@pytest.mark.asyncio
+async def test_retry_only_failed_pages(tmp_path):
+    service = FakeService()
+    service.failing = {('AAA', 3)}
+    queue = JobQueue(service, str(tmp_path), LIMITS)
+    await queue.start()
+
+    job = await queue.submit(['AAA', 'MISSING'])
+    job = await _wait(queue, job.id, 'failed')
+    errors = job.summary().errors
+    with pytest.raises(ValueError, match='não concluído'):
+        queue.result(job.id)
+
+    service.failing.clear()
+    service.calls.clear()
+    await queue.retry(job.id)
+    job = await _wait(queue, job.id, 'failed', 'done')
+    queue.stop()
+
+    assert errors == [
+        'MISSING: Álbum não encontrado',
+        'AAA@3: Erro HTTP 500',
+    ]
+    assert service.calls == [('AAA', 3)]
+    # O álbum inexistente continua falhando
+    assert job.summary().errors == ['MISSING: Álbum não encontrado']
+
+
+@pytest.mark.asyncio
+async def test_album_modified_during_export_is_replanned(tmp_path):
+    service = FakeService()
+    service.changing = {'AAA'}
+    queue = JobQueue(service, str(tmp_path), LIMITS)
+    await queue.start()
+
+    job = await queue.submit(['AAA'])
+    job = await _wait(queue, job.id, 'failed')
+    # Modificado a cada rodada: desiste depois de `attempts` rodadas
+    assert job.summary().errors == [f'AAA: {CHANGED}']
+    assert len(service.calls) == PAGES_PER_ALBUM * LIMITS.attempts
+
+    service.changing.clear()
+    service.calls.clear()
+    await queue.retry(job.id)
+    job = await _wait(queue, job.id, 'done')
+    queue.stop()
+
+    assert job.albums['AAA']['date_modified'] == f'v{service.version}'
+    assert len(service.calls) == PAGES_PER_ALBUM
+    assert len(_result(queue, job.id)[0].photos) == ALBUM_SIZE
+
+
+@pytest.mark.asyncio
+async def test_page_total_change_replans_album(tmp_path):
+    service = FakeService()
+    service.page_totals = [ALBUM_SIZE + 1]
+    queue = JobQueue(service, str(tmp_path), LIMITS)
+    await queue.start()
+
+    job = await queue.submit(['AAA'])
+    job = await _wait(queue, job.id, 'done', 'failed')
+    queue.stop()
+
+    assert job.status == 'done'
+    assert job.summary().pages_done == PAGES_PER_ALBUM
+    assert len(_result(queue, job.id)[0].photos) == ALBUM_SIZE
+
+
+@pytest.mark.asyncio
+async def test_resume_after_restart(tmp_path):
+    service = FakeService()
+    service.gate = asyncio.Event()
+    queue = JobQueue(service, str(tmp_path), LIMITS)
+    await queue.start()
+    job = await queue.submit(['AAA'])
+    while queue.get(job.id).summary().pages_done < 1:
+        await asyncio.sleep(0.01)
+    queue.stop()
+
+    state = json.loads((tmp_path / job.id / JOB_FILE).read_text())
+    assert state['status'] == 'running'
+
+    service.gate.set()
+    service.calls.clear()
+    restarted = JobQueue(service, str(tmp_path), LIMITS)
+    await restarted.start()
+    job = await _wait(restarted, job.id, 'done')
+    restarted.stop()
+
+    assert sorted(service.calls) == [('AAA', 3), ('AAA', 5)]
+    assert len(_result(restarted, job.id)[0].photos) == ALBUM_SIZE
+
+
+@pytest.mark.asyncio
+async def test_cancel_and_delete(tmp_path):
+    service = FakeService()
+    service.gate = asyncio.Event()
+    queue = JobQueue(service, str(tmp_path), LIMITS)
+    await queue.start()
+    job = await queue.submit(['AAA'])
+    await _wait(queue, job.id, 'running')
+
+    job = await queue.cancel(job.id)
+
+    assert job.status == 'cancelled'
+    assert await queue.delete(job.id)
+    assert not (tmp_path / job.id).exists()
+    assert queue.get(job.id) is None
+    queue.stop()
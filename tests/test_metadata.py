@@ -0,0 +1,133 @@
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from smugmug_photo_selector.metadata import (
+    MetadataEnricher,
+    MetadataQuery,
+    parse_metadata,
+)
+from smugmug_photo_selector.models import AlbumResponse, Photo, PhotoMetadata
+from smugmug_photo_selector.storage import KeyValueStore
+
+RAW = {
+    'img1': {
+        'DateTimeOriginal': '2024:01:20 14:45:00',
+        'Make': 'Canon',
+        'Model': 'EOS R5',
+        'ISO': '400',
+        'Aperture': 'f/2.8',
+        'FocalLength': '50.0 mm',
+        'Exposure': '1/250',
+    },
+    'img2': {
+        'DateTimeOriginal': '2024-01-20T09:00:00',
+        'Make': 'NIKON CORPORATION',
+        'Model': 'Z 9',
+    },
+    'img3': {},
+}
+
+
+def test_parse_metadata():
+    metadata = parse_metadata(RAW['img1'])
+
+    assert metadata == PhotoMetadata(
+        date_time_original='2024-01-20T14:45:00',
+        make='Canon',
+        model='EOS R5',
+        iso=400,
+        exposure='1/250',
+        aperture=2.8,
+        focal_length=50.0,
+    )
+    assert parse_metadata({'Make': ' '}) == PhotoMetadata()
+
+
+def _photos():
+    return [
+        Photo(id=key, urls=[], metadata=parse_metadata(raw))
+        for key, raw in RAW.items()
+    ]
+
+
+def test_sort_by_capture_time_keeps_missing_last():
+    ascending = MetadataQuery(sort='DateTimeOriginal').apply(_photos())
+    descending = MetadataQuery(sort='-date_time_original').apply(_photos())
+
+    assert [p.id for p in ascending] == ['img2', 'img1', 'img3']
+    assert [p.id for p in descending] == ['img1', 'img2', 'img3']
+
+
+def test_filters():
+    by_camera = MetadataQuery(camera='nikon').apply(_photos())
+    afternoon = MetadataQuery(taken_after='2024-01-20T12').apply(_photos())
+    before = MetadataQuery(taken_before='2024-01-20T12').apply(_photos())
+
+    assert [p.id for p in by_camera] == ['img2']
+    assert [p.id for p in afternoon] == ['img1']
+    assert [p.id for p in before] == ['img2']
+
+
+def test_selects_only_with_sort_or_filters():
+    assert not MetadataQuery().selects
+    assert MetadataQuery(sort='DateTimeOriginal').selects
+    assert MetadataQuery(taken_before='2024-01-01').selects
+
+
+def test_invalid_sort_field():
+    with pytest.raises(ValueError, match='Ordenação inválida'):
+        MetadataQuery(sort='Title').apply(_photos())
+
+
+def _album():
+    return AlbumResponse(
+        album_title='Festa',
+        album_id='ABC123',
+        total_photos=3,
+        photos=[Photo(id=key, urls=[]) for key in RAW],
+    )
+
+
+def _enricher():
+    service = Mock()
+
+    async def get_image_metadata(image_key):
+        if image_key == 'img3':
+            raise ValueError('Erro HTTP 500')
+        return RAW[image_key]
+
+    service.get_image_metadata = AsyncMock(side_effect=get_image_metadata)
+    return MetadataEnricher(service, KeyValueStore(':memory:', 'metadata'))
+
+
+@pytest.mark.asyncio
+async def test_enrich_caches_metadata_per_image():
+    enricher = _enricher()
+    album = _album()
+
+    first = await enricher.enrich(album)
+    second = await enricher.enrich(album)
+
+    assert first == second
+    assert first.photos[0].metadata.model == 'EOS R5'
+    assert first.photos[2].metadata is None
+    # img3 falhou e não foi guardado: só ele é buscado de novo
+    fetched = [
+        call.args[0]
+        for call in enricher.service.get_image_metadata.await_args_list
+    ]
+    assert sorted(fetched) == ['img1', 'img2', 'img3', 'img3']
+    assert album.photos[0].metadata is None
+
+
+@pytest.mark.asyncio
+async def test_enrich_filters_and_updates_total():
+    enricher = _enricher()
+
+    album = await enricher.enrich(
+        _album(), MetadataQuery(sort='DateTimeOriginal', camera='canon')
+    )
+
+    assert [p.id for p in album.photos] == ['img1']
+    assert album.total_photos == 1
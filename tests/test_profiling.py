@@ -0,0 +1,94 @@
+import asyncio
+from http import HTTPStatus
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from smugmug_photo_selector import profiling
+from smugmug_photo_selector.profiling import (
+    ProfileStore,
+    ProfilingMiddleware,
+    profiled_endpoint,
+)
+
+TOKEN = 'segredo'
+
+
+def _app(store):
+    app = FastAPI()
+    app.add_middleware(
+        ProfilingMiddleware, token=TOKEN, store=store, interval=0.001
+    )
+
+    @app.get('/work')
+    @profiled_endpoint
+    async def work(n: int = 3):
+        for _ in range(n):
+            with profiling.span('images'):
+                await asyncio.sleep(0.005)
+        return {'ok': True}
+
+    return app
+
+
+def test_span_is_noop_without_profile():
+    assert profiling.span('album') is profiling.span('convert')
+
+
+def test_no_timing_header_by_default():
+    client = TestClient(_app(ProfileStore(4)))
+
+    response = client.get('/work')
+
+    assert response.status_code == HTTPStatus.OK
+    assert 'server-timing' not in response.headers
+
+
+def test_profile_requires_admin_token():
+    client = TestClient(_app(ProfileStore(4)))
+
+    response = client.get('/work?profile=1', headers={'X-Admin-Token': 'x'})
+
+    assert response.status_code == HTTPStatus.FORBIDDEN
+
+
+def test_server_timing_breakdown():
+    client = TestClient(_app(ProfileStore(4)))
+
+    response = client.get(
+        '/work?profile=1&n=2', headers={'X-Admin-Token': TOKEN}
+    )
+
+    timing = response.headers['server-timing']
+    assert 'images;dur=' in timing
+    assert 'desc="2x"' in timing
+    assert 'serialize;dur=' in timing
+    assert 'total;dur=' in timing
+    assert 'x-profile-url' not in response.headers
+
+
+def test_sampling_profile_is_stored():
+    store = ProfileStore(4)
+    client = TestClient(_app(store))
+
+    response = client.get(
+        '/work',
+        headers={'X-Profile': 'sample', 'X-Admin-Token': TOKEN},
+    )
+
+    profile_id = response.headers['x-profile-url'].rsplit('/', 1)[1]
+    collapsed = store.get(profile_id)
+    assert collapsed is not None
+    for line in collapsed.splitlines():
+        stack, count = line.rsplit(' ', 1)
+        assert int(count) > 0
+        assert ';' in stack
+
+
+def test_profile_store_keeps_latest():
+    store = ProfileStore(2)
+    for name in ['a', 'b', 'c']:
+        store.put(name, name)
+
+    assert store.get('a') is None
+    assert store.get('c') == 'c'
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from smugmug_photo_selector.scheduler import (
+    Priority,
+    RequestContext,
+    RequestScheduler,
+    current_request_context,
+    request_context,
+)
+
+
+async def _run_order(scheduler, contexts):
+    """Enfileirar requisições com o agendador cheio e devolver a ordem"""
+    order = []
+    release = asyncio.Event()
+
+    async def blocker():
+        async with scheduler.slot(RequestContext(Priority.INTERACTIVE)):
+            await release.wait()
+
+    async def worker(name, context):
+        async with scheduler.slot(context):
+            order.append(name)
+
+    blocking = asyncio.create_task(blocker())
+    await asyncio.sleep(0)
+    tasks = [
+        asyncio.create_task(worker(name, context))
+        for name, context in contexts
+    ]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(blocking, *tasks)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_interactive_served_before_bulk():
+    scheduler = RequestScheduler(max_concurrency=1, reserved_interactive=0)
+
+    order = await _run_order(
+        scheduler,
+        [
+            ('bulk', RequestContext(Priority.BULK)),
+            ('standard', RequestContext(Priority.STANDARD)),
+            ('info', RequestContext(Priority.INTERACTIVE)),
+        ],
+    )
+
+    assert order == ['info', 'standard', 'bulk']
+
+
+@pytest.mark.asyncio
+async def test_fair_share_between_flows():
+    scheduler = RequestScheduler(max_concurrency=1, reserved_interactive=0)
+    heavy = [
+        (f'a{i}', RequestContext(Priority.BULK, flow='a')) for i in range(4)
+    ]
+    light = [
+        (f'b{i}', RequestContext(Priority.BULK, flow='b')) for i in range(2)
+    ]
+
+    order = await _run_order(scheduler, heavy + light)
+
+    assert order[:4] == ['a0', 'b0', 'a1', 'b1']
+
+
+@pytest.mark.asyncio
+async def test_reserved_slot_kept_for_interactive():
+    scheduler = RequestScheduler(max_concurrency=2, reserved_interactive=1)
+
+    await scheduler.acquire(RequestContext(Priority.BULK))
+    waiting = asyncio.create_task(
+        scheduler.acquire(RequestContext(Priority.BULK))
+    )
+    await asyncio.sleep(0)
+    assert not waiting.done()
+
+    await asyncio.wait_for(
+        scheduler.acquire(RequestContext(Priority.INTERACTIVE)), timeout=1
+    )
+    assert scheduler.active == 2  # noqa: PLR2004
+
+    scheduler.release()
+    scheduler.release()
+    await asyncio.wait_for(waiting, timeout=1)
+    scheduler.release()
+    assert scheduler.active == 0
+
+
+def test_request_context_nesting():
+    assert current_request_context().priority == Priority.STANDARD
+
+    with request_context(Priority.BULK, flow='job'):
+        with request_context(flow='other'):
+            context = current_request_context()
+            assert context.priority == Priority.BULK
+            assert context.flow == 'other'
+
+    assert current_request_context().flow == 'default'
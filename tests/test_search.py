@@ -0,0 +1,113 @@
+import pytest
+
+from smugmug_photo_selector.models import (
+    AlbumResponse,
+    ImageSize,
+    Photo,
+    PhotoURL,
+)
+from smugmug_photo_selector.search import SearchIndex
+
+
+def _album(album_id='ABC123', photos=None):
+    return AlbumResponse(
+        album_title='Casamento',
+        album_id=album_id,
+        total_photos=2,
+        photos=photos
+        or [
+            Photo(
+                id='img1',
+                title='Noiva na entrada',
+                keywords=['cerimônia'],
+                urls=[],
+            ),
+            Photo(
+                id='img2',
+                title='Festa',
+                caption='Corte do bolo com a noiva',
+                keywords=['festa', 'bolo'],
+                urls=[],
+            ),
+        ],
+    )
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(str(tmp_path / 'search.sqlite3'))
+    yield index
+    index.close()
+
+
+def _ids(hits):
+    return sorted(hit.photo.id for hit in hits)
+
+
+def test_prefix_search_over_title_caption_and_keywords(index):
+    index.index_album(_album())
+
+    assert _ids(index.query('noiv')) == ['img1', 'img2']
+    assert _ids(index.query('noiva bolo')) == ['img2']
+    # Acentos são ignorados nos dois lados
+    assert _ids(index.query('cerimonia')) == ['img1']
+    hit = index.query('bol')[0]
+    assert hit.album_id == 'ABC123'
+    assert hit.album_title == 'Casamento'
+    assert hit.photo.caption == 'Corte do bolo com a noiva'
+
+
+def test_reindex_replaces_album_rows(index):
+    index.index_album(_album())
+    index.index_album(_album('DEF456'))
+
+    changed = index.index_album(
+        _album(photos=[Photo(id='img9', title='Bolo', urls=[])])
+    )
+
+    assert changed
+    assert _ids(index.query('noiva')) == ['img1', 'img2']
+    assert _ids(index.query('bolo', album_id='n-ABC123')) == ['img9']
+    assert not index.index_album(
+        _album(photos=[Photo(id='img9', title='Bolo', urls=[])])
+    )
+
+
+def test_reindex_when_only_urls_change(index):
+    def album(version):
+        url = f'https://photos.smugmug.com/{version}/img9-Th.jpg'
+        return _album(
+            photos=[
+                Photo(
+                    id='img9',
+                    title='Bolo',
+                    thumbnail_url=url,
+                    urls=[PhotoURL(size=ImageSize.THUMB, url=url)],
+                )
+            ]
+        )
+
+    index.index_album(album('v1'))
+
+    # Foto reeditada: mesmo texto, URLs novas
+    assert index.index_album(album('v2'))
+    hit = index.query('bolo')[0]
+    assert hit.photo.thumbnail_url.endswith('/v2/img9-Th.jpg')
+    assert hit.photo.urls[0].url == hit.photo.thumbnail_url
+
+
+def test_index_persists_on_disk(tmp_path):
+    path = str(tmp_path / 'search.sqlite3')
+    first = SearchIndex(path)
+    first.submit(_album()).result()
+    first.close()
+
+    second = SearchIndex(path)
+
+    assert _ids(second.query('festa')) == ['img2']
+    second.close()
+
+
+def test_empty_query(index):
+    with pytest.raises(ValueError, match='Busca vazia'):
+        index.query(' ?! ')
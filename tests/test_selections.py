@@ -0,0 +1,159 @@
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from smugmug_photo_selector.bitmap import Bitmap
+from smugmug_photo_selector.models import (
+    AlbumResponse,
+    ImageSize,
+    Photo,
+    PhotoURL,
+)
+from smugmug_photo_selector.selections import (
+    SelectionSets,
+    encode_bitmap,
+)
+from smugmug_photo_selector.storage import KeyValueStore
+
+
+def _photo(key):
+    return Photo(
+        id=key,
+        urls=[PhotoURL(size=ImageSize.LARGE, url=f'https://x/{key}-L.jpg')],
+    )
+
+
+def _selections(keys=('img1', 'img2', 'img3', 'img4')):
+    service = Mock()
+    service.get_all_photos_by_id = AsyncMock(
+        side_effect=lambda album_id: AlbumResponse(
+            album_title='Festa',
+            album_id=album_id,
+            total_photos=len(service.keys),
+            photos=[_photo(key) for key in service.keys],
+        )
+    )
+    service.keys = list(keys)
+    return SelectionSets(
+        service,
+        KeyValueStore(':memory:', 'selections'),
+        KeyValueStore(':memory:', 'selection_ordinals'),
+    )
+
+
+@pytest.mark.asyncio
+async def test_add_and_remove():
+    selections = _selections()
+
+    await selections.update('n-ABC', 'ana', add=['img1', 'img2', 'img3'])
+    bitmap = await selections.update('ABC', 'ana', remove=['img2', 'zzz'])
+
+    assert await selections.image_keys('ABC', bitmap) == ['img1', 'img3']
+    assert await selections.get('n-ABC', 'ana') == bitmap
+    assert await selections.list('ABC') == {'ana': 2}
+    # Ordinais buscados uma vez e reaproveitados
+    selections.service.get_all_photos_by_id.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_unknown_photo_is_rejected():
+    selections = _selections()
+
+    with pytest.raises(ValueError, match='Fotos fora do álbum: nope'):
+        await selections.update('ABC', 'ana', add=['img1', 'nope'])
+    assert await selections.get('ABC', 'ana') is None
+
+
+@pytest.mark.asyncio
+async def test_ordinals_are_stable_when_album_changes():
+    selections = _selections()
+    await selections.update('ABC', 'ana', add=['img4'])
+
+    selections.service.keys = ['img5', 'img1', 'img4']
+    await selections.update('ABC', 'ana', add=['img5'])
+
+    assert await selections.ordinals('ABC') == [
+        'img1',
+        'img2',
+        'img3',
+        'img4',
+        'img5',
+    ]
+    bitmap = await selections.get('ABC', 'ana')
+    assert await selections.image_keys('ABC', bitmap) == ['img4', 'img5']
+
+
+@pytest.mark.asyncio
+async def test_replace_with_bitmap():
+    selections = _selections()
+    await selections.ordinals('ABC')
+
+    bitmap = await selections.update(
+        'ABC', 'ana', bitmap=encode_bitmap(Bitmap.range(3))
+    )
+
+    assert await selections.image_keys('ABC', bitmap) == [
+        'img1',
+        'img2',
+        'img3',
+    ]
+    # O último é um bloco de array na chave 65535, rejeitado sem montar
+    for outside in (
+        encode_bitmap(Bitmap.range(10)),
+        encode_bitmap(Bitmap.from_ordinals([1 << 20])),
+        'AQD//wABAAAA',
+    ):
+        with pytest.raises(ValueError, match='fora do intervalo'):
+            await selections.update('ABC', 'ana', bitmap=outside)
+    assert await selections.get('ABC', 'ana') == bitmap
+
+
+@pytest.mark.asyncio
+async def test_combine():
+    selections = _selections()
+    await selections.update('ABC', 'ana', add=['img1', 'img2'])
+    await selections.update('ABC', 'bia', add=['img2', 'img3'])
+
+    union = await selections.combine('ABC', 'union', ['ana', 'bia'])
+    both = await selections.combine(
+        'ABC', 'intersection', ['ana', 'bia'], save_as='final'
+    )
+    only_ana = await selections.combine('ABC', 'difference', ['ana', 'bia'])
+
+    assert await selections.list('ABC') == {'ana': 2, 'bia': 2, 'final': 1}
+    assert await selections.image_keys('ABC', union) == [
+        'img1',
+        'img2',
+        'img3',
+    ]
+    assert await selections.image_keys('ABC', both) == ['img2']
+    assert await selections.get('ABC', 'final') == both
+    assert await selections.image_keys('ABC', only_ana) == ['img1']
+    with pytest.raises(ValueError, match='não encontradas: ze'):
+        await selections.combine('ABC', 'union', ['ana', 'ze'])
+
+
+@pytest.mark.asyncio
+async def test_export_urls_in_album_order():
+    selections = _selections()
+    await selections.update('ABC', 'ana', add=['img3', 'img1', 'img2'])
+    selections.service.keys = ['img3', 'img1']
+
+    export = await selections.export('ABC', 'ana', ImageSize.LARGE)
+    thumbs = await selections.export('ABC', 'ana', ImageSize.THUMB)
+
+    assert [photo.id for photo in export.photos] == ['img3', 'img1']
+    assert export.photos[0].url == 'https://x/img3-L.jpg'
+    assert export.missing == ['img2']
+    assert thumbs.photos == []
+    assert await selections.export('ABC', 'bia', ImageSize.LARGE) is None
+
+
+@pytest.mark.asyncio
+async def test_invalid_and_reserved_names():
+    selections = _selections()
+
+    for name in ['ordinals', 'a/b', '']:
+        with pytest.raises(ValueError, match='Nome de seleção inválido'):
+            await selections.update('ABC', name, add=['img1'])
+    assert await selections.delete('ABC', 'ana') is False
@@ -0,0 +1,59 @@
+from oauthlib.oauth1 import Client
+from requests import Request
+
+from smugmug_photo_selector import signing
+from smugmug_photo_selector.signing import FastOAuth1
+
+CREDENTIALS = {
+    'client_key': 'key with spaces',
+    'client_secret': 'secret/+=',
+    'resource_owner_key': 'token~1',
+    'resource_owner_secret': 's&cret',
+}
+URL = (
+    'https://api.smugmug.com:443/api/v2/album/ABC123!images'
+    '?_verbosity=2&count=100&start=1&q=a+b%2Fc&empty='
+)
+
+
+def _oauthlib_header(url, nonce, timestamp):
+    client = Client(**CREDENTIALS, nonce=nonce, timestamp=timestamp)
+    _, headers, _ = client.sign(url, http_method='GET')
+    return headers['Authorization']
+
+
+def _params(header):
+    items = header.removeprefix('OAuth ').split(', ')
+    return dict(item.split('=', 1) for item in items)
+
+
+def test_signature_matches_oauthlib():
+    auth = FastOAuth1(**CREDENTIALS)
+
+    ours = auth.sign('GET', URL, nonce='abc123', timestamp='1700000000')
+    reference = _oauthlib_header(URL, 'abc123', '1700000000')
+
+    assert _params(ours) == _params(reference)
+
+
+def test_cached_state_gives_stable_signatures():
+    auth = FastOAuth1(**CREDENTIALS)
+    signing._base_string_prefix.cache_clear()
+
+    for start in (1, 101, 201):
+        url = f'https://api.smugmug.com/api/v2/album/A!images?start={start}'
+        ours = auth.sign('GET', url, nonce='n', timestamp='1')
+        assert _params(ours) == _params(_oauthlib_header(url, 'n', '1'))
+    # A query muda a cada página; o prefixo é calculado uma vez só
+    assert signing._base_string_prefix.cache_info().misses == 1
+
+
+def test_auth_sets_header_on_prepared_request():
+    auth = FastOAuth1(**CREDENTIALS)
+    request = Request(
+        'GET', 'https://api.smugmug.com/api/v2!authuser', auth=auth
+    ).prepare()
+
+    header = request.headers['Authorization']
+    assert header.startswith('OAuth ')
+    assert 'oauth_signature=' in header
@@ -1,8 +1,13 @@
+import asyncio
+import json
+import threading
 from http import HTTPStatus
 from unittest.mock import Mock, patch
 
 import pytest
 
+from smugmug_photo_selector import offload
+from smugmug_photo_selector.credentials import Credential, CredentialPool
 from smugmug_photo_selector.models import (
     AlbumInfo,
     AlbumResponse,
@@ -15,6 +20,8 @@ EXPECTED_URLS_COUNT = 4
 MIN_URLS_PER_PHOTO = 2
 EXPECTED_TOTAL_PHOTOS = 3
 IMAGE_COUNT = 15
+POOL_SIZE = 2
+PAGE_LIMIT = 10
 
 
 @pytest.fixture
@@ -32,6 +39,18 @@ def service():
         mock_settings.SMUGMUG_WEB_URI_LOOKUP = (
             'https://api.smugmug.com/api/v2!weburilookup'
         )
+        mock_settings.MAX_CONCURRENT_REQUESTS = 4
+        mock_settings.RESERVED_INTERACTIVE_SLOTS = 1
+        mock_settings.SMUGMUG_CREDENTIALS = []
+        mock_settings.CREDENTIAL_SELECTION = 'least_loaded'
+        mock_settings.CREDENTIAL_BACKOFF_BASE = 30.0
+        mock_settings.CREDENTIAL_BACKOFF_MAX = 600.0
+        mock_settings.SMUGMUG_FAST_SIGNING = True
+        mock_settings.OFFLOAD_PROCESS_WORKERS = 0
+        mock_settings.OFFLOAD_INLINE_BYTES = 64 * 1024
+        mock_settings.OFFLOAD_MIN_IMAGES = 1000
+        mock_settings.IMAGES_PAGE_SIZE = 1000
+        mock_settings.ALBUM_CACHE_SIZE = 10
 
         return SmugMugService()
 
@@ -95,6 +114,8 @@ def test_convert_image_to_photo(service):
     image_data = {
         'ImageKey': 'test123',
         'Title': 'Test Photo',
+        'Caption': 'Corte do bolo',
+        'Keywords': 'festa; bolo;',
         'ThumbnailUrl': 'https://photos.smugmug.com/test/Th/test-Th.jpg',
         'LargeUrl': 'https://photos.smugmug.com/test/L/test-L.jpg',
     }
@@ -104,15 +125,64 @@ def test_convert_image_to_photo(service):
     assert isinstance(photo, Photo)
     assert photo.id == 'test123'
     assert photo.title == 'Test Photo'
+    assert photo.caption == 'Corte do bolo'
+    assert photo.keywords == ['festa', 'bolo']
     assert photo.thumbnail_url is not None
     assert len(photo.urls) >= MIN_URLS_PER_PHOTO
 
 
+@pytest.mark.asyncio
+async def test_convert_images_in_process_pool(service):
+    images = [
+        {
+            'ImageKey': f'img{i}',
+            'Title': f'Photo {i}',
+            'ThumbnailUrl': f'https://photos.smugmug.com/{i}/Th/p-Th.jpg',
+        }
+        for i in range(IMAGE_COUNT)
+    ]
+
+    inline = await service._convert_images(images)
+    with patch(
+        'smugmug_photo_selector.smugmug_service.settings'
+    ) as mock_settings:
+        mock_settings.OFFLOAD_PROCESS_WORKERS = 1
+        mock_settings.OFFLOAD_MIN_IMAGES = 4
+        try:
+            offloaded = await service._convert_images(images)
+        finally:
+            offload.shutdown_process_pool()
+
+    assert offloaded == inline
+    assert [photo.id for photo in offloaded] == [
+        f'img{i}' for i in range(IMAGE_COUNT)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_decode_large_payload_off_loop(service):
+    payload = {'Response': {'AlbumImage': [{'ImageKey': 'x' * 100}] * 1000}}
+    content = json.dumps(payload).encode()
+
+    with (
+        patch(
+            'smugmug_photo_selector.smugmug_service.settings'
+        ) as mock_settings,
+        patch.object(offload, 'get_process_pool') as get_pool,
+    ):
+        mock_settings.OFFLOAD_PROCESS_WORKERS = 1
+        mock_settings.OFFLOAD_INLINE_BYTES = 1024
+        assert await service._decode(content) == payload
+
+    # Decodificado numa thread: o pool de processos não ganharia nada
+    get_pool.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_make_request_success(service):
     mock_response = Mock()
     mock_response.status_code = HTTPStatus.OK
-    mock_response.json.return_value = {'Response': {'test': 'data'}}
+    mock_response.content = json.dumps({'Response': {'test': 'data'}}).encode()
 
     with patch.object(service.session, 'get', return_value=mock_response):
         result = await service._make_request('https://test.com')
@@ -129,6 +199,51 @@ async def test_make_request_404(service):
             await service._make_request('https://test.com')
 
 
+@pytest.mark.asyncio
+async def test_make_request_retries_with_other_credential(service):
+    first = Credential('a', Mock())
+    second = Credential('b', Mock())
+    service.credentials = CredentialPool([first, second])
+
+    throttled = Mock(status_code=HTTPStatus.TOO_MANY_REQUESTS, headers={})
+    ok = Mock(status_code=HTTPStatus.OK, headers={})
+    ok.content = json.dumps({'Response': {'test': 'data'}}).encode()
+
+    with patch.object(
+        service.session, 'get', side_effect=[throttled, ok]
+    ) as mock_get:
+        result = await service._make_request('https://test.com')
+
+    assert result == {'Response': {'test': 'data'}}
+    assert first.throttled + second.throttled == 1
+    auths = {id(call.kwargs['auth']) for call in mock_get.call_args_list}
+    assert len(auths) == POOL_SIZE
+
+
+@pytest.mark.asyncio
+async def test_cancelled_request_releases_credential(service):
+    credential = Credential('a', Mock())
+    service.credentials = CredentialPool([credential])
+    started, unblock = threading.Event(), threading.Event()
+
+    def slow_get(*args, **kwargs):
+        started.set()
+        unblock.wait(5)
+        return Mock(status_code=HTTPStatus.OK, headers={})
+
+    with patch.object(service.session, 'get', side_effect=slow_get):
+        task = asyncio.ensure_future(service._make_request('https://x'))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        unblock.set()
+
+    assert credential.in_flight == 0
+    assert service.scheduler.active == 0
+
+
 @pytest.mark.asyncio
 async def test_get_album_key_from_url(service):
     url = 'https://user.smugmug.com/gallery/n-ABC123/'
@@ -174,9 +289,12 @@ async def test_get_all_photos_success(service):
             return mock_images_data
         return mock_album_data
 
+    loaded = []
+    service.album_listeners.append(loaded.append)
     with patch.object(service, '_make_request', side_effect=mock_make_request):
         result = await service.get_all_photos(url)
 
+        assert loaded == [result]
         assert isinstance(result, AlbumResponse)
         assert result.album_title == 'Test Album'
         assert result.album_id == 'ABC123'
@@ -197,6 +315,7 @@ def test_service_initialization_without_credentials():
         mock_settings.SMUGMUG_API_SECRET = 'test_secret'
         mock_settings.SMUGMUG_ACCESS_TOKEN = 'test_token'
         mock_settings.SMUGMUG_ACCESS_TOKEN_SECRET = 'test_token_secret'
+        mock_settings.SMUGMUG_CREDENTIALS = []
 
         with pytest.raises(
             ValueError, match='Credenciais OAuth não configuradas'
@@ -447,3 +566,414 @@ async def test_get_album_info_album_not_found(service):
     with patch.object(service.session, 'get', return_value=mock_response):
         with pytest.raises(ValueError, match='Álbum não encontrado'):
             await service.get_album_info(url)
+
+
+@pytest.mark.asyncio
+async def test_get_all_photos_by_id_paginated(service):
+    """Teste de paginação com limit e cursor"""
+    mock_album_data = {
+        'Response': {
+            'Album': {
+                'AlbumKey': 'ABC123',
+                'Title': 'Big Album',
+                'ImageCount': IMAGE_COUNT,
+            }
+        }
+    }
+    requested = []
+
+    def mock_make_request(url, params=None):
+        if 'album/ABC123!images' not in url:
+            return mock_album_data
+        requested.append(params)
+        start, count = params['start'], params['count']
+        last = min(start + count - 1, IMAGE_COUNT)
+        return {
+            'Response': {
+                'AlbumImage': [
+                    {
+                        'ImageKey': f'img{i}',
+                        'ThumbnailUrl': f'https://photos.smugmug.com/{i}/Th/p-Th.jpg',
+                    }
+                    for i in range(start, last + 1)
+                ],
+                'Pages': {'Total': IMAGE_COUNT, 'Start': start},
+            }
+        }
+
+    with patch.object(service, '_make_request', side_effect=mock_make_request):
+        first = await service.get_all_photos_by_id('ABC123', limit=PAGE_LIMIT)
+        second = await service.get_all_photos_by_id(
+            'ABC123', limit=PAGE_LIMIT, cursor=first.next_cursor
+        )
+
+    assert [p['start'] for p in requested] == [1, PAGE_LIMIT + 1]
+    assert all(p['count'] == PAGE_LIMIT for p in requested)
+    assert first.total_photos == IMAGE_COUNT
+    assert [p.id for p in first.photos][:2] == ['img1', 'img2']
+    assert first.next_cursor is not None
+    assert second.photos[0].id == f'img{PAGE_LIMIT + 1}'
+    assert second.next_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_get_photos_page_invalid_cursor(service):
+    """Teste para cursor inválido ou de outro álbum"""
+    other_album_cursor = SmugMugService._encode_cursor('OTHER', PAGE_LIMIT + 1)
+
+    for cursor in ('not-a-cursor!', other_album_cursor):
+        with pytest.raises(ValueError, match='Cursor inválido'):
+            await service.get_all_photos_by_id(
+                'ABC123', limit=PAGE_LIMIT, cursor=cursor
+            )
+
+
+@pytest.mark.asyncio
+async def test_get_photos_page_single_request(service):
+    """Página por posição: só o !images, sem cache nem índice"""
+    page = {
+        'Response': {
+            'AlbumImage': [{'ImageKey': 'img3', 'ThumbnailUrl': 'https://x'}],
+            'Pages': {'Total': 7},
+        }
+    }
+
+    with patch.object(
+        service, '_make_request', return_value=page
+    ) as mock_request:
+        photos, total = await service.get_photos_page('n-ABC123', 3, 1)
+
+    assert [photo.id for photo in photos] == ['img3']
+    assert total == 7  # noqa: PLR2004
+    mock_request.assert_awaited_once()
+    assert mock_request.await_args.args[0].endswith('/album/ABC123!images')
+    assert 'ABC123' not in service.photo_index
+
+
+@pytest.mark.asyncio
+async def test_cursor_without_limit_rejected(service):
+    """Cursor sem limit não busca nem guarda um álbum parcial"""
+    cursor = SmugMugService._encode_cursor('ABC123', PAGE_LIMIT + 1)
+
+    with (
+        patch.object(service, '_make_request') as mock_request,
+        pytest.raises(ValueError, match='Cursor exige limit'),
+    ):
+        await service.get_all_photos_by_id('ABC123', cursor=cursor)
+
+    mock_request.assert_not_called()
+    assert 'ABC123' not in service.album_cache
+    assert 'ABC123' not in service.photo_index
+
+
+@pytest.mark.asyncio
+async def test_fetch_album_overlaps_metadata_and_pages(service):
+    """Metadados e primeira página em paralelo, depois as demais"""
+    images_started = asyncio.Event()
+    requested_starts = []
+
+    async def mock_make_request(url, params=None):
+        if '!images' not in url:
+            # Só responde se a página de imagens já foi pedida
+            await asyncio.wait_for(images_started.wait(), timeout=1)
+            return {
+                'Response': {
+                    'Album': {'Title': 'Paged', 'ImageCount': IMAGE_COUNT}
+                }
+            }
+        images_started.set()
+        start = params['start']
+        requested_starts.append(start)
+        last = min(start + PAGE_LIMIT - 1, IMAGE_COUNT)
+        return {
+            'Response': {
+                'AlbumImage': [
+                    {'ImageKey': f'img{i}'} for i in range(start, last + 1)
+                ],
+                'Pages': {'Total': IMAGE_COUNT, 'Start': start},
+            }
+        }
+
+    with patch.object(service, '_make_request', side_effect=mock_make_request):
+        result = await service.get_all_photos_by_id('ABC123')
+
+    assert requested_starts == [1, PAGE_LIMIT + 1]
+    assert result.total_photos == IMAGE_COUNT
+    assert [p.id for p in result.photos] == [
+        f'img{i}' for i in range(1, IMAGE_COUNT + 1)
+    ]
+    assert result.next_cursor is None
+
+
+def _album_requests_mock(date_modified, calls):
+    """Mock de _make_request que registra as URLs pedidas"""
+
+    def mock_make_request(url, params=None):
+        calls.append(url)
+        if '!images' in url:
+            return {'Response': {'AlbumImage': [{'ImageKey': 'img1'}]}}
+        return {
+            'Response': {
+                'Album': {
+                    'Title': 'Cached',
+                    'ImageCount': 1,
+                    'DateModified': date_modified,
+                }
+            }
+        }
+
+    return mock_make_request
+
+
+@pytest.mark.asyncio
+async def test_full_album_served_from_cache_when_unchanged(service):
+    calls = []
+    mock = _album_requests_mock('2024-01-20T14:45:00Z', calls)
+
+    with patch.object(service, '_make_request', side_effect=mock):
+        first = await service.get_all_photos_by_id('ABC123')
+        calls.clear()
+        second = await service.get_all_photos_by_id('ABC123')
+
+    assert second == first
+    assert calls == ['https://api.smugmug.com/api/v2/album/ABC123']
+
+
+@pytest.mark.asyncio
+async def test_cached_album_refetched_when_modified(service):
+    calls = []
+
+    with patch.object(
+        service,
+        '_make_request',
+        side_effect=_album_requests_mock('2024-01-20T14:45:00Z', calls),
+    ):
+        await service.get_all_photos_by_id('ABC123')
+
+    calls.clear()
+    with patch.object(
+        service,
+        '_make_request',
+        side_effect=_album_requests_mock('2024-02-01T00:00:00Z', calls),
+    ):
+        await service.get_all_photos_by_id('ABC123')
+
+    assert any('!images' in url for url in calls)
+    cached = service.album_cache['ABC123']
+    assert cached.date_modified == '2024-02-01T00:00:00Z'
+
+
+@pytest.mark.asyncio
+async def test_get_album_key_remembers_lookup(service):
+    url = 'https://user.smugmug.com/events/party'
+    lookup = {
+        'Response': {'Locator': 'Album', 'Album': {'AlbumKey': 'XYZ789'}}
+    }
+
+    with patch.object(
+        service, '_make_request', return_value=lookup
+    ) as mock_request:
+        assert await service._get_album_key(url) == 'XYZ789'
+        assert await service._get_album_key(url) == 'XYZ789'
+
+    mock_request.assert_awaited_once()
+
+
+def _image_lookup_mock(calls, album_keys=('img1', 'img2', 'img3')):
+    def mock_make_request(url, params=None):
+        calls.append(url)
+        if '!images' in url:
+            start = (params or {}).get('start', 1)
+            count = (params or {}).get('count', len(album_keys))
+            return {
+                'Response': {
+                    'AlbumImage': [
+                        {
+                            'ImageKey': key,
+                            'ThumbnailUrl': f'https://photos.smugmug.com/{key}-Th.jpg',
+                        }
+                        for key in album_keys[start - 1 : start - 1 + count]
+                    ]
+                }
+            }
+        if '/image/' in url:
+            key = url.rsplit('/', 1)[1]
+            if key == 'busy':
+                raise ValueError('Rate limit excedido')
+            if key not in {*album_keys, 'elsewhere'}:
+                raise ValueError('Álbum não encontrado')
+            owner = 'OTHER99' if key == 'elsewhere' else 'ABC123'
+            return {
+                'Response': {
+                    'Image': {
+                        'ImageKey': key,
+                        'ThumbnailUrl': f'https://photos.smugmug.com/{key}-Th.jpg',
+                        'Uris': {
+                            'ImageAlbum': {'Uri': f'/api/v2/album/{owner}'}
+                        },
+                    }
+                }
+            }
+        return {
+            'Response': {
+                'Album': {
+                    'Title': 'Indexed',
+                    'ImageCount': len(album_keys),
+                    'DateModified': '2024-01-20T14:45:00Z',
+                }
+            }
+        }
+
+    return mock_make_request
+
+
+@pytest.mark.asyncio
+async def test_get_photo_served_from_album_index(service):
+    calls = []
+
+    with patch.object(
+        service, '_make_request', side_effect=_image_lookup_mock(calls)
+    ):
+        await service.get_all_photos_by_id('n-ABC123')
+        calls.clear()
+        photo = await service.get_photo('n-ABC123', 'img2')
+
+    assert photo.id == 'img2'
+    assert calls == []
+    assert service.indexed_photo('img2') == photo
+    assert service.indexed_photo('nope') is None
+
+
+@pytest.mark.asyncio
+async def test_get_photo_falls_back_to_image_endpoint(service):
+    calls = []
+
+    with patch.object(
+        service, '_make_request', side_effect=_image_lookup_mock(calls)
+    ):
+        photo = await service.get_photo('ABC123', 'img1')
+        for image_key in ('nope', 'elsewhere'):
+            with pytest.raises(ValueError, match='Foto não encontrada'):
+                await service.get_photo('ABC123', image_key)
+
+    assert photo.id == 'img1'
+    assert photo.thumbnail_url
+    assert calls[0] == 'https://api.smugmug.com/api/v2/image/img1'
+
+
+@pytest.mark.asyncio
+async def test_get_photos_reports_missing_keys(service):
+    calls = []
+
+    with patch.object(
+        service, '_make_request', side_effect=_image_lookup_mock(calls)
+    ):
+        result = await service.get_photos(
+            'ABC123', ['img3', 'nope', 'img3', 'elsewhere']
+        )
+        # Falhas que não são "não encontrada" não viram missing
+        with pytest.raises(ValueError, match='Rate limit'):
+            await service.get_photos('ABC123', ['img1', 'busy'])
+
+    assert [photo.id for photo in result.photos] == ['img3']
+    assert result.missing == ['nope', 'elsewhere']
+    assert not any('!images' in url for url in calls)
+
+
+@pytest.mark.asyncio
+async def test_get_photos_fetches_album_for_many_misses(service):
+    calls = []
+
+    with (
+        patch.object(
+            service, '_make_request', side_effect=_image_lookup_mock(calls)
+        ),
+        patch(
+            'smugmug_photo_selector.smugmug_service.settings.'
+            'PHOTO_LOOKUP_MAX_FALLBACK',
+            2,
+        ),
+    ):
+        result = await service.get_photos(
+            'ABC123', ['img1', 'img2', 'img3', 'nope']
+        )
+
+    assert [photo.id for photo in result.photos] == ['img1', 'img2', 'img3']
+    assert result.missing == ['nope']
+    assert not any('/image/' in url for url in calls)
+    assert set(service.photo_index['ABC123']) == {'img1', 'img2', 'img3'}
+
+
+@pytest.mark.asyncio
+async def test_get_photos_reindexes_cached_album(service):
+    """Índice parcial (página) com o álbum inteiro ainda em cache"""
+    calls = []
+
+    with (
+        patch.object(
+            service, '_make_request', side_effect=_image_lookup_mock(calls)
+        ),
+        patch(
+            'smugmug_photo_selector.smugmug_service.settings.'
+            'PHOTO_LOOKUP_MAX_FALLBACK',
+            1,
+        ),
+    ):
+        await service.get_all_photos_by_id('ABC123')
+        service.photo_index.clear()  # índice despejado, álbum em cache
+        await service.get_all_photos_by_id('ABC123', limit=1)
+        assert set(service.photo_index['ABC123']) == {'img1'}
+
+        calls.clear()
+        result = await service.get_photos('ABC123', ['img2', 'img3'])
+
+    assert [photo.id for photo in result.photos] == ['img2', 'img3']
+    assert result.missing == []
+    assert not any('!images' in url for url in calls)  # veio do cache
+    assert set(service.photo_index['ABC123']) == {'img1', 'img2', 'img3'}
+
+
+@pytest.mark.asyncio
+async def test_stream_album_emits_page_batches(service):
+    async def mock_make_request(url, params=None):
+        if '!images' not in url:
+            return {
+                'Response': {
+                    'Album': {
+                        'Title': 'Stream',
+                        'ImageCount': IMAGE_COUNT,
+                        'DateModified': '2024-01-20T14:45:00Z',
+                    }
+                }
+            }
+        start = params['start']
+        last = min(start + PAGE_LIMIT - 1, IMAGE_COUNT)
+        return {
+            'Response': {
+                'AlbumImage': [
+                    {'ImageKey': f'img{i}'} for i in range(start, last + 1)
+                ],
+                'Pages': {'Total': IMAGE_COUNT, 'Start': start},
+            }
+        }
+
+    with patch.object(service, '_make_request', side_effect=mock_make_request):
+        events = [
+            event async for event in service.stream_photos_by_id('n-ABC123')
+        ]
+
+    names = [name for name, _ in events]
+    assert names == ['album', 'photos', 'photos', 'done']
+    assert events[0][1]['pages'] == 2  # noqa: PLR2004
+    batches = sorted(
+        (data['start'], [p.id for p in data['photos']])
+        for name, data in events
+        if name == 'photos'
+    )
+    assert [key for _, ids in batches for key in ids] == [
+        f'img{i}' for i in range(1, IMAGE_COUNT + 1)
+    ]
+    assert events[-1][1]['total_photos'] == IMAGE_COUNT
+    # O álbum completo vai para o cache e o índice
+    assert service.album_cache['ABC123'].response.total_photos == IMAGE_COUNT
+    assert 'img15' in service.photo_index['ABC123']
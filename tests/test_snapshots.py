@@ -0,0 +1,103 @@
+import gzip
+import json
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from smugmug_photo_selector.models import AlbumInfo, AlbumResponse, Photo
+from smugmug_photo_selector.snapshots import (
+    INDEX_FILE,
+    SnapshotExporter,
+    SnapshotStore,
+)
+
+MAX_AGE = 60
+
+
+def _service(date_modified='2024-01-20T14:45:00Z'):
+    service = Mock()
+    service.get_album_info_by_id = AsyncMock(
+        side_effect=lambda album_id: AlbumInfo(
+            album_id=album_id.removeprefix('n-'),
+            album_title='Festa',
+            album_url='https://www.smugmug.com/album/x',
+            total_photos=1,
+            date_modified=date_modified,
+        )
+    )
+    service.get_all_photos_by_id = AsyncMock(
+        side_effect=lambda album_id: AlbumResponse(
+            album_title='Festa',
+            album_id=album_id.removeprefix('n-'),
+            total_photos=1,
+            photos=[Photo(id='img1', urls=[])],
+        )
+    )
+    return service
+
+
+@pytest.mark.asyncio
+async def test_refresh_writes_json_gzip_and_index(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    exporter = SnapshotExporter(_service(), store)
+
+    rendered = await exporter.refresh(['n-AAA', 'BBB'])
+
+    assert rendered == {'AAA': True, 'BBB': True}
+    index = json.loads((tmp_path / INDEX_FILE).read_text())
+    assert set(index['albums']) == {'AAA', 'BBB'}
+
+    path = store.fresh_path('n-AAA', MAX_AGE)
+    album = AlbumResponse.model_validate_json(path.read_bytes())
+    assert album.photos[0].id == 'img1'
+    compressed = store.fresh_path('AAA', MAX_AGE, compressed=True)
+    assert gzip.decompress(compressed.read_bytes()) == path.read_bytes()
+
+
+@pytest.mark.asyncio
+async def test_unchanged_album_is_not_rendered_again(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    service = _service()
+    exporter = SnapshotExporter(service, store)
+    await exporter.refresh(['AAA'])
+
+    rendered = await exporter.refresh(['AAA'])
+
+    assert rendered == {'AAA': False}
+    service.get_all_photos_by_id.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_modified_album_replaces_old_version(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    await SnapshotExporter(_service(), store).refresh(['AAA'])
+    old_path = store.fresh_path('AAA', MAX_AGE)
+
+    exporter = SnapshotExporter(_service('2024-02-01T00:00:00Z'), store)
+    rendered = await exporter.refresh(['AAA'])
+
+    assert rendered == {'AAA': True}
+    assert not old_path.exists()
+    assert store.fresh_path('AAA', MAX_AGE) != old_path
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_previous_snapshot(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    await SnapshotExporter(_service(), store).refresh(['AAA'])
+
+    service = _service()
+    service.get_album_info_by_id.side_effect = ValueError('Erro HTTP 500')
+    rendered = await SnapshotExporter(service, store).refresh(['AAA'])
+
+    assert rendered == {'AAA': False}
+    assert store.fresh_path('AAA', MAX_AGE) is not None
+    # Sem conferência recente, o snapshot deixa de ser servido
+    assert store.fresh_path('AAA', max_age=-1) is None
+
+
+def test_store_without_index(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'missing'))
+
+    assert store.index() == {}
+    assert store.fresh_path('AAA', MAX_AGE) is None
@@ -0,0 +1,59 @@
+from collections import OrderedDict
+from unittest.mock import Mock
+
+import pytest
+
+from smugmug_photo_selector.models import AlbumResponse, Photo
+from smugmug_photo_selector.smugmug_service import CachedAlbum
+from smugmug_photo_selector.warm_cache import WarmCache
+
+MAX_ALBUMS = 2
+
+
+def _service():
+    service = Mock()
+    service.album_keys = OrderedDict()
+    service.album_cache = OrderedDict()
+    return service
+
+
+def _cached(album_id, hits):
+    return CachedAlbum(
+        date_modified='2024-01-20T14:45:00Z',
+        image_count=1,
+        response=AlbumResponse(
+            album_title=album_id,
+            album_id=album_id,
+            total_photos=1,
+            photos=[Photo(id=f'{album_id}-1', urls=[])],
+        ),
+        hits=hits,
+    )
+
+
+@pytest.mark.asyncio
+async def test_save_and_load_hot_albums(tmp_path):
+    warm_cache = WarmCache(str(tmp_path / 'warm.json'), max_albums=MAX_ALBUMS)
+    service = _service()
+    service.album_keys['https://user.smugmug.com/party'] = 'AAA'
+    for album_id, hits in (('AAA', 5), ('BBB', 1), ('CCC', 3)):
+        service.album_cache[album_id] = _cached(album_id, hits)
+
+    warm_cache.save(service)
+    restored = _service()
+    count = await warm_cache.load(restored)
+
+    assert count == MAX_ALBUMS
+    assert list(restored.album_cache) == ['CCC', 'AAA']
+    assert restored.album_cache['AAA'] == service.album_cache['AAA']
+    assert restored.album_keys == {'https://user.smugmug.com/party': 'AAA'}
+
+
+@pytest.mark.asyncio
+async def test_missing_or_corrupt_file_is_ignored(tmp_path):
+    path = tmp_path / 'warm.json'
+    warm_cache = WarmCache(str(path), max_albums=MAX_ALBUMS)
+
+    assert await warm_cache.load(_service()) == 0
+    path.write_text('{not json')
+    assert await warm_cache.load(_service()) == 0